@@ -0,0 +1,102 @@
+"""Initial schema: roles, users, metrics and logs
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-06-01 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "roles",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("description", sa.String(length=200)),
+        sa.Column("created_at", sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_roles_id", "roles", ["id"])
+    op.create_index("ix_roles_name", "roles", ["name"], unique=True)
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(length=255), nullable=False),
+        sa.Column("username", sa.String(length=100), nullable=False),
+        sa.Column("full_name", sa.String(length=200)),
+        sa.Column("hashed_password", sa.String(length=255), nullable=False),
+        sa.Column("is_active", sa.Boolean()),
+        sa.Column("is_verified", sa.Boolean()),
+        sa.Column("role_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True)),
+        sa.Column("last_login", sa.DateTime(timezone=True)),
+        sa.ForeignKeyConstraint(["role_id"], ["roles.id"]),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "metrics",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("type", sa.String(length=50), nullable=False),
+        sa.Column("value", sa.Float(), nullable=False),
+        sa.Column("unit", sa.String(length=50)),
+        sa.Column("description", sa.Text()),
+        sa.Column("source", sa.String(length=100)),
+        sa.Column("tags", sa.Text()),
+        sa.Column("recorded_at", sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column("created_at", sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.Column("created_by", sa.Integer()),
+        sa.ForeignKeyConstraint(["created_by"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_metrics_id", "metrics", ["id"])
+    op.create_index("ix_metrics_name", "metrics", ["name"])
+    op.create_index("ix_metrics_type", "metrics", ["type"])
+
+    op.create_table(
+        "logs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("level", sa.String(length=20), nullable=False),
+        sa.Column("category", sa.String(length=50), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("source", sa.String(length=100)),
+        sa.Column("user_id", sa.Integer()),
+        sa.Column("session_id", sa.String(length=100)),
+        sa.Column("ip_address", sa.String(length=45)),
+        sa.Column("user_agent", sa.String(length=500)),
+        sa.Column("extra_data", sa.Text()),
+        sa.Column("stack_trace", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id")
+    )
+    op.create_index("ix_logs_id", "logs", ["id"])
+    op.create_index("ix_logs_level", "logs", ["level"])
+    op.create_index("ix_logs_category", "logs", ["category"])
+
+
+def downgrade() -> None:
+    op.drop_table("logs")
+    op.drop_table("metrics")
+    op.drop_table("users")
+    op.drop_table("roles")
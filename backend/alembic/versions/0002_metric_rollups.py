@@ -0,0 +1,44 @@
+"""Hourly and daily metric rollups
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-06-01 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "metric_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("granularity", sa.String(length=10), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("name", sa.String(length=200), nullable=False),
+        sa.Column("type", sa.String(length=50), nullable=False),
+        sa.Column("source", sa.String(length=100), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("sum_value", sa.Float(), nullable=False),
+        sa.Column("min_value", sa.Float(), nullable=False),
+        sa.Column("max_value", sa.Float(), nullable=False),
+        sa.Column("sum_squares", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True),
+                  server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("granularity", "bucket_start", "name", "type",
+                            "source", name="uq_metric_rollups_bucket")
+    )
+    op.create_index("ix_metric_rollups_id", "metric_rollups", ["id"])
+    op.create_index("ix_metric_rollups_type_bucket", "metric_rollups",
+                    ["granularity", "type", "bucket_start"])
+
+
+def downgrade() -> None:
+    op.drop_table("metric_rollups")
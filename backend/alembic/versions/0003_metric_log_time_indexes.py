@@ -0,0 +1,51 @@
+"""Composite time-range indexes for metrics and logs
+
+Dashboard and report queries filter on type, source, level or category
+together with a recorded_at/created_at range, and page through metrics
+ordered by (recorded_at DESC, id DESC). The single-column type, level and
+category indexes are prefixes of the new composite ones and are dropped.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-06-01 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_metrics_type_recorded_at", "metrics",
+                    ["type", "recorded_at"])
+    op.create_index("ix_metrics_source_recorded_at", "metrics",
+                    ["source", "recorded_at"])
+    op.create_index("ix_metrics_recorded_at_id", "metrics",
+                    [sa.text("recorded_at DESC"), "id"])
+    op.drop_index("ix_metrics_type", table_name="metrics")
+
+    op.create_index("ix_logs_level_created_at", "logs",
+                    ["level", "created_at"])
+    op.create_index("ix_logs_category_created_at", "logs",
+                    ["category", "created_at"])
+    op.create_index("ix_logs_created_at", "logs", ["created_at"])
+    op.drop_index("ix_logs_level", table_name="logs")
+    op.drop_index("ix_logs_category", table_name="logs")
+
+
+def downgrade() -> None:
+    op.create_index("ix_logs_category", "logs", ["category"])
+    op.create_index("ix_logs_level", "logs", ["level"])
+    op.drop_index("ix_logs_created_at", table_name="logs")
+    op.drop_index("ix_logs_category_created_at", table_name="logs")
+    op.drop_index("ix_logs_level_created_at", table_name="logs")
+
+    op.create_index("ix_metrics_type", "metrics", ["type"])
+    op.drop_index("ix_metrics_recorded_at_id", table_name="metrics")
+    op.drop_index("ix_metrics_source_recorded_at", table_name="metrics")
+    op.drop_index("ix_metrics_type_recorded_at", table_name="metrics")
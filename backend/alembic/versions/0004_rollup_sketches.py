@@ -0,0 +1,30 @@
+"""Quantile sketches on metric rollups
+
+Adds a serialized t-digest per rollup bucket for percentile queries.
+Buckets written before this revision have no sketch and minute rollups
+start empty; run rebuild_rollups.py to backfill both.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-06-01 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("metric_rollups") as batch_op:
+        batch_op.add_column(sa.Column("sketch", sa.LargeBinary()))
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM metric_rollups WHERE granularity = 'minute'")
+    with op.batch_alter_table("metric_rollups") as batch_op:
+        batch_op.drop_column("sketch")
@@ -0,0 +1,48 @@
+"""Structured auth events
+
+Adds auth_events, an indexed record of logins, refreshes, logouts and
+password changes that the user activity report groups by event type.
+Auth logs mentioning a login are copied over as successful logins, which
+is how the report counted them before.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-06-01 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "auth_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("event_type", sa.String(20), nullable=False),
+        sa.Column("user_id", sa.Integer(),
+                  sa.ForeignKey("users.id", ondelete="SET NULL")),
+        sa.Column("ip_address", sa.String(45)),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_auth_events_type_created_at", "auth_events",
+                    ["event_type", "created_at"])
+    op.create_index("ix_auth_events_user_id", "auth_events", ["user_id"])
+
+    op.execute(
+        "INSERT INTO auth_events (event_type, user_id, ip_address, created_at) "
+        "SELECT 'login_success', user_id, ip_address, created_at FROM logs "
+        "WHERE category = 'auth' AND lower(message) LIKE '%login%' "
+        "AND created_at IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_auth_events_user_id", table_name="auth_events")
+    op.drop_index("ix_auth_events_type_created_at", table_name="auth_events")
+    op.drop_table("auth_events")
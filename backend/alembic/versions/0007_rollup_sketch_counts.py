@@ -0,0 +1,61 @@
+"""Sample counts of rollup sketches
+
+Adds sketch_count, the number of samples a rollup's sketch covers.
+Percentiles are only answered from sketches covering all of a bucket's
+samples, so buckets written before sketches existed, or partly filled
+since, are recognized instead of yielding skewed percentiles. Existing
+sketches are counted from their serialized centroid weights.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-06-01 00:00:00
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import struct
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Serialized t-digest: compression, minimum, maximum, (mean, weight) pairs
+_HEADER_SIZE = struct.calcsize("<ddd")
+_CENTROID = struct.Struct("<dd")
+
+_BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("metric_rollups") as batch_op:
+        batch_op.add_column(sa.Column("sketch_count", sa.Integer()))
+
+    connection = op.get_bind()
+    rollups = sa.table("metric_rollups", sa.column("id", sa.Integer()),
+                       sa.column("sketch", sa.LargeBinary()),
+                       sa.column("sketch_count", sa.Integer()))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(rollups.c.id, rollups.c.sketch)
+            .where(rollups.c.id > last_id, rollups.c.sketch.isnot(None))
+            .order_by(rollups.c.id).limit(_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            rollups.update().where(rollups.c.id == sa.bindparam("row_id"))
+            .values(sketch_count=sa.bindparam("count")),
+            [{"row_id": row_id, "count": round(sum(
+                weight for _, weight in _CENTROID.iter_unpack(
+                    bytes(sketch)[_HEADER_SIZE:])))}
+             for row_id, sketch in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("metric_rollups") as batch_op:
+        batch_op.drop_column("sketch_count")
@@ -0,0 +1,176 @@
+"""
+Response compression middleware for the MicroShell Backend API.
+Negotiates gzip or zstd from Accept-Encoding and compresses incrementally,
+so streamed exports are sent compressed chunk by chunk instead of being
+buffered. Small bodies, event streams, already-compressed formats and
+responses marked Cache-Control: no-transform are sent unchanged.
+"""
+
+from typing import Dict, List, Optional
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import zstandard
+except ImportError:  # zstd is offered only when zstandard is installed
+    zstandard = None
+
+# Responses with these content types are never compressed
+UNCOMPRESSED_TYPES = (
+    "text/event-stream",
+    "application/vnd.apache.parquet",
+    "application/gzip",
+    "application/zip",
+    "application/zstd",
+    "image/",
+    "video/",
+    "audio/",
+)
+
+
+def supported_encodings() -> List[str]:
+    """Encodings the server can produce, most preferred first."""
+    return (["zstd"] if zstandard is not None else []) + ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the content coding for an Accept-Encoding header.
+    Highest q-value wins, ties go to the server's preference; None when
+    the client accepts none of the supported encodings.
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Encoder:
+    """Incremental encoder whose output can be flushed after every chunk."""
+
+    def __init__(self, encoding: str, gzip_level: int, zstd_level: int):
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(
+                level=zstd_level).compressobj()
+            self._sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._compressor = zlib.compressobj(
+                gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._sync_flush = zlib.Z_SYNC_FLUSH
+
+    def encode(self, data: bytes, final: bool) -> bytes:
+        output = self._compressor.compress(data)
+        if final:
+            return output + self._compressor.flush()
+        return output + self._compressor.flush(self._sync_flush)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses of at least minimum_size bytes."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024,
+                 gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope: Scope, receive: Receive,
+                       send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-response state: holds the start message until the body decides."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str,
+                 send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start: Optional[Message] = None
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            self.passthrough = not self._compressible(Headers(
+                raw=message["headers"]))
+            if self.passthrough:
+                await self.downstream(message)
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Whole body known and too small to be worth compressing
+                self.passthrough = True
+                await self.downstream(self.start)
+                await self.downstream(message)
+                return
+            self.encoder = _Encoder(self.encoding, self.middleware.gzip_level,
+                                    self.middleware.zstd_level)
+            body = self.encoder.encode(body, final=not more_body)
+            await self.downstream(self._compressed_start(
+                None if more_body else len(body)))
+        else:
+            body = self.encoder.encode(body, final=not more_body)
+        await self.downstream({"type": "http.response.body", "body": body,
+                               "more_body": more_body})
+
+    def _compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", "").lower():
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not content_type.startswith(UNCOMPRESSED_TYPES)
+
+    def _compressed_start(self, length: Optional[int]) -> Message:
+        headers = MutableHeaders(raw=list(self.start["headers"]))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            # Streamed: the compressed length is not known up front
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # A strong ETag names the identity bytes
+            headers["ETag"] = "W/" + etag
+        return {**self.start, "headers": headers.raw}
@@ -4,7 +4,7 @@ Uses Pydantic Settings for environment-based configuration management.
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 import secrets
 
@@ -20,12 +20,102 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    JWT_LEEWAY_SECONDS: int = 0  # Clock skew tolerated on exp
+
+    # RS256/EdDSA signing keys, one <kid>.pem per key; the greatest kid
+    # signs unless JWT_ACTIVE_KID is set. The JWKS is cached for max-age,
+    # and new keys only sign once every worker has published them for
+    # that long (JWT_KEY_RELOAD_SECONDS + JWKS_MAX_AGE_SECONDS).
+    JWT_KEYS_DIR: str = "./jwt_keys"
+    JWT_ACTIVE_KID: Optional[str] = None
+    JWT_KEY_RELOAD_SECONDS: float = 300.0
+    JWKS_MAX_AGE_SECONDS: int = 300
+
+    # Verified tokens remembered until exp, at most this long
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    TOKEN_CACHE_MAX_TTL_SECONDS: float = 300.0
+
+    # Revoked tokens: an in-memory Bloom filter sized for this many at
+    # this false positive rate, synced from the database every interval
+    REVOCATION_FILTER_CAPACITY: int = 100000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_SECONDS: float = 2.0
+    REVOCATION_SYNC_LOOKBACK_SECONDS: float = 30.0
+    REVOCATION_PURGE_INTERVAL_SECONDS: float = 3600.0
 
     # Server settings
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     DEBUG: bool = True
 
+    # Dashboard summary snapshot lifetime
+    SUMMARY_SNAPSHOT_TTL_SECONDS: float = 10.0
+
+    # bcrypt runs on this many worker processes (threads when disabled);
+    # calls beyond the workers and the queue are rejected with 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+    PASSWORD_HASH_PROCESSES: bool = True
+
+    # Authenticated users resolved without a query for this long
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+
+    # Rows validated and inserted per transaction by batch ingestion
+    METRIC_BATCH_CHUNK_SIZE: int = 1000
+
+    # Recent points kept in memory for "latest metrics" queries
+    RECENT_POINTS_PER_SERIES: int = 32
+    RECENT_POINTS_MAX_SERIES: int = 5000
+
+    # Rebuild empty rollups from existing metrics when migrating; when
+    # disabled, a warning asks for rebuild_rollups.py instead
+    ROLLUP_BACKFILL_ON_MIGRATE: bool = True
+
+    # t-digest compression of rollup sketches (higher is more accurate)
+    SKETCH_COMPRESSION: int = 100
+
+    # Most buckets a single /api/dashboard/series query may return
+    SERIES_MAX_BUCKETS: int = 10000
+
+    # Minute rollups (1m/5m series) are kept this long, then purged
+    SERIES_MINUTE_RETENTION_DAYS: int = 7
+    ROLLUP_PURGE_INTERVAL_SECONDS: float = 3600.0
+
+    # Rows fetched per server-side cursor batch by streaming exports
+    EXPORT_BATCH_SIZE: int = 1000
+    EXPORT_PARQUET_ROW_GROUP_SIZE: int = 100000
+
+    # Per-minute log counts kept in memory for error rates
+    LOG_COUNTER_WINDOW_MINUTES: int = 1440
+
+    # Most metrics one /api/reports/analytics query loads into memory
+    ANALYTICS_MAX_ROWS: int = 1_000_000
+    ANALYTICS_BATCH_SIZE: int = 10000  # Rows copied into the arrays at once
+
+    # Response compression (gzip, or zstd when zstandard is installed)
+    COMPRESSION_MINIMUM_SIZE: int = 1024  # Smaller bodies are sent as-is
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # Report result cache (0 disables it); the TTL bounds staleness from
+    # writes made by other processes
+    REPORT_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    REPORT_CACHE_TTL_SECONDS: float = 300.0
+    REPORT_WINDOW_ALIGN_SECONDS: int = 60  # Default report windows end here
+
+    # Background report jobs
+    REPORT_JOB_WORKERS: int = 2
+    REPORT_JOB_QUEUE_SIZE: int = 20  # Jobs waiting beyond the running ones
+    REPORT_JOB_DIR: str = "./report_jobs"  # Where results are written
+    REPORT_JOB_TTL_SECONDS: float = 3600.0  # Results kept after finishing
+    REPORT_JOB_EXPIRE_INTERVAL_SECONDS: float = 60.0
+
+    # Live dashboard stream
+    STREAM_QUEUE_SIZE: int = 100  # Pending events per connection
+    STREAM_KEEPALIVE_SECONDS: float = 15.0
+    STREAM_SUMMARY_DEBOUNCE_SECONDS: float = 1.0
+
     # CORS settings for microfrontend communication
     ALLOWED_ORIGINS: List[str] = [
         "http://localhost:4200",  # Shell app
@@ -1,15 +1,44 @@
 """
 Database configuration and connection management for MicroShell Backend.
-Uses SQLAlchemy with PostgreSQL for data persistence.
+Uses SQLAlchemy with PostgreSQL for data persistence. Route handlers use
+the async engine; the sync engine serves scripts and worker threads.
 """
 
-from sqlalchemy import create_engine
+from pathlib import Path
+import logging
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, exists, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
+# Async drivers for the sync database URLs we support
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Translate a sync database URL to its async driver equivalent."""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False)
+
+
 # Create SQLAlchemy engine
 engine = create_engine(
     settings.DATABASE_URL,
@@ -21,6 +50,17 @@ engine = create_engine(
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and sessions used by the API route handlers
+async_engine = create_async_engine(
+    get_async_database_url(settings.DATABASE_URL),
+    pool_pre_ping=True,
+    pool_recycle=300,
+    echo=settings.DEBUG
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False)
+
 # Create Base class for models
 Base = declarative_base()
 
@@ -35,3 +75,88 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session.
+    Queries awaited on it do not block the event loop.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Alembic configuration shipped next to the app package
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# Revisions matching schemas created by create_all before migrations
+LEGACY_REVISIONS = (("metric_rollups", "0002"), ("users", "0001"))
+
+
+def run_migrations(bind: Engine = engine) -> None:
+    """
+    Upgrade the database schema to the latest migration.
+    Databases created with create_all before migrations were introduced
+    are stamped with the revision their tables match first.
+    """
+    config = Config(str(ALEMBIC_INI))
+    with bind.begin() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "alembic_version" not in tables:
+            for table, revision in LEGACY_REVISIONS:
+                if table in tables:
+                    command.stamp(config, revision)
+                    break
+        command.upgrade(config, "head")
+        backfill_rollups(connection)
+
+
+def backfill_rollups(connection) -> None:
+    """
+    Build the metric rollups when metrics exist but no rollups do, as
+    after upgrading a database written before rollups were introduced.
+    Reports read only rollups and would otherwise miss all older data.
+    Days whose rollups lack sketches for some of their samples, as those
+    written before sketches were introduced, are rebuilt as well, so
+    their percentiles cover all of their samples.
+    """
+    # Imported here: the service imports the models, which need Base
+    from .models.metrics import Metric
+    from .models.rollups import MetricRollup
+    from .services.rollup_service import RollupService
+
+    has_metrics = connection.execute(select(exists().where(
+        Metric.id.isnot(None)))).scalar()
+    if not has_metrics:
+        return
+    has_rollups = connection.execute(select(exists().where(
+        MetricRollup.id.isnot(None)))).scalar()
+
+    with Session(bind=connection) as db:
+        if has_rollups:
+            RollupService.compact_sketches(db)
+            db.flush()
+            days = RollupService.incomplete_sketch_days(db)
+            if not days:
+                return
+            if not settings.ROLLUP_BACKFILL_ON_MIGRATE:
+                logger.warning(
+                    "%d days of rollups lack sketches: their percentiles "
+                    "stay unavailable until rebuild_rollups.py is run",
+                    len(days))
+                return
+            logger.warning("Rebuilding %d days of rollups without sketches",
+                           len(days))
+            processed = sum(RollupService.rebuild(db, day, day)
+                            for day in days)
+        else:
+            if not settings.ROLLUP_BACKFILL_ON_MIGRATE:
+                logger.warning(
+                    "metric_rollups is empty but metrics has rows: reports "
+                    "will miss existing data until rebuild_rollups.py is run")
+                return
+            logger.warning("metric_rollups is empty; rebuilding from metrics")
+            processed = RollupService.rebuild(db)
+        db.flush()
+    logger.warning("Rollups rebuilt from %d metrics", processed)
@@ -4,25 +4,50 @@ Main entry point for the API server with JWT authentication,
 CORS, and database integration.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+import asyncio
 import uvicorn
 
-from .database import engine
-from .models import Base
+from .compression import CompressionMiddleware
+from .database import SessionLocal, run_migrations
 from .routes import auth, users, dashboard, reports
 from .config import settings
+from .services.jwt_keys import key_ring
+from .services.log_counters import LogCounterService
+from .services.password_hasher import password_hasher
+from .services.recent_points import RecentPointsService
+from .services.report_jobs import report_jobs
+from .services.rollup_service import RollupService
+from .services.token_revocation import token_revocations
 
 
-# Create database tables on startup
+# Migrate the database schema on startup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    Base.metadata.create_all(bind=engine)
+    run_migrations()
+    with SessionLocal() as db:
+        RecentPointsService.load(db)
+        LogCounterService.load(db)
+        token_revocations.load(db)
+    retention = asyncio.create_task(RollupService.retention_loop(
+        settings.ROLLUP_PURGE_INTERVAL_SECONDS))
+    revocation_sync = asyncio.create_task(token_revocations.sync_loop(
+        settings.REVOCATION_SYNC_SECONDS,
+        settings.REVOCATION_PURGE_INTERVAL_SECONDS))
+    job_expiry = asyncio.create_task(report_jobs.expire_loop(
+        settings.REPORT_JOB_EXPIRE_INTERVAL_SECONDS))
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    retention.cancel()
+    revocation_sync.cancel()
+    job_expiry.cancel()
+    report_jobs.shutdown()
+    password_hasher.shutdown()
 
 
 # Initialize FastAPI app with lifespan events
@@ -44,6 +69,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large and streamed responses for clients that accept it
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+)
+
 # Security scheme
 security = HTTPBearer()
 
@@ -59,6 +92,27 @@ async def health_check():
     }
 
 
+# Prometheus scrape endpoint (see monitoring/prometheus.yml)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Expose process metrics in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+# Public signing keys for verifying tokens in other services
+@app.get("/.well-known/jwks.json", tags=["Authentication"])
+async def jwks(request: Request):
+    """Serve the JWT verification keys as a JSON Web Key Set."""
+    body, etag = key_ring.jwks()
+    headers = {
+        "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}",
+        "ETag": etag,
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
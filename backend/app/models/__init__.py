@@ -6,9 +6,13 @@ Contains all SQLAlchemy ORM models for the application.
 from .user import User, Role
 from .metrics import Metric
 from .logs import Log
+from .rollups import MetricRollup
+from .auth_events import AuthEvent
+from .revoked_tokens import RevokedToken
 
 # Import Base from database configuration
 from ..database import Base
 
 # Export all models
-__all__ = ["User", "Role", "Metric", "Log", "Base"]
+__all__ = ["User", "Role", "Metric", "Log", "MetricRollup", "AuthEvent",
+           "RevokedToken", "Base"]
@@ -0,0 +1,42 @@
+"""
+Auth event model for login and token activity.
+A compact, indexed record of authentication events, so activity reports
+group on an event type instead of searching log messages.
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from enum import Enum as PyEnum
+
+from ..database import Base
+
+
+class AuthEventType(PyEnum):
+    """Enum for authentication event types."""
+    LOGIN_SUCCESS = "login_success"
+    LOGIN_FAILURE = "login_failure"
+    REFRESH = "refresh"
+    LOGOUT = "logout"
+    PASSWORD_CHANGE = "password_change"
+
+
+class AuthEvent(Base):
+    """One authentication event, with the user when one is known."""
+    __tablename__ = "auth_events"
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(20), nullable=False)  # AuthEventType value
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    ip_address = Column(String(45))  # IPv4/IPv6 address
+    created_at = Column(DateTime, nullable=False,
+                        default=datetime.utcnow)  # UTC, naive
+
+    __table_args__ = (
+        # Per-type counts over a time range
+        Index("ix_auth_events_type_created_at", "event_type", "created_at"),
+        Index("ix_auth_events_user_id", "user_id"),
+    )
+
+    def __repr__(self):
+        return (f"<AuthEvent(id={self.id}, event_type='{self.event_type}', "
+                f"user_id={self.user_id})>")
@@ -4,6 +4,7 @@ Stores application logs, user actions, and system events.
 """
 
 from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -35,8 +36,8 @@ class Log(Base):
     __tablename__ = "logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    level = Column(String(20), nullable=False, index=True)  # LogLevel enum value
-    category = Column(String(50), nullable=False, index=True)  # LogCategory
+    level = Column(String(20), nullable=False)  # LogLevel enum value
+    category = Column(String(50), nullable=False)  # LogCategory
     message = Column(Text, nullable=False)
 
     # Context information
@@ -56,6 +57,13 @@ class Log(Base):
     # Relationship with user
     user = relationship("User")
 
+    __table_args__ = (
+        # Level or category filters combined with a time range
+        Index("ix_logs_level_created_at", "level", "created_at"),
+        Index("ix_logs_category_created_at", "category", "created_at"),
+        Index("ix_logs_created_at", "created_at"),
+    )
+
     def __repr__(self):
         return (f"<Log(id={self.id}, level='{self.level}', "
                 f"category='{self.category}', message='{self.message[:50]}...')>")
@@ -4,6 +4,7 @@ Stores various metrics and KPIs for the dashboard microfrontend.
 """
 
 from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Index
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
 
@@ -25,7 +26,7 @@ class Metric(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(200), nullable=False, index=True)
-    type = Column(String(50), nullable=False, index=True)  # MetricType enum value
+    type = Column(String(50), nullable=False)  # MetricType enum value
     value = Column(Float, nullable=False)
     unit = Column(String(50))  # e.g., "users", "€", "%", "ms"
     description = Column(Text)
@@ -41,6 +42,16 @@ class Metric(Base):
     # Optional user tracking (who created this metric)
     created_by = Column(Integer, ForeignKey("users.id"))
 
+    __table_args__ = (
+        # Type or source filters combined with a time range
+        Index("ix_metrics_type_recorded_at", "type", "recorded_at"),
+        Index("ix_metrics_source_recorded_at", "source", "recorded_at"),
+    )
+
     def __repr__(self):
         return (f"<Metric(id={self.id}, name='{self.name}', "
                 f"value={self.value}, type='{self.type}')>")
+
+
+# Newest-first listing and keyset pagination
+Index("ix_metrics_recorded_at_id", Metric.recorded_at.desc(), Metric.id)
@@ -0,0 +1,31 @@
+"""
+Revoked token model for logout and session revocation.
+One row per revoked token id (jti), kept until the token would have
+expired anyway.
+"""
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+
+from ..database import Base
+
+
+class RevokedToken(Base):
+    """A token that must be rejected until its expiry."""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    expires_at = Column(DateTime, nullable=False)  # UTC, naive
+    revoked_at = Column(DateTime, nullable=False,
+                        default=datetime.utcnow)  # UTC, naive
+
+    __table_args__ = (
+        # Purging expired entries and syncing recent revocations
+        Index("ix_revoked_tokens_expires_at", "expires_at"),
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),
+    )
+
+    def __repr__(self):
+        return (f"<RevokedToken(jti='{self.jti}', user_id={self.user_id}, "
+                f"expires_at={self.expires_at})>")
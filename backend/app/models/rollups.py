@@ -0,0 +1,58 @@
+"""
+Metric rollup model for pre-aggregated dashboard and report data.
+Stores minute, hourly and daily aggregates per (name, type, source)
+series, each with a quantile sketch of its values. A sketch answers
+percentiles only while it covers all of the bucket's samples.
+"""
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, LargeBinary
+from sqlalchemy import UniqueConstraint, Index
+from sqlalchemy.sql import func
+from enum import Enum as PyEnum
+
+from ..database import Base
+
+
+class RollupGranularity(PyEnum):
+    """Enum for rollup bucket sizes, from finest to coarsest."""
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+
+class MetricRollup(Base):
+    """Aggregated metric values for one series over one time bucket."""
+    __tablename__ = "metric_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(10), nullable=False)  # RollupGranularity
+    bucket_start = Column(DateTime, nullable=False)  # UTC, naive
+
+    # Series key ("" stands for a metric without source)
+    name = Column(String(200), nullable=False)
+    type = Column(String(50), nullable=False)
+    source = Column(String(100), nullable=False, default="")
+
+    # Mergeable aggregates
+    sample_count = Column(Integer, nullable=False, default=0)
+    sum_value = Column(Float, nullable=False, default=0.0)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_squares = Column(Float, nullable=False, default=0.0)
+    sketch = Column(LargeBinary)  # Serialized t-digest, for percentiles
+    sketch_count = Column(Integer)  # Samples the sketch covers
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(),
+                        onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "name", "type",
+                         "source", name="uq_metric_rollups_bucket"),
+        Index("ix_metric_rollups_type_bucket",
+              "granularity", "type", "bucket_start"),
+    )
+
+    def __repr__(self):
+        return (f"<MetricRollup(granularity='{self.granularity}', "
+                f"bucket_start={self.bucket_start}, name='{self.name}', "
+                f"count={self.sample_count})>")
@@ -45,13 +45,18 @@ class User(Base):
 
     # Role relationship
     role_id = Column(Integer, ForeignKey("roles.id"), nullable=False)
-    role = relationship("Role", back_populates="users")
+    # Loaded eagerly so async sessions never hit a lazy load
+    role = relationship("Role", back_populates="users", lazy="selectin")
 
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     last_login = Column(DateTime(timezone=True))
 
+    @property
+    def role_name(self):
+        return self.role.name if self.role else None
+
     def __repr__(self):
-        role_name = self.role.name if self.role else None
+        role_name = self.role_name
         return f"<User(id={self.id}, email='{self.email}', role='{role_name}')>"
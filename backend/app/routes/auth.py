@@ -3,17 +3,26 @@ Authentication routes for user login, registration, and token management.
 Handles JWT token creation, refresh, and user authentication.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from typing import Optional
 
-from ..database import get_db
+from ..database import get_async_db
+from ..models.auth_events import AuthEventType
 from ..models.user import User, Role
 from ..schemas.auth import UserLogin, UserRegister, Token
 from ..schemas.auth import RefreshTokenRequest, PasswordChangeRequest
+from ..schemas.auth import LogoutRequest
 from ..schemas.user import UserResponse
+from ..services.auth_events import AuthEventService
 from ..services.auth_service import AuthService, get_current_user
+from ..services.dashboard_service import summary_snapshot
+from ..services.principal_cache import Principal, principal_cache
+from ..services.report_cache import report_cache
+from ..services.token_revocation import token_revocations
 from ..config import settings
 
 router = APIRouter()
@@ -23,14 +32,17 @@ security = HTTPBearer()
 @router.post("/login", response_model=Token)
 async def login(
     user_credentials: UserLogin,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Authenticate user and return JWT tokens.
     """
-    user = AuthService.authenticate_user(
+    user = await AuthService.authenticate_user(
         db, user_credentials.email, user_credentials.password)
     if not user:
+        await AuthEventService.record(
+            db, AuthEventType.LOGIN_FAILURE, request=request)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -38,14 +50,17 @@ async def login(
         )
 
     if not user.is_active:
+        await AuthEventService.record(
+            db, AuthEventType.LOGIN_FAILURE, user.id, request)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
 
-    # Update last login
+    # Update last login, committed with the event
     user.last_login = datetime.utcnow()
-    db.commit()
+    await AuthEventService.record(
+        db, AuthEventType.LOGIN_SUCCESS, user.id, request)
 
     # Create tokens
     role_name = user.role.name if user.role else "user"
@@ -67,21 +82,21 @@ async def login(
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserRegister,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Register a new user account.
     """
     # Check if user already exists
-    if AuthService.get_user_by_email(db, user_data.email):
+    if await AuthService.get_user_by_email(db, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
     # Check if username already exists
-    existing_user = db.query(User).filter(
-        User.username == user_data.username).first()
+    existing_user = (await db.execute(select(User).where(
+        User.username == user_data.username))).scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -89,16 +104,18 @@ async def register(
         )
 
     # Get default user role
-    user_role = db.query(Role).filter(Role.name == "user").first()
+    user_role = (await db.execute(select(Role).where(
+        Role.name == "user"))).scalars().first()
     if not user_role:
         # Create default user role if it doesn't exist
         user_role = Role(name="user", description="Standard user role")
         db.add(user_role)
-        db.commit()
-        db.refresh(user_role)
+        await db.commit()
+        await db.refresh(user_role)
 
     # Create new user
-    hashed_password = AuthService.get_password_hash(user_data.password)
+    hashed_password = await AuthService.get_password_hash_async(
+        user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -110,8 +127,10 @@ async def register(
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    summary_snapshot.invalidate()
+    report_cache.note_write("users")
+    await db.refresh(new_user)
 
     return new_user
 
@@ -119,14 +138,16 @@ async def register(
 @router.post("/refresh", response_model=Token)
 async def refresh_token(
     refresh_request: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Refresh access token using refresh token.
     """
     try:
         payload = AuthService.verify_token(refresh_request.refresh_token)
-        if payload.get("type") != "refresh":
+        if payload.get("type") != "refresh" or \
+                await token_revocations.is_revoked(db, payload.get("jti")):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token"
@@ -139,7 +160,7 @@ async def refresh_token(
                 detail="Invalid refresh token"
             )
 
-        user = AuthService.get_user_by_id(db, int(user_id))
+        user = await AuthService.get_user_by_id(db, int(user_id))
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -154,6 +175,8 @@ async def refresh_token(
         new_refresh_token = AuthService.create_refresh_token(
             data={"sub": str(user.id)}
         )
+        await AuthEventService.record(
+            db, AuthEventType.REFRESH, user.id, request)
 
         return {
             "access_token": access_token,
@@ -171,44 +194,80 @@ async def refresh_token(
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get current authenticated user information.
     """
-    return current_user
+    return await _load_user(db, current_user)
 
 
 @router.post("/change-password")
 async def change_password(
     password_data: PasswordChangeRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Change user password.
     """
+    user = await _load_user(db, current_user)
+
     # Verify current password
-    if not AuthService.verify_password(
-            password_data.current_password, current_user.hashed_password):
+    if not await AuthService.verify_password_async(
+            password_data.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
         )
 
     # Update password
-    current_user.hashed_password = AuthService.get_password_hash(
+    user.hashed_password = await AuthService.get_password_hash_async(
         password_data.new_password)
-    db.commit()
+    await AuthEventService.record(
+        db, AuthEventType.PASSWORD_CHANGE, current_user.id, request)
+    principal_cache.invalidate(current_user.id)
 
     return {"message": "Password changed successfully"}
 
 
 @router.post("/logout")
 async def logout(
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    logout_request: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Logout user (client should discard tokens).
+    Logout user, revoking the access token and the refresh token if given.
     """
+    payloads = [AuthService.verify_token(credentials.credentials)]
+    if logout_request and logout_request.refresh_token:
+        refresh_payload = AuthService.verify_token(
+            logout_request.refresh_token)
+        if refresh_payload.get("type") != "refresh" or \
+                refresh_payload.get("sub") != str(current_user.id):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token"
+            )
+        payloads.append(refresh_payload)
+    await token_revocations.revoke(db, payloads, current_user.id)
+    await AuthEventService.record(
+        db, AuthEventType.LOGOUT, current_user.id, request)
     return {"message": "Logged out successfully"}
+
+
+async def _load_user(db: AsyncSession, principal: Principal) -> User:
+    """The full user row behind a principal."""
+    user = await AuthService.get_user_by_id(db, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
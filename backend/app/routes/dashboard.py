@@ -4,123 +4,171 @@ Provides endpoints for dashboard microfrontend to display KPIs and metrics.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import Optional
+from fastapi import BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, select, tuple_
+from typing import List, Optional
 from datetime import datetime, timedelta
 import random
-import math
 
-from ..database import get_db
+from ..config import settings
+from ..database import get_async_db
 from ..models.user import User
 from ..models.metrics import Metric
 from ..schemas.metrics import MetricCreate, MetricUpdate, MetricResponse
 from ..schemas.metrics import MetricListResponse, DashboardSummary
+from ..schemas.metrics import MetricBatchResponse
 from ..services.auth_service import get_current_user
+from ..services.principal_cache import Principal
+from ..services.rollup_service import RollupService
+from ..services.pagination import encode_cursor, decode_cursor
+from ..services.pagination import count_rows, estimate_rows
+from ..services.dashboard_service import DashboardService, summary_snapshot
+from ..services.dashboard_service import dashboard_hub
+from ..services.event_hub import format_sse
+from ..services.ingest_service import MetricIngestService
+from ..services.recent_points import RecentPointsService
+from ..services.downsampling import downsample, time_axis
+from ..services.report_cache import report_cache
+from ..services.series_service import SeriesService, AGGREGATIONS
 
 router = APIRouter()
 
 @router.get("/summary", response_model=DashboardSummary)
 async def get_dashboard_summary(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    stale_while_revalidate: bool = False,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get dashboard summary with key metrics and KPIs.
+    Served from a short-lived snapshot; with stale_while_revalidate an
+    expired snapshot is returned at once and refreshed in the background.
     """
-    # Get user statistics
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active.is_(True)).count()
-
-    # Get revenue metrics (last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    revenue_metrics = db.query(func.sum(Metric.value)).filter(
-        Metric.type == "revenue",
-        Metric.recorded_at >= thirty_days_ago
-    ).scalar() or 0.0
-
-    # Get performance score (average of performance metrics)
-    performance_score = db.query(func.avg(Metric.value)).filter(
-        Metric.type == "performance",
-        Metric.recorded_at >= thirty_days_ago
-    ).scalar() or 0.0
-
-    # Determine system health based on recent error logs and performance
-    system_health = "healthy"
-    if performance_score < 70:
-        system_health = "warning"
-    elif performance_score < 50:
-        system_health = "critical"
-
-    # Get recent metrics (last 10)
-    recent_metrics = db.query(Metric).order_by(
-        desc(Metric.recorded_at)).limit(10).all()
-
-    return {
-        "total_users": total_users,
-        "active_users": active_users,
-        "total_revenue": revenue_metrics,
-        "performance_score": round(performance_score, 2),
-        "system_health": system_health,
-        "recent_metrics": recent_metrics
-    }
+    if stale_while_revalidate:
+        summary, fresh = summary_snapshot.get()
+        if summary is not None:
+            if not fresh and summary_snapshot.claim_refresh():
+                background_tasks.add_task(DashboardService.refresh_snapshot)
+            return summary
+
+    return await db.run_sync(DashboardService.get_summary)
+
+@router.get("/stream")
+async def stream_dashboard(
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Live dashboard updates as Server-Sent Events.
+    Starts with the full summary, then pushes "metrics" events for new
+    metrics and "summary" events with the changed summary fields. A
+    "resync" event means updates were dropped and the client should
+    refetch. Comment lines are sent as keep-alives while idle.
+    """
+    summary = await db.run_sync(DashboardService.get_summary)
+    subscription = dashboard_hub.subscribe()
+
+    async def events():
+        try:
+            yield format_sse({"event": "summary",
+                              "data": summary.model_dump(mode="json")})
+            while not await request.is_disconnected():
+                message = await subscription.next_event(
+                    settings.STREAM_KEEPALIVE_SECONDS)
+                yield format_sse(message) if message else ": keep-alive\n\n"
+        finally:
+            dashboard_hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/metrics", response_model=MetricListResponse)
 async def get_metrics(
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    total_mode: Optional[str] = Query(None, pattern="^(exact|estimate|none)$"),
     type_filter: Optional[str] = None,
     source_filter: Optional[str] = None,
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get paginated list of metrics with filters.
+    Passing cursor (empty for the first page) switches to keyset
+    pagination: follow next_cursor, deep pages cost the same as the first.
+    total_mode defaults to exact in page mode and none in cursor mode.
     """
-    query = db.query(Metric)
+    query = select(Metric)
 
     # Apply filters
     if type_filter:
-        query = query.filter(Metric.type == type_filter)
+        query = query.where(Metric.type == type_filter)
 
     if source_filter:
-        query = query.filter(Metric.source == source_filter)
+        query = query.where(Metric.source == source_filter)
 
     if date_from:
-        query = query.filter(Metric.recorded_at >= date_from)
+        query = query.where(Metric.recorded_at >= date_from)
 
     if date_to:
-        query = query.filter(Metric.recorded_at <= date_to)
-
-    # Get total count
-    total = query.count()
-
-    # Apply pagination and ordering
-    offset = (page - 1) * per_page
-    metrics = query.order_by(desc(Metric.recorded_at)).offset(offset).limit(
-        per_page).all()
-
-    # Calculate pagination info
-    total_pages = math.ceil(total / per_page)
-    has_next = page < total_pages
-    has_prev = page > 1
+        query = query.where(Metric.recorded_at <= date_to)
+
+    # Get total count (opt-in for cursor mode)
+    if total_mode is None:
+        total_mode = "none" if cursor is not None else "exact"
+    total = None
+    if total_mode == "estimate":
+        total = await db.run_sync(estimate_rows, query)
+    total_is_estimate = total is not None
+    if total_mode == "exact" or (total_mode == "estimate" and total is None):
+        total = await db.run_sync(count_rows, query)
+
+    # Apply pagination and ordering, fetching one extra row for has_next
+    query = query.order_by(desc(Metric.recorded_at), desc(Metric.id))
+    if cursor is not None:
+        if cursor:
+            recorded_at, metric_id = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Metric.recorded_at, Metric.id)
+                < tuple_(recorded_at, metric_id))
+        has_prev = bool(cursor)
+        page = None
+    else:
+        query = query.offset((page - 1) * per_page)
+        has_prev = page > 1
+
+    metrics = (await db.execute(query.limit(per_page + 1))).scalars().all()
+    has_next = len(metrics) > per_page
+    metrics = metrics[:per_page]
+    next_cursor = (encode_cursor(metrics[-1].recorded_at, metrics[-1].id)
+                   if has_next else None)
 
     return {
         "metrics": metrics,
         "total": total,
+        "total_is_estimate": total_is_estimate,
         "page": page,
         "per_page": per_page,
         "has_next": has_next,
-        "has_prev": has_prev
+        "has_prev": has_prev,
+        "next_cursor": next_cursor
     }
 
 @router.post("/metrics", response_model=MetricResponse)
 async def create_metric(
     metric_data: MetricCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create a new metric entry.
@@ -138,21 +186,68 @@ async def create_metric(
     )
 
     db.add(new_metric)
-    db.commit()
-    db.refresh(new_metric)
+    await db.flush()
+    await db.run_sync(RollupService.apply_metrics, [new_metric])
+    await db.commit()
+    await db.refresh(new_metric)
+    # Record before invalidating, so a summary computed in between is
+    # never stored with the metric missing from its recent points
+    RecentPointsService.record([new_metric])
+    summary_snapshot.invalidate()
+    report_cache.note_write("metrics", [new_metric.recorded_at])
+    DashboardService.publish_metrics([new_metric])
 
     return new_metric
 
+@router.post("/metrics/batch", response_model=MetricBatchResponse)
+async def create_metrics_batch(
+    request: Request,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Create metrics in bulk from a JSON array or an NDJSON body
+    (Content-Type: application/x-ndjson). The body is read as a stream
+    and inserted in chunks; invalid rows are reported by position
+    without failing the rest of the batch.
+    """
+    result = await MetricIngestService.ingest(
+        db,
+        request.stream(),
+        request.headers.get("content-type", ""),
+        created_by=current_user.id,
+        chunk_size=settings.METRIC_BATCH_CHUNK_SIZE
+    )
+    return result
+
+@router.get("/metrics/recent", response_model=list[MetricResponse])
+async def get_recent_metrics(
+    name: Optional[str] = None,
+    type_filter: Optional[str] = None,
+    source: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=settings.RECENT_POINTS_PER_SERIES),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get the newest metrics, optionally for a single series.
+    Answered from the in-memory recent points buffer when possible.
+    """
+    return await db.run_sync(
+        RecentPointsService.latest, limit, name=name, type=type_filter,
+        source=source
+    )
+
 @router.get("/metrics/{metric_id}", response_model=MetricResponse)
 async def get_metric(
     metric_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get specific metric by ID.
     """
-    metric = db.query(Metric).filter(Metric.id == metric_id).first()
+    metric = await db.get(Metric, metric_id)
     if not metric:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -164,101 +259,201 @@ async def get_metric(
 async def update_metric(
     metric_id: int,
     metric_data: MetricUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update existing metric.
     """
-    metric = db.query(Metric).filter(Metric.id == metric_id).first()
+    metric = await db.get(Metric, metric_id)
     if not metric:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Metric not found"
         )
 
+    previous_point = (metric.name, metric.type, metric.source,
+                      metric.recorded_at)
+
     # Update metric fields
     update_data = metric_data.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(metric, field, value)
 
-    db.commit()
-    db.refresh(metric)
+    await db.flush()
+    await db.run_sync(RollupService.refresh_series, [
+        previous_point,
+        (metric.name, metric.type, metric.source, metric.recorded_at)
+    ])
+    await db.commit()
+    await db.refresh(metric)
+    await db.run_sync(RecentPointsService.reload_series, [
+        (previous_point[0], previous_point[1], previous_point[2] or ""),
+        (metric.name, metric.type, metric.source or "")
+    ])
+    summary_snapshot.invalidate()
+    report_cache.note_write(
+        "metrics", [previous_point[3], metric.recorded_at])
 
     return metric
 
 @router.delete("/metrics/{metric_id}")
 async def delete_metric(
     metric_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete metric by ID.
     """
-    metric = db.query(Metric).filter(Metric.id == metric_id).first()
+    metric = await db.get(Metric, metric_id)
     if not metric:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Metric not found"
         )
 
-    db.delete(metric)
-    db.commit()
+    point = (metric.name, metric.type, metric.source, metric.recorded_at)
+    await db.delete(metric)
+    await db.flush()
+    await db.run_sync(RollupService.refresh_series, [point])
+    await db.commit()
+    await db.run_sync(RecentPointsService.reload_series,
+                      [(point[0], point[1], point[2] or "")])
+    summary_snapshot.invalidate()
+    report_cache.note_write("metrics", [point[3]])
 
     return {"message": "Metric deleted successfully"}
 
 @router.get("/charts/performance")
 async def get_performance_chart_data(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    downsampling: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get performance metrics data for charts.
+    With max_points the series is downsampled on the server (LTTB, or
+    min/max bucketing to keep every peak) so the payload stays bounded
+    whatever the range and granularity.
     """
-    start_date = datetime.utcnow() - timedelta(days=days)
-
-    # Get daily performance averages
-    daily_performance = db.query(
-        func.date(Metric.recorded_at).label('date'),
-        func.avg(Metric.value).label('avg_performance')
-    ).filter(
-        Metric.type == "performance",
-        Metric.recorded_at >= start_date
-    ).group_by(func.date(Metric.recorded_at)).order_by(
-        func.date(Metric.recorded_at)).all()
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=days)
+
+    # Get daily or hourly performance averages from the rollups
+    per_hour = granularity == "hour"
+    performance = await db.run_sync(
+        RollupService.collect, start_date, end_date, per_day=not per_hour,
+        per_hour=per_hour, type_filter="performance")
+
+    buckets = sorted(performance.items())
+    points = downsample(
+        buckets, max_points,
+        y=lambda item: item[1].mean,
+        x=lambda item: time_axis(item[0][0]),
+        method=downsampling
+    )
 
     return {
         "chart_data": [
             {
-                "date": day.date.isoformat(),
-                "value": round(float(day.avg_performance), 2)
+                "date": bucket.isoformat(),
+                "value": round(aggregate.mean, 2)
             }
-            for day in daily_performance
+            for (bucket,), aggregate in points
+        ],
+        "period_days": days,
+        "granularity": granularity,
+        "source_points": len(buckets)
+    }
+
+@router.get("/series")
+async def get_metric_series(
+    bucket: str = Query("1h", pattern="^(1m|5m|1h|1d|1w)$"),
+    agg: List[str] = Query(["avg"]),
+    name: Optional[str] = None,
+    type_filter: Optional[str] = None,
+    source_filter: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get metric values aggregated per time bucket.
+    agg may be repeated (avg, min, max, sum, count, p50, p95, p99).
+    Matching series are combined; the range is widened to whole buckets.
+    Percentiles come from the rollup sketches, so long ranges stay cheap.
+    1m and 5m buckets are only available within the minute retention.
+    """
+    invalid = [value for value in agg if value not in AGGREGATIONS]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown aggregation: {', '.join(invalid)}"
+        )
+
+    start, end = SeriesService.resolve_range(bucket, date_from, date_to)
+    if not SeriesService.within_retention(bucket, start):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(f"Minute buckets are kept for "
+                    f"{settings.SERIES_MINUTE_RETENTION_DAYS} days, "
+                    f"use 1h or larger for older data")
+        )
+    buckets = SeriesService.bucket_count(bucket, start, end)
+    if buckets > settings.SERIES_MAX_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Range has too many buckets, use a larger bucket"
+        )
+
+    points = await db.run_sync(
+        SeriesService.query, bucket, agg, start, end, name=name,
+        type_filter=type_filter, source=source_filter)
+    source_points = len(points)
+    points = downsample(points, max_points,
+                        y=lambda point: point[agg[0]] or 0.0,
+                        x=lambda point: time_axis(point["bucket_start"]))
+
+    return {
+        "bucket": bucket,
+        "aggregations": agg,
+        "date_from": start.isoformat(),
+        "date_to": end.isoformat(),
+        "points": [
+            {**point, "bucket_start": point["bucket_start"].isoformat()}
+            for point in points
         ],
-        "period_days": days
+        "source_points": source_points
     }
 
 @router.get("/charts/users")
 async def get_users_chart_data(
     days: int = Query(30, ge=1, le=365),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    downsampling: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get user registration data for charts.
+    With max_points the series is downsampled on the server.
     """
     start_date = datetime.utcnow() - timedelta(days=days)
 
     # Get daily user registrations
-    daily_registrations = db.query(
+    daily_registrations = (await db.execute(select(
         func.date(User.created_at).label('date'),
         func.count(User.id).label('count')
-    ).filter(
+    ).where(
         User.created_at >= start_date
     ).group_by(func.date(User.created_at)).order_by(
-        func.date(User.created_at)).all()
+        func.date(User.created_at)))).all()
 
     return {
         "chart_data": [
@@ -266,21 +461,25 @@ async def get_users_chart_data(
                 "date": day.date.isoformat(),
                 "value": day.count
             }
-            for day in daily_registrations
+            for day in downsample(
+                daily_registrations, max_points,
+                y=lambda day: day.count, method=downsampling)
         ],
-        "period_days": days
+        "period_days": days,
+        "source_points": len(daily_registrations)
     }
 
 @router.post("/seed-data")
 async def seed_dashboard_data(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Seed dashboard with sample metrics data for testing.
     """
     # Check if data already exists
-    existing_metrics = db.query(Metric).count()
+    existing_metrics = (await db.execute(
+        select(func.count(Metric.id)))).scalar_one()
     if existing_metrics > 0:
         return {"message": "Data already exists", "count": existing_metrics}
 
@@ -341,6 +540,12 @@ async def seed_dashboard_data(
 
     # Add all metrics to database
     db.add_all(sample_metrics)
-    db.commit()
+    await db.flush()
+    await db.run_sync(RollupService.apply_metrics, sample_metrics)
+    await db.commit()
+    RecentPointsService.record(sample_metrics)
+    summary_snapshot.invalidate()
+    report_cache.note_write(
+        "metrics", [metric.recorded_at for metric in sample_metrics])
 
     return {"message": "Sample data created successfully", "count": len(sample_metrics)}
@@ -3,208 +3,783 @@ Reports routes for generating and managing reports.
 Provides endpoints for report generation, data export, and PDF creation.
 """
 
-from fastapi import APIRouter, Depends, Response
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import Date, select, func, desc, and_
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
-import io
-import csv
 import json
 
-from ..database import get_db
+from ..config import settings
+from ..database import get_async_db
 from ..models.user import User, Role
-from ..models.metrics import Metric
+from ..models.auth_events import AuthEvent, AuthEventType
 from ..models.logs import Log
+from ..services.analytics import AnalyticsService, MetricArrays
+from ..services.analytics import moving_average, rate_of_change, rolling_std
 from ..services.auth_service import get_current_user
+from ..services.principal_cache import Principal
+from ..services.report_engine import ReportEngine
+from ..services.recent_points import RecentPointsService
+from ..schemas.reports import ReportJobCreate
+from ..services.export_service import MetricExportService
+from ..services.log_counters import ERROR_LEVELS, error_totals, log_counters
+from ..services.report_jobs import JobRunner, JobStatus, ReportJob
+from ..services.report_jobs import report_jobs
+from ..services.report_cache import Dependency, align_window, report_cache
+from ..services.rollup_service import to_utc_naive
 
 router = APIRouter()
 
+# Media types of the metrics export formats
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Report templates; the ids are accepted by POST /jobs
+REPORT_TEMPLATES = [
+    {
+        "id": "metrics_summary",
+        "name": "Metrics Summary Report",
+        "description": "Comprehensive metrics analysis with trends",
+        "parameters": ["date_from", "date_to", "type_filter"],
+        "output_formats": ["json"]
+    },
+    {
+        "id": "user_activity",
+        "name": "User Activity Report",
+        "description": "User registration and login analytics",
+        "parameters": ["date_from", "date_to"],
+        "output_formats": ["json"]
+    },
+    {
+        "id": "system_health",
+        "name": "System Health Report",
+        "description": "Error logs and performance metrics analysis",
+        "parameters": ["date_from", "date_to"],
+        "output_formats": ["json"]
+    },
+    {
+        "id": "metrics_export",
+        "name": "Metrics Data Export",
+        "description": "Raw metrics data export in various formats",
+        "parameters": ["date_from", "date_to", "type_filter"],
+        "output_formats": ["csv", "json", "ndjson", "parquet", "arrow"]
+    }
+]
+
 @router.get("/metrics-summary")
 async def get_metrics_summary_report(
     date_from: Optional[datetime] = None,
     date_to: Optional[datetime] = None,
     type_filter: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate metrics summary report with aggregated data.
     """
+    date_from, date_to = _report_window(date_from, date_to, timedelta(days=30))
+    key = ("metrics_summary", date_from, date_to, type_filter)
+    report = await _cached_report(
+        key, [("metrics", date_from, date_to)],
+        lambda: _metrics_summary(db, date_from, date_to, type_filter))
+
+    return {
+        "report_info": {
+            "generated_at": datetime.utcnow().isoformat(),
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "type_filter": type_filter,
+            "generated_by": current_user.username
+        },
+        **report
+    }
+
+@router.get("/user-activity")
+async def get_user_activity_report(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Generate user activity report based on logs and metrics.
+    """
+    date_from, date_to = _report_window(date_from, date_to, timedelta(days=30))
+    key = ("user_activity", date_from, date_to)
+    # Role and status distributions cover all users, whatever the range
+    report = await _cached_report(
+        key, [("users", None, None), ("auth_events", date_from, date_to)],
+        lambda: _user_activity(db, date_from, date_to))
+
+    return {
+        "report_info": {
+            "generated_at": datetime.utcnow().isoformat(),
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "generated_by": current_user.username
+        },
+        **report
+    }
+
+@router.get("/system-health")
+async def get_system_health_report(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Generate system health report based on logs and system metrics.
+    """
+    date_from, date_to = _report_window(date_from, date_to, timedelta(hours=24))
+    key = ("system_health", date_from, date_to)
+    report = await _cached_report(
+        key, [("logs", date_from, date_to), ("metrics", date_from, date_to)],
+        lambda: _system_health(db, date_from, date_to))
+
+    return {
+        "report_info": {
+            "generated_at": datetime.utcnow().isoformat(),
+            "date_from": date_from.isoformat(),
+            "date_to": date_to.isoformat(),
+            "generated_by": current_user.username
+        },
+        **report
+    }
+
+@router.get("/error-rate")
+async def get_error_rate_series(
+    minutes: int = Query(60, ge=1, le=settings.LOG_COUNTER_WINDOW_MINUTES),
+    category: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Per-minute log counts and error rate over the last minutes, from the
+    in-memory log counters; the current minute is the last point.
+    """
+    if not log_counters.loaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Log counters are not loaded yet"
+        )
+    date_to = datetime.utcnow()
+    date_from = date_to - timedelta(minutes=minutes - 1)
+
+    points = []
+    for bucket_start, counts in log_counters.series(date_from, date_to):
+        total, errors = error_totals(counts, category)
+        points.append({
+            "bucket_start": bucket_start.isoformat(),
+            "total_logs": total,
+            "error_logs": errors,
+            "error_rate_percentage": round(
+                errors / total * 100, 2) if total else 0.0
+        })
+    total, errors = error_totals(
+        log_counters.counts(date_from, date_to), category)
+
+    return {
+        "minutes": minutes,
+        "category": category,
+        "total_logs": total,
+        "error_logs": errors,
+        "error_rate_percentage": round(
+            errors / total * 100, 2) if total else 0.0,
+        "points": points
+    }
+
+@router.get("/analytics/moving-average")
+async def get_moving_average(
+    window: int = Query(10, ge=1, le=10000),
+    name: Optional[str] = None,
+    type_filter: Optional[str] = None,
+    source_filter: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Trailing moving average over the matching metrics in time order.
+    Filter to a single series for meaningful windows.
+    """
+    arrays, date_from, date_to = await _analytics_arrays(
+        db, date_from, date_to, name, type_filter, source_filter)
+    return {
+        **_analytics_info(date_from, date_to, name, type_filter,
+                          source_filter, len(arrays)),
+        "window": window,
+        "points": AnalyticsService.points(
+            arrays, moving_average(arrays.values, window), "moving_average",
+            max_points)
+    }
+
+@router.get("/analytics/rolling-stddev")
+async def get_rolling_stddev(
+    window: int = Query(10, ge=2, le=10000),
+    name: Optional[str] = None,
+    type_filter: Optional[str] = None,
+    source_filter: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Trailing population standard deviation over the matching metrics.
+    """
+    arrays, date_from, date_to = await _analytics_arrays(
+        db, date_from, date_to, name, type_filter, source_filter)
+    return {
+        **_analytics_info(date_from, date_to, name, type_filter,
+                          source_filter, len(arrays)),
+        "window": window,
+        "points": AnalyticsService.points(
+            arrays, rolling_std(arrays.values, window), "rolling_stddev",
+            max_points)
+    }
+
+@router.get("/analytics/rate-of-change")
+async def get_rate_of_change(
+    name: Optional[str] = None,
+    type_filter: Optional[str] = None,
+    source_filter: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=3, le=10000),
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Change per second between consecutive matching metrics.
+    """
+    arrays, date_from, date_to = await _analytics_arrays(
+        db, date_from, date_to, name, type_filter, source_filter)
+    return {
+        **_analytics_info(date_from, date_to, name, type_filter,
+                          source_filter, len(arrays)),
+        "points": AnalyticsService.points(
+            arrays, rate_of_change(arrays.seconds, arrays.values),
+            "rate_per_second", max_points)
+    }
+
+@router.get("/analytics/histogram")
+async def get_value_histogram(
+    bins: int = Query(20, ge=1, le=1000),
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    name: Optional[str] = None,
+    type_filter: Optional[str] = None,
+    source_filter: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Histogram of the matching metric values in equal-width bins.
+    Without min_value and max_value the bins span the observed values.
+    """
+    if (min_value is None) != (max_value is None) or \
+            (min_value is not None and min_value >= max_value):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give both min_value and max_value, with min below max"
+        )
+    arrays, date_from, date_to = await _analytics_arrays(
+        db, date_from, date_to, name, type_filter, source_filter)
+    value_range = (min_value, max_value) if min_value is not None else None
+    return {
+        **_analytics_info(date_from, date_to, name, type_filter,
+                          source_filter, len(arrays)),
+        **AnalyticsService.histogram(arrays, bins, value_range)
+    }
+
+@router.get("/analytics/anomalies")
+async def get_anomalies(
+    threshold: float = Query(3.0, gt=0),
+    per_series: bool = True,
+    name: Optional[str] = None,
+    type_filter: Optional[str] = None,
+    source_filter: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Metrics whose absolute z-score reaches the threshold.
+    Scores are computed within each (name, type, source) series unless
+    per_series is false.
+    """
+    arrays, date_from, date_to = await _analytics_arrays(
+        db, date_from, date_to, name, type_filter, source_filter)
+    anomalies = AnalyticsService.anomalies(arrays, threshold, per_series)
+    return {
+        **_analytics_info(date_from, date_to, name, type_filter,
+                          source_filter, len(arrays)),
+        "threshold": threshold,
+        "anomalies": anomalies,
+        "total_anomalies": len(anomalies)
+    }
+
+@router.get("/export/csv")
+async def export_metrics_csv(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    type_filter: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Export metrics data as CSV file.
+    Rows are streamed from a server-side cursor in batches, so memory
+    use does not grow with the size of the export.
+    """
     # Default date range (last 30 days)
     if not date_from:
         date_from = datetime.utcnow() - timedelta(days=30)
     if not date_to:
         date_to = datetime.utcnow()
 
-    query = db.query(Metric).filter(
-        and_(
-            Metric.recorded_at >= date_from,
-            Metric.recorded_at <= date_to
+    query = MetricExportService.export_query(date_from, date_to, type_filter)
+
+    filename = f"metrics_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+
+    return StreamingResponse(
+        MetricExportService.iter_csv(query, settings.EXPORT_BATCH_SIZE),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get("/export/json")
+async def export_metrics_json(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    type_filter: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Export metrics data as JSON file.
+    Streamed from a server-side cursor: the json format sends export_info
+    first and total_records after the metrics array; ndjson sends an
+    export_info line, one line per metric and a total_records line.
+    """
+    # Default date range (last 30 days)
+    if not date_from:
+        date_from = datetime.utcnow() - timedelta(days=30)
+    if not date_to:
+        date_to = datetime.utcnow()
+
+    query = MetricExportService.export_query(date_from, date_to, type_filter)
+    export_info = _export_info(date_from, date_to, type_filter, current_user)
+
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    if format == "ndjson":
+        content = MetricExportService.iter_ndjson(
+            query, settings.EXPORT_BATCH_SIZE, export_info)
+        media_type = "application/x-ndjson"
+        filename = f"metrics_export_{timestamp}.ndjson"
+    else:
+        content = MetricExportService.iter_json(
+            query, settings.EXPORT_BATCH_SIZE, export_info)
+        media_type = "application/json"
+        filename = f"metrics_export_{timestamp}.json"
+
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get("/export/parquet")
+async def export_metrics_parquet(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    type_filter: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Export metrics data as a Parquet file.
+    Name, type, unit and source are dictionary-encoded; each row group is
+    sent as soon as it is written.
+    """
+    if not MetricExportService.columnar_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow"
         )
+
+    # Default date range (last 30 days)
+    if not date_from:
+        date_from = datetime.utcnow() - timedelta(days=30)
+    if not date_to:
+        date_to = datetime.utcnow()
+
+    query = MetricExportService.export_query(date_from, date_to, type_filter)
+
+    filename = f"metrics_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.parquet"
+
+    return StreamingResponse(
+        MetricExportService.iter_parquet(
+            query, settings.EXPORT_BATCH_SIZE,
+            settings.EXPORT_PARQUET_ROW_GROUP_SIZE),
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-    if type_filter:
-        query = query.filter(Metric.type == type_filter)
-
-    # Get basic statistics
-    total_metrics = query.count()
-
-    # Aggregate by type
-    type_aggregation = db.query(
-        Metric.type,
-        func.count(Metric.id).label('count'),
-        func.avg(Metric.value).label('avg_value'),
-        func.min(Metric.value).label('min_value'),
-        func.max(Metric.value).label('max_value'),
-        func.sum(Metric.value).label('total_value')
-    ).filter(
-        and_(
-            Metric.recorded_at >= date_from,
-            Metric.recorded_at <= date_to
+@router.get("/export/arrow")
+async def export_metrics_arrow(
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    type_filter: Optional[str] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Export metrics data as an Arrow IPC stream.
+    Each batch read from the server-side cursor is sent as one record
+    batch with dictionary-encoded name, type, unit and source columns.
+    """
+    if not MetricExportService.columnar_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Arrow export requires pyarrow"
         )
+
+    # Default date range (last 30 days)
+    if not date_from:
+        date_from = datetime.utcnow() - timedelta(days=30)
+    if not date_to:
+        date_to = datetime.utcnow()
+
+    query = MetricExportService.export_query(date_from, date_to, type_filter)
+
+    filename = f"metrics_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.arrow"
+
+    return StreamingResponse(
+        MetricExportService.iter_arrow(query, settings.EXPORT_BATCH_SIZE),
+        media_type="application/vnd.apache.arrow.stream",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
-    if type_filter:
-        type_aggregation = type_aggregation.filter(Metric.type == type_filter)
+@router.get("/templates")
+async def get_report_templates(
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Get available report templates and their configurations.
+    """
+    return {
+        "templates": REPORT_TEMPLATES,
+        "total_templates": len(REPORT_TEMPLATES)
+    }
+
+@router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_report_job(
+    job_data: ReportJobCreate,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Run a report template in the background.
+    Returns the job to poll; an identical job of the same user that is
+    still queued or running is returned instead of starting another one.
+    """
+    template = next((template for template in REPORT_TEMPLATES
+                     if template["id"] == job_data.template_id), None)
+    if template is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report template not found"
+        )
+    output_format = job_data.format or template["output_formats"][0]
+    if output_format not in template["output_formats"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Format must be one of: "
+                   f"{', '.join(template['output_formats'])}"
+        )
+    parameters = job_data.parameters.dict(exclude_none=True)
+    unsupported = set(parameters) - set(template["parameters"])
+    if unsupported:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported parameters: {', '.join(sorted(unsupported))}"
+        )
 
-    type_stats = type_aggregation.group_by(Metric.type).all()
+    runner, media_type = _job_runner(
+        template["id"], output_format, parameters, current_user)
+    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+    key = (current_user.id, template["id"], output_format,
+           tuple(sorted(parameters.items())))
+    job, created = report_jobs.submit(
+        key, runner, template["id"], {**parameters, "format": output_format},
+        filename=f"{template['id']}_{timestamp}.{output_format}",
+        media_type=media_type, created_by=current_user.username)
+
+    return {**job.to_dict(), "deduplicated": not created}
+
+@router.get("/jobs/{job_id}")
+async def get_report_job(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Get the status and progress of a report job.
+    """
+    return _get_job(job_id, current_user).to_dict()
 
-    # Get daily trends
-    daily_trends = db.query(
-        func.date(Metric.recorded_at).label('date'),
-        func.count(Metric.id).label('count'),
-        func.avg(Metric.value).label('avg_value')
-    ).filter(
-        and_(
-            Metric.recorded_at >= date_from,
-            Metric.recorded_at <= date_to
+@router.get("/jobs/{job_id}/result")
+async def get_report_job_result(
+    job_id: str,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Download the result of a completed report job.
+    """
+    job = _get_job(job_id, current_user)
+    if job.status != JobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=job.error if job.status == JobStatus.FAILED
+            else f"Report job is {job.status.value}"
         )
-    )
 
-    if type_filter:
-        daily_trends = daily_trends.filter(Metric.type == type_filter)
+    return FileResponse(job.path, media_type=job.media_type,
+                        filename=job.filename)
 
-    daily_data = daily_trends.group_by(func.date(Metric.recorded_at)).order_by(func.date(Metric.recorded_at)).all()
 
-    # Get top sources
-    top_sources = db.query(
-        Metric.source,
-        func.count(Metric.id).label('count')
-    ).filter(
-        and_(
-            Metric.recorded_at >= date_from,
-            Metric.recorded_at <= date_to
+def _get_job(job_id: str, current_user: Principal) -> ReportJob:
+    """A job visible to the user: their own, or any job for admins."""
+    job = report_jobs.get(job_id)
+    if job is None or (job.created_by != current_user.username
+                       and current_user.role_name != "admin"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Report job not found"
         )
-    )
+    return job
 
-    if type_filter:
-        top_sources = top_sources.filter(Metric.type == type_filter)
 
-    source_stats = top_sources.group_by(Metric.source).order_by(desc(func.count(Metric.id))).limit(10).all()
+def _export_info(date_from: datetime, date_to: datetime,
+                 type_filter: Optional[str],
+                 user: Principal) -> Dict[str, Any]:
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "type_filter": type_filter,
+        "exported_by": user.username
+    }
+
+
+def _job_runner(template_id: str, output_format: str,
+                parameters: Dict[str, Any], user: Principal
+                ) -> Tuple[JobRunner, str]:
+    """Build the runner producing a template's output, and its media type."""
+    if template_id != "metrics_export":
+        report = {
+            "metrics_summary": get_metrics_summary_report,
+            "user_activity": get_user_activity_report,
+            "system_health": get_system_health_report,
+        }[template_id]
+
+        async def run_report(session_factory):
+            async with session_factory() as db:
+                data = await report(current_user=user, db=db, **{
+                    "date_from": None, "date_to": None, **parameters})
+            yield json.dumps(jsonable_encoder(data))
+
+        return run_report, "application/json"
+
+    if output_format in ("parquet", "arrow") and \
+            not MetricExportService.columnar_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"{output_format.capitalize()} export requires pyarrow"
+        )
+    # Default date range (last 30 days)
+    date_from = parameters.get("date_from") or (
+        datetime.utcnow() - timedelta(days=30))
+    date_to = parameters.get("date_to") or datetime.utcnow()
+    type_filter = parameters.get("type_filter")
+    query = MetricExportService.export_query(date_from, date_to, type_filter)
+    batch_size = settings.EXPORT_BATCH_SIZE
+
+    def run_export(session_factory):
+        if output_format == "csv":
+            return MetricExportService.iter_csv(
+                query, batch_size, session_factory)
+        if output_format in ("json", "ndjson"):
+            encode = (MetricExportService.iter_json if output_format == "json"
+                      else MetricExportService.iter_ndjson)
+            return encode(query, batch_size, _export_info(
+                date_from, date_to, type_filter, user), session_factory)
+        if output_format == "parquet":
+            return MetricExportService.iter_parquet(
+                query, batch_size, settings.EXPORT_PARQUET_ROW_GROUP_SIZE,
+                session_factory)
+        return MetricExportService.iter_arrow(
+            query, batch_size, session_factory)
+
+    return run_export, EXPORT_MEDIA_TYPES[output_format]
+
+
+def _report_window(date_from: Optional[datetime], date_to: Optional[datetime],
+                   default_span: timedelta) -> Tuple[datetime, datetime]:
+    """
+    Normalize a report range to naive UTC. Missing bounds default to the
+    last default_span up to now, with now aligned to
+    REPORT_WINDOW_ALIGN_SECONDS so default windows repeat and their
+    results can be shared.
+    """
+    now = align_window(datetime.utcnow(), settings.REPORT_WINDOW_ALIGN_SECONDS)
+    date_to = to_utc_naive(date_to) if date_to else now
+    date_from = to_utc_naive(date_from) if date_from else now - default_span
+    return date_from, date_to
+
+
+async def _cached_report(key: Tuple, dependencies: List[Dependency],
+                         compute: Callable[[], Awaitable[Dict[str, Any]]]
+                         ) -> Dict[str, Any]:
+    """Return a cached report body, computing and caching it on a miss."""
+    if not report_cache.enabled:
+        return await compute()
+    report = report_cache.get(key[0], key)
+    if report is None:
+        generations = report_cache.generations(
+            {table for table, _, _ in dependencies})
+        report = await compute()
+        report_cache.put(key, report, dependencies, generations)
+    return report
+
+
+async def _analytics_arrays(db: AsyncSession, date_from: Optional[datetime],
+                            date_to: Optional[datetime], name: Optional[str],
+                            type_filter: Optional[str],
+                            source: Optional[str]
+                            ) -> Tuple[MetricArrays, datetime, datetime]:
+    """Load an analytics range (default: the last 7 days) into arrays."""
+    if not AnalyticsService.available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Analytics require numpy"
+        )
+    date_from, date_to = _report_window(date_from, date_to, timedelta(days=7))
+    arrays = await db.run_sync(
+        AnalyticsService.load, date_from, date_to, name=name,
+        type_filter=type_filter, source=source,
+        max_rows=settings.ANALYTICS_MAX_ROWS)
+    return arrays, date_from, date_to
+
+
+def _analytics_info(date_from: datetime, date_to: datetime,
+                    name: Optional[str], type_filter: Optional[str],
+                    source: Optional[str], count: int) -> Dict[str, Any]:
+    return {
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "filters": {"name": name, "type": type_filter, "source": source},
+        "total_points": count
+    }
+
+
+async def _metrics_summary(db: AsyncSession, date_from: datetime,
+                           date_to: datetime,
+                           type_filter: Optional[str]) -> Dict[str, Any]:
+    """Metrics summary body: type statistics, daily trends, top sources."""
+    # One grouped read answers every section
+    summary = await db.run_sync(
+        ReportEngine.metrics_summary, date_from, date_to, type_filter)
 
     return {
-        "report_info": {
-            "generated_at": datetime.utcnow().isoformat(),
-            "date_from": date_from.isoformat(),
-            "date_to": date_to.isoformat(),
-            "type_filter": type_filter,
-            "generated_by": current_user.username
-        },
         "summary": {
-            "total_metrics": total_metrics,
+            "total_metrics": summary.total,
             "date_range_days": (date_to - date_from).days
         },
         "type_statistics": [
             {
-                "type": stat.type,
+                "type": metric_type,
                 "count": stat.count,
-                "avg_value": round(float(stat.avg_value or 0), 2),
-                "min_value": float(stat.min_value or 0),
-                "max_value": float(stat.max_value or 0),
-                "total_value": float(stat.total_value or 0)
+                "avg_value": round(stat.mean, 2),
+                "min_value": stat.minimum or 0.0,
+                "max_value": stat.maximum or 0.0,
+                "total_value": stat.total
             }
-            for stat in type_stats
+            for metric_type, stat in sorted(summary.by_type.items())
         ],
         "daily_trends": [
             {
-                "date": trend.date.isoformat(),
+                "date": day.isoformat(),
                 "count": trend.count,
-                "avg_value": round(float(trend.avg_value or 0), 2)
+                "avg_value": round(trend.mean, 2)
             }
-            for trend in daily_data
+            for day, trend in sorted(summary.by_day.items())
         ],
         "top_sources": [
             {
-                "source": source.source or "Unknown",
-                "count": source.count
+                "source": source or "Unknown",
+                "count": stat.count
             }
-            for source in source_stats
+            for source, stat in summary.top_sources(10)
         ]
     }
 
-@router.get("/user-activity")
-async def get_user_activity_report(
-    date_from: Optional[datetime] = None,
-    date_to: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Generate user activity report based on logs and metrics.
-    """
-    # Default date range (last 30 days)
-    if not date_from:
-        date_from = datetime.utcnow() - timedelta(days=30)
-    if not date_to:
-        date_to = datetime.utcnow()
 
+async def _user_activity(db: AsyncSession, date_from: datetime,
+                         date_to: datetime) -> Dict[str, Any]:
+    """User activity body: registrations, logins, roles and statuses."""
     # User registration trends
-    user_registrations = db.query(
-        func.date(User.created_at).label('date'),
+    # type_=Date: SQLite's date() returns text, which Date parses
+    registration_date = func.date(User.created_at, type_=Date)
+    user_registrations = (await db.execute(select(
+        registration_date.label('date'),
         func.count(User.id).label('count')
-    ).filter(
+    ).where(
         and_(
             User.created_at >= date_from,
             User.created_at <= date_to
         )
-    ).group_by(func.date(User.created_at)).order_by(func.date(User.created_at)).all()
-
-    # User login activity (from logs)
-    login_activity = db.query(
-        func.date(Log.created_at).label('date'),
-        func.count(Log.id).label('count')
-    ).filter(
+    ).group_by(registration_date).order_by(registration_date))).all()
+
+    # User login activity, read through the (event_type, created_at) index
+    login_date = func.date(AuthEvent.created_at, type_=Date)
+    login_activity = (await db.execute(select(
+        login_date.label('date'),
+        func.count(AuthEvent.id).label('count')
+    ).where(
         and_(
-            Log.category == "auth",
-            Log.message.ilike("%login%"),
-            Log.created_at >= date_from,
-            Log.created_at <= date_to
+            AuthEvent.event_type == AuthEventType.LOGIN_SUCCESS.value,
+            AuthEvent.created_at >= date_from,
+            AuthEvent.created_at <= date_to
         )
-    ).group_by(func.date(Log.created_at)).order_by(func.date(Log.created_at)).all()
+    ).group_by(login_date).order_by(login_date))).all()
 
     # Active users by role
-    role_subquery = db.query(Role.name).filter(
+    role_subquery = select(Role.name).where(
         Role.id == User.role_id).scalar_subquery()
-    users_by_role = db.query(
+    users_by_role = (await db.execute(select(
         func.coalesce(func.nullif(role_subquery, ''), 'No Role').label('role'),
         func.count(User.id).label('count')
-    ).filter(User.is_active.is_(True)).group_by(User.role_id).all()
+    ).where(User.is_active.is_(True)).group_by(User.role_id))).all()
 
     # User status distribution
-    user_status_dist = db.query(
+    user_status_dist = (await db.execute(select(
         User.is_active,
         User.is_verified,
         func.count(User.id).label('count')
-    ).group_by(User.is_active, User.is_verified).all()
+    ).group_by(User.is_active, User.is_verified))).all()
 
     return {
-        "report_info": {
-            "generated_at": datetime.utcnow().isoformat(),
-            "date_from": date_from.isoformat(),
-            "date_to": date_to.isoformat(),
-            "generated_by": current_user.username
-        },
         "registration_trends": [
             {
                 "date": reg.date.isoformat(),
@@ -236,66 +811,50 @@ async def get_user_activity_report(
         ]
     }
 
-@router.get("/system-health")
-async def get_system_health_report(
-    date_from: Optional[datetime] = None,
-    date_to: Optional[datetime] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Generate system health report based on logs and system metrics.
-    """
-    # Default date range (last 24 hours)
-    if not date_from:
-        date_from = datetime.utcnow() - timedelta(hours=24)
-    if not date_to:
-        date_to = datetime.utcnow()
 
-    # Error logs count
-    error_logs = db.query(func.count(Log.id)).filter(
-        and_(
-            Log.level.in_(["error", "critical"]),
-            Log.created_at >= date_from,
-            Log.created_at <= date_to
-        )
-    ).scalar()
-
-    # Total logs count
-    total_logs = db.query(func.count(Log.id)).filter(
-        and_(
-            Log.created_at >= date_from,
-            Log.created_at <= date_to
-        )
-    ).scalar()
+async def _system_health(db: AsyncSession, date_from: datetime,
+                         date_to: datetime) -> Dict[str, Any]:
+    """System health body: error rate, recent errors, performance."""
+    if log_counters.covers(date_from):
+        # Summed from the per-minute counters, to the minute
+        total_logs, error_logs = error_totals(
+            log_counters.counts(date_from, date_to))
+    else:
+        # Error logs count
+        error_logs = (await db.execute(select(func.count(Log.id)).where(
+            and_(
+                Log.level.in_(ERROR_LEVELS),
+                Log.created_at >= date_from,
+                Log.created_at <= date_to
+            )
+        ))).scalar()
+
+        # Total logs count
+        total_logs = (await db.execute(select(func.count(Log.id)).where(
+            and_(
+                Log.created_at >= date_from,
+                Log.created_at <= date_to
+            )
+        ))).scalar()
 
     # Recent error logs
-    recent_errors = db.query(Log).filter(
+    recent_errors = (await db.execute(select(Log).where(
         and_(
-            Log.level.in_(["error", "critical"]),
+            Log.level.in_(ERROR_LEVELS),
             Log.created_at >= date_from,
             Log.created_at <= date_to
         )
-    ).order_by(desc(Log.created_at)).limit(10).all()
+    ).order_by(desc(Log.created_at)).limit(10))).scalars().all()
 
     # System metrics
-    performance_metrics = db.query(Metric).filter(
-        and_(
-            Metric.type == "performance",
-            Metric.recorded_at >= date_from,
-            Metric.recorded_at <= date_to
-        )
-    ).order_by(desc(Metric.recorded_at)).limit(10).all()
+    performance_metrics = await db.run_sync(
+        RecentPointsService.latest, 10, type="performance",
+        since=date_from, until=date_to
+    )
 
     error_rate = (error_logs / total_logs * 100) if total_logs > 0 else 0
 
     return {
-        "report_info": {
-            "generated_at": datetime.utcnow().isoformat(),
-            "date_from": date_from.isoformat(),
-            "date_to": date_to.isoformat(),
-            "generated_by": current_user.username
-        },
         "summary": {
             "total_logs": total_logs,
             "error_logs": error_logs,
@@ -322,177 +881,3 @@ async def get_system_health_report(
             for metric in performance_metrics
         ]
     }
-
-@router.get("/export/csv")
-async def export_metrics_csv(
-    date_from: Optional[datetime] = None,
-    date_to: Optional[datetime] = None,
-    type_filter: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Export metrics data as CSV file.
-    """
-    # Default date range (last 30 days)
-    if not date_from:
-        date_from = datetime.utcnow() - timedelta(days=30)
-    if not date_to:
-        date_to = datetime.utcnow()
-
-    query = db.query(Metric).filter(
-        and_(
-            Metric.recorded_at >= date_from,
-            Metric.recorded_at <= date_to
-        )
-    )
-
-    if type_filter:
-        query = query.filter(Metric.type == type_filter)
-
-    metrics = query.order_by(desc(Metric.recorded_at)).all()
-
-    # Create CSV content
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # Write header
-    writer.writerow([
-        'ID', 'Name', 'Type', 'Value', 'Unit', 'Description',
-        'Source', 'Recorded At', 'Created At'
-    ])
-
-    # Write data
-    for metric in metrics:
-        writer.writerow([
-            metric.id,
-            metric.name,
-            metric.type,
-            metric.value,
-            metric.unit or '',
-            metric.description or '',
-            metric.source or '',
-            metric.recorded_at.isoformat(),
-            metric.created_at.isoformat()
-        ])
-
-    # Prepare response
-    content = output.getvalue()
-    output.close()
-
-    filename = f"metrics_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-
-    return Response(
-        content=content,
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
-
-@router.get("/export/json")
-async def export_metrics_json(
-    date_from: Optional[datetime] = None,
-    date_to: Optional[datetime] = None,
-    type_filter: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """
-    Export metrics data as JSON file.
-    """
-    # Default date range (last 30 days)
-    if not date_from:
-        date_from = datetime.utcnow() - timedelta(days=30)
-    if not date_to:
-        date_to = datetime.utcnow()
-
-    query = db.query(Metric).filter(
-        and_(
-            Metric.recorded_at >= date_from,
-            Metric.recorded_at <= date_to
-        )
-    )
-
-    if type_filter:
-        query = query.filter(Metric.type == type_filter)
-
-    metrics = query.order_by(desc(Metric.recorded_at)).all()
-
-    # Prepare data
-    data = {
-        "export_info": {
-            "generated_at": datetime.utcnow().isoformat(),
-            "date_from": date_from.isoformat(),
-            "date_to": date_to.isoformat(),
-            "type_filter": type_filter,
-            "total_records": len(metrics),
-            "exported_by": current_user.username
-        },
-        "metrics": [
-            {
-                "id": metric.id,
-                "name": metric.name,
-                "type": metric.type,
-                "value": metric.value,
-                "unit": metric.unit,
-                "description": metric.description,
-                "source": metric.source,
-                "recorded_at": metric.recorded_at.isoformat(),
-                "created_at": metric.created_at.isoformat()
-            }
-            for metric in metrics
-        ]
-    }
-
-    # Convert to JSON
-    content = json.dumps(data, indent=2)
-
-    filename = f"metrics_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.json"
-
-    return Response(
-        content=content,
-        media_type="application/json",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
-
-@router.get("/templates")
-async def get_report_templates(
-    current_user: User = Depends(get_current_user)
-):
-    """
-    Get available report templates and their configurations.
-    """
-    templates = [
-        {
-            "id": "metrics_summary",
-            "name": "Metrics Summary Report",
-            "description": "Comprehensive metrics analysis with trends",
-            "parameters": ["date_from", "date_to", "type_filter"],
-            "output_formats": ["json"]
-        },
-        {
-            "id": "user_activity",
-            "name": "User Activity Report",
-            "description": "User registration and login analytics",
-            "parameters": ["date_from", "date_to"],
-            "output_formats": ["json"]
-        },
-        {
-            "id": "system_health",
-            "name": "System Health Report",
-            "description": "Error logs and performance metrics analysis",
-            "parameters": ["date_from", "date_to"],
-            "output_formats": ["json"]
-        },
-        {
-            "id": "metrics_export",
-            "name": "Metrics Data Export",
-            "description": "Raw metrics data export in various formats",
-            "parameters": ["date_from", "date_to", "type_filter"],
-            "output_formats": ["csv", "json"]
-        }
-    ]
-
-    return {
-        "templates": templates,
-        "total_templates": len(templates)
-    }
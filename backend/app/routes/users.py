@@ -4,15 +4,19 @@ Handles CRUD operations for user management (admin-only endpoints).
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import math
 
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User, Role
 from ..schemas.user import UserCreate, UserUpdate, UserResponse, RoleResponse
 from ..schemas.user import UserListResponse
 from ..services.auth_service import get_current_admin_user, AuthService
+from ..services.dashboard_service import summary_snapshot
+from ..services.principal_cache import Principal, principal_cache
+from ..services.report_cache import report_cache
 
 router = APIRouter()
 
@@ -23,34 +27,36 @@ async def get_users(
     search: Optional[str] = None,
     role_filter: Optional[str] = None,
     is_active: Optional[bool] = None,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get paginated list of users (admin only).
     """
-    query = db.query(User)
+    query = select(User)
 
     # Apply filters
     if search:
-        query = query.filter(
+        query = query.where(
             (User.email.ilike(f"%{search}%")) |
             (User.username.ilike(f"%{search}%")) |
             (User.full_name.ilike(f"%{search}%"))
         )
 
     if role_filter:
-        query = query.join(Role).filter(Role.name == role_filter)
+        query = query.join(Role).where(Role.name == role_filter)
 
     if is_active is not None:
-        query = query.filter(User.is_active == is_active)
+        query = query.where(User.is_active == is_active)
 
     # Get total count
-    total = query.count()
+    total = (await db.execute(
+        select(func.count()).select_from(query.subquery()))).scalar_one()
 
     # Apply pagination
     offset = (page - 1) * per_page
-    users = query.offset(offset).limit(per_page).all()
+    users = (await db.execute(
+        query.offset(offset).limit(per_page))).scalars().all()
 
     # Calculate pagination info
     total_pages = math.ceil(total / per_page)
@@ -69,13 +75,13 @@ async def get_users(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get user by ID (admin only).
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -86,21 +92,22 @@ async def get_user(
 @router.post("/", response_model=UserResponse)
 async def create_user(
     user_data: UserCreate,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Create new user (admin only).
     """
     # Check if user already exists
-    if AuthService.get_user_by_email(db, user_data.email):
+    if await AuthService.get_user_by_email(db, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
 
     # Check if username already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
+    existing_user = (await db.execute(select(User).where(
+        User.username == user_data.username))).scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -109,7 +116,7 @@ async def create_user(
 
     # Get role or default to user role
     if user_data.role_id:
-        role = db.query(Role).filter(Role.id == user_data.role_id).first()
+        role = await db.get(Role, user_data.role_id)
         if not role:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -118,17 +125,19 @@ async def create_user(
         role_id = role.id
     else:
         # Get default user role
-        user_role = db.query(Role).filter(Role.name == "user").first()
+        user_role = (await db.execute(select(Role).where(
+            Role.name == "user"))).scalars().first()
         if not user_role:
             # Create default user role if it doesn't exist
             user_role = Role(name="user", description="Standard user role")
             db.add(user_role)
-            db.commit()
-            db.refresh(user_role)
+            await db.commit()
+            await db.refresh(user_role)
         role_id = user_role.id
 
     # Create new user
-    hashed_password = AuthService.get_password_hash(user_data.password)
+    hashed_password = await AuthService.get_password_hash_async(
+        user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -140,8 +149,10 @@ async def create_user(
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    summary_snapshot.invalidate()
+    report_cache.note_write("users")
+    await db.refresh(new_user)
 
     return new_user
 
@@ -149,13 +160,13 @@ async def create_user(
 async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Update user (admin only).
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -164,7 +175,8 @@ async def update_user(
 
     # Check email uniqueness if email is being updated
     if user_data.email and user_data.email != user.email:
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        existing_user = await AuthService.get_user_by_email(
+            db, user_data.email)
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -173,7 +185,8 @@ async def update_user(
 
     # Check username uniqueness if username is being updated
     if user_data.username and user_data.username != user.username:
-        existing_user = db.query(User).filter(User.username == user_data.username).first()
+        existing_user = (await db.execute(select(User).where(
+            User.username == user_data.username))).scalars().first()
         if existing_user:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -182,7 +195,7 @@ async def update_user(
 
     # Check role validity if role is being updated
     if user_data.role_id:
-        role = db.query(Role).filter(Role.id == user_data.role_id).first()
+        role = await db.get(Role, user_data.role_id)
         if not role:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -194,21 +207,24 @@ async def update_user(
     for field, value in update_data.items():
         setattr(user, field, value)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    principal_cache.invalidate(user_id)
+    summary_snapshot.invalidate()
+    report_cache.note_write("users")
+    await db.refresh(user)
 
     return user
 
 @router.delete("/{user_id}")
 async def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Delete user (admin only).
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -222,32 +238,35 @@ async def delete_user(
             detail="Cannot delete your own account"
         )
 
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    principal_cache.invalidate(user_id)
+    summary_snapshot.invalidate()
+    report_cache.note_write("users")
 
     return {"message": "User deleted successfully"}
 
 @router.get("/roles/", response_model=list[RoleResponse])
 async def get_roles(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get all available roles (admin only).
     """
-    roles = db.query(Role).all()
+    roles = (await db.execute(select(Role))).scalars().all()
     return roles
 
 @router.post("/{user_id}/activate")
 async def activate_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Activate user account (admin only).
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -255,20 +274,23 @@ async def activate_user(
         )
 
     user.is_active = True
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user_id)
+    summary_snapshot.invalidate()
+    report_cache.note_write("users")
 
     return {"message": "User activated successfully"}
 
 @router.post("/{user_id}/deactivate")
 async def deactivate_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Deactivate user account (admin only).
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -283,6 +305,9 @@ async def deactivate_user(
         )
 
     user.is_active = False
-    db.commit()
+    await db.commit()
+    principal_cache.invalidate(user_id)
+    summary_snapshot.invalidate()
+    report_cache.note_write("users")
 
     return {"message": "User deactivated successfully"}
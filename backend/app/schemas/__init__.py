@@ -7,10 +7,12 @@ from .auth import Token, TokenData, UserLogin, UserRegister
 from .user import UserBase, UserCreate, UserUpdate, UserResponse, RoleResponse
 from .metrics import MetricBase, MetricCreate, MetricUpdate, MetricResponse
 from .logs import LogBase, LogCreate, LogResponse
+from .reports import ReportJobParameters, ReportJobCreate
 
 __all__ = [
     "Token", "TokenData", "UserLogin", "UserRegister",
     "UserBase", "UserCreate", "UserUpdate", "UserResponse", "RoleResponse",
     "MetricBase", "MetricCreate", "MetricUpdate", "MetricResponse",
-    "LogBase", "LogCreate", "LogResponse"
+    "LogBase", "LogCreate", "LogResponse",
+    "ReportJobParameters", "ReportJobCreate"
 ]
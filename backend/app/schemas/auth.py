@@ -55,6 +55,11 @@ class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
 
+class LogoutRequest(BaseModel):
+    """Schema for logout request."""
+    refresh_token: Optional[str] = None
+
+
 class PasswordChangeRequest(BaseModel):
     """Schema for password change request."""
     current_password: str
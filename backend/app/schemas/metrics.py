@@ -67,11 +67,27 @@ class MetricResponse(MetricBase):
 class MetricListResponse(BaseModel):
     """Schema for paginated metrics list response."""
     metrics: list[MetricResponse]
-    total: int
-    page: int
+    total: Optional[int] = None  # Omitted unless requested in cursor mode
+    total_is_estimate: bool = False
+    page: Optional[int] = None  # Only set in page/offset mode
     per_page: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None
+
+
+class MetricBatchError(BaseModel):
+    """Schema for a rejected row of a metric batch."""
+    index: int  # Position of the row in the request body
+    error: str
+
+
+class MetricBatchResponse(BaseModel):
+    """Schema for metric batch ingestion result."""
+    received: int  # Rows that decoded as JSON
+    accepted: int
+    rejected: int
+    errors: list[MetricBatchError]
 
 
 class DashboardSummary(BaseModel):
@@ -80,5 +96,6 @@ class DashboardSummary(BaseModel):
     active_users: int
     total_revenue: float
     performance_score: float
+    error_rate_percentage: float = 0.0  # Over the log counter window
     system_health: str
     recent_metrics: list[MetricResponse]
@@ -0,0 +1,25 @@
+"""
+Report schemas for background report jobs.
+Pydantic models for submitting report jobs.
+"""
+
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+
+class ReportJobParameters(BaseModel):
+    """Parameters accepted by the report templates."""
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+    type_filter: Optional[str] = None
+
+    class Config:
+        extra = "forbid"
+
+
+class ReportJobCreate(BaseModel):
+    """Schema for report job submission."""
+    template_id: str
+    format: Optional[str] = None  # Defaults to the template's first format
+    parameters: ReportJobParameters = ReportJobParameters()
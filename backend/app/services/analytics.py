@@ -0,0 +1,294 @@
+"""
+Analytics service for metric series.
+Loads a filtered metric range into contiguous NumPy arrays (timestamps,
+values and integer codes for name, type and source) and computes moving
+averages, rolling standard deviations, rates of change, histograms and
+z-score anomalies as array operations rather than per-row Python loops.
+Requires the optional numpy package.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.metrics import Metric
+from .downsampling import lttb_indices
+from .rollup_service import to_utc_naive
+
+try:
+    import numpy as np
+except ImportError:  # Analytics are disabled without numpy
+    np = None
+
+
+@dataclass
+class MetricArrays:
+    """
+    A metric range in columnar form, ordered by time.
+    Codes index into the matching labels; a missing source is None.
+    """
+    timestamps: "np.ndarray"  # datetime64[us], naive UTC
+    values: "np.ndarray"  # float64
+    name_codes: "np.ndarray"  # int32
+    type_codes: "np.ndarray"
+    source_codes: "np.ndarray"
+    names: List[str]
+    types: List[str]
+    sources: List[Optional[str]]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    @property
+    def seconds(self) -> "np.ndarray":
+        """Timestamps as float seconds since the epoch."""
+        return self.timestamps.astype("int64") / 1e6
+
+    @property
+    def series_codes(self) -> "np.ndarray":
+        """One code per distinct (name, type, source) series."""
+        return ((self.name_codes.astype("int64") * len(self.types)
+                 + self.type_codes) * len(self.sources) + self.source_codes)
+
+    def series_label(self, index: int) -> Dict[str, Optional[str]]:
+        return {
+            "name": self.names[self.name_codes[index]],
+            "type": self.types[self.type_codes[index]],
+            "source": self.sources[self.source_codes[index]],
+        }
+
+
+class _Encoder:
+    """
+    Dictionary-encodes strings batch by batch; empty and missing values
+    share None. Labels are sorted once the last batch is in.
+    """
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, column: Sequence[Optional[str]]) -> List[int]:
+        codes = self._codes
+        return [codes.setdefault(value or "", len(codes))
+                for value in column]
+
+    def finish(self, codes: "np.ndarray"
+               ) -> Tuple["np.ndarray", List[Optional[str]]]:
+        labels = sorted(self._codes)
+        order = np.empty(len(labels), dtype="int32")
+        order[[self._codes[label] for label in labels]] = np.arange(
+            len(labels), dtype="int32")
+        return order[codes], [label or None for label in labels]
+
+
+def _grow(array: "np.ndarray", length: int) -> "np.ndarray":
+    """Copy of an array extended to length along its last axis."""
+    grown = np.empty(array.shape[:-1] + (length,), dtype=array.dtype)
+    grown[..., :array.shape[-1]] = array
+    return grown
+
+
+def _too_many_rows(max_rows: int) -> None:
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Range has more than {max_rows} metrics, narrow it"
+    )
+
+
+def moving_average(values: "np.ndarray", window: int) -> "np.ndarray":
+    """Trailing mean of each window; NaN until the first window is full."""
+    result = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        sums = np.cumsum(np.concatenate(([0.0], values)))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def rolling_std(values: "np.ndarray", window: int) -> "np.ndarray":
+    """
+    Trailing population standard deviation of each window; NaN until the
+    first window is full. Values are centred first to limit cancellation
+    in the running sums.
+    """
+    result = np.full(len(values), np.nan)
+    if 0 < window <= len(values):
+        centred = values - values.mean()
+        sums = np.cumsum(np.concatenate(([0.0], centred)))
+        squares = np.cumsum(np.concatenate(([0.0], centred * centred)))
+        mean = (sums[window:] - sums[:-window]) / window
+        variance = (squares[window:] - squares[:-window]) / window - mean ** 2
+        result[window - 1:] = np.sqrt(np.maximum(variance, 0.0))
+    return result
+
+
+def rate_of_change(seconds: "np.ndarray", values: "np.ndarray"
+                   ) -> "np.ndarray":
+    """
+    Change per second from the previous point; NaN for the first point
+    and for points sharing the previous point's timestamp.
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) > 1:
+        elapsed = np.diff(seconds)
+        np.divide(np.diff(values), elapsed, out=result[1:],
+                  where=elapsed > 0)
+    return result
+
+
+def zscores(values: "np.ndarray",
+            groups: Optional["np.ndarray"] = None) -> "np.ndarray":
+    """
+    Standard score of each value within its group (the whole array when
+    no groups are given). Values of constant groups score 0.
+    """
+    if groups is None:
+        groups = np.zeros(len(values), dtype="int64")
+    _, groups = np.unique(groups, return_inverse=True)
+    counts = np.bincount(groups)
+    means = np.bincount(groups, weights=values) / counts
+    centred = values - means[groups]
+    deviations = np.sqrt(
+        np.bincount(groups, weights=centred * centred) / counts)[groups]
+    result = np.zeros(len(values))
+    np.divide(centred, deviations, out=result, where=deviations > 0)
+    return result
+
+
+def to_json(array: "np.ndarray") -> List[Optional[float]]:
+    """Float array as a JSON-safe list, NaN becoming None."""
+    return np.where(np.isnan(array), None, array).tolist()
+
+
+class AnalyticsService:
+    """Service class loading metric ranges into arrays."""
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    @staticmethod
+    def load(db: Session, date_from: datetime, date_to: datetime,
+             name: Optional[str] = None, type_filter: Optional[str] = None,
+             source: Optional[str] = None,
+             max_rows: Optional[int] = None,
+             batch_size: Optional[int] = None) -> MetricArrays:
+        """
+        Read an inclusive range into arrays, selecting plain columns so no
+        ORM objects are built, batch_size rows at a time. Raises 400 when
+        more than max_rows match.
+        """
+        query = select(
+            Metric.recorded_at, Metric.value, Metric.name, Metric.type,
+            Metric.source
+        ).where(
+            Metric.recorded_at >= date_from, Metric.recorded_at <= date_to
+        ).order_by(Metric.recorded_at, Metric.id)
+        if name:
+            query = query.where(Metric.name == name)
+        if type_filter:
+            query = query.where(Metric.type == type_filter)
+        if source:
+            query = query.where(Metric.source == source)
+
+        # Sized by a count first so each batch from the cursor is copied
+        # straight into the arrays; rows inserted meanwhile grow them
+        size = db.scalar(select(func.count()).select_from(
+            query.order_by(None).subquery()))
+        if max_rows is not None and size > max_rows:
+            _too_many_rows(max_rows)
+        timestamps = np.empty(size, dtype="datetime64[us]")
+        values = np.empty(size, dtype="float64")
+        codes = np.empty((3, size), dtype="int32")
+        encoders = (_Encoder(), _Encoder(), _Encoder())
+        filled = 0
+
+        result = db.execute(query.execution_options(
+            yield_per=batch_size or settings.ANALYTICS_BATCH_SIZE))
+        for partition in result.partitions():
+            end = filled + len(partition)
+            if end > len(values):
+                if max_rows is not None and end > max_rows:
+                    _too_many_rows(max_rows)
+                length = max(end, 2 * len(values))
+                timestamps, values, codes = (
+                    _grow(array, length)
+                    for array in (timestamps, values, codes))
+            recorded_at, batch_values, *labels = zip(*partition)
+            # numpy drops time zones with a warning; convert them first
+            timestamps[filled:end] = [to_utc_naive(value)
+                                      for value in recorded_at]
+            values[filled:end] = batch_values
+            for row, encoder, column in zip(codes, encoders, labels):
+                row[filled:end] = encoder.encode(column)
+            filled = end
+
+        (name_codes, names), (type_codes, types), (source_codes, sources) = (
+            encoder.finish(row[:filled])
+            for encoder, row in zip(encoders, codes))
+        return MetricArrays(
+            timestamps=timestamps[:filled], values=values[:filled],
+            name_codes=name_codes, type_codes=type_codes,
+            source_codes=source_codes, names=names, types=types,
+            sources=sources)
+
+    @staticmethod
+    def points(arrays: MetricArrays, computed: "np.ndarray", field: str,
+               max_points: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Pair each point with its computed value, downsampled with LTTB on
+        the computed values when max_points is given.
+        """
+        indices = np.arange(len(arrays))
+        if max_points and len(arrays) > max_points:
+            indices = np.array(lttb_indices(
+                arrays.seconds.tolist(), np.nan_to_num(computed).tolist(),
+                max_points))
+        timestamps = arrays.timestamps[indices].tolist()
+        return [
+            {"recorded_at": timestamp.isoformat(), "value": value,
+             field: result}
+            for timestamp, value, result in zip(
+                timestamps, arrays.values[indices].tolist(),
+                to_json(computed[indices]))
+        ]
+
+    @staticmethod
+    def histogram(arrays: MetricArrays, bins: int,
+                  value_range: Optional[Tuple[float, float]] = None
+                  ) -> Dict[str, Any]:
+        counts, edges = np.histogram(arrays.values, bins=bins,
+                                     range=value_range)
+        return {
+            "bins": [
+                {"start": start, "end": end, "count": count}
+                for start, end, count in zip(
+                    edges[:-1].tolist(), edges[1:].tolist(), counts.tolist())
+            ],
+            "total": int(counts.sum())
+        }
+
+    @staticmethod
+    def anomalies(arrays: MetricArrays, threshold: float,
+                  per_series: bool = True) -> List[Dict[str, Any]]:
+        """
+        Points whose absolute z-score reaches the threshold, scored within
+        their own series unless per_series is off.
+        """
+        scores = zscores(arrays.values,
+                         arrays.series_codes if per_series else None)
+        indices = np.flatnonzero(np.abs(scores) >= threshold)
+        timestamps = arrays.timestamps[indices].tolist()
+        return [
+            {
+                **arrays.series_label(index),
+                "value": float(arrays.values[index]),
+                "z_score": float(scores[index]),
+                "recorded_at": timestamp.isoformat()
+            }
+            for index, timestamp in zip(indices.tolist(), timestamps)
+        ]
@@ -0,0 +1,33 @@
+"""
+Auth event service for recording authentication activity.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.auth_events import AuthEvent, AuthEventType
+from .report_cache import report_cache
+
+
+class AuthEventService:
+    """Service class for recording auth events."""
+
+    @staticmethod
+    async def record(db: AsyncSession, event_type: AuthEventType,
+                     user_id: Optional[int] = None,
+                     request: Optional[Request] = None) -> None:
+        """
+        Record an event and commit it, together with any pending changes
+        of the session.
+        """
+        created_at = datetime.utcnow()
+        db.add(AuthEvent(
+            event_type=event_type.value, user_id=user_id,
+            ip_address=(request.client.host
+                        if request is not None and request.client else None),
+            created_at=created_at))
+        await db.commit()
+        report_cache.note_write("auth_events", [created_at])
@@ -5,19 +5,23 @@ Handles password hashing, token creation/validation, and user authentication.
 
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
+import time
+import uuid
 import jwt
 from jwt.exceptions import InvalidTokenError
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..config import settings
-from ..database import get_db
+from ..database import get_async_db
 from ..models.user import User
-
-# Password hashing configuration
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from .jwt_keys import key_ring
+from .password_hasher import password_hasher, pwd_context
+from .principal_cache import Principal, principal_cache
+from .token_cache import token_cache
+from .token_revocation import token_revocations
 
 # Security scheme for JWT
 security = HTTPBearer()
@@ -36,6 +40,17 @@ class AuthService:
         """Generate password hash from plain password."""
         return pwd_context.hash(password)
 
+    @staticmethod
+    async def verify_password_async(plain_password: str,
+                                    hashed_password: str) -> bool:
+        """Verify a password on the hashing pool, off the event loop."""
+        return await password_hasher.verify(plain_password, hashed_password)
+
+    @staticmethod
+    async def get_password_hash_async(password: str) -> str:
+        """Hash a password on the hashing pool, off the event loop."""
+        return await password_hasher.hash(password)
+
     @staticmethod
     def create_access_token(data: Dict[str, Any],
                           expires_delta: Optional[timedelta] = None) -> str:
@@ -47,10 +62,8 @@ class AuthService:
             expire = datetime.utcnow() + timedelta(
                 minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
 
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY,
-                               algorithm=settings.ALGORITHM)
-        return encoded_jwt
+        to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
+        return AuthService.sign(to_encode)
 
     @staticmethod
     def create_refresh_token(data: Dict[str, Any]) -> str:
@@ -58,17 +71,42 @@ class AuthService:
         to_encode = data.copy()
         expire = datetime.utcnow() + timedelta(
             days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-        to_encode.update({"exp": expire, "type": "refresh"})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY,
-                               algorithm=settings.ALGORITHM)
-        return encoded_jwt
+        to_encode.update({"exp": expire, "type": "refresh",
+                          "jti": uuid.uuid4().hex})
+        return AuthService.sign(to_encode)
+
+    @staticmethod
+    def sign(payload: Dict[str, Any]) -> str:
+        """Sign claims with the shared secret or the active private key."""
+        if not key_ring.asymmetric:
+            return jwt.encode(payload, settings.SECRET_KEY,
+                              algorithm=key_ring.algorithm)
+        key = key_ring.signing_key()
+        return jwt.encode(payload, key.private_key,
+                          algorithm=key_ring.algorithm,
+                          headers={"kid": key.kid})
 
     @staticmethod
     def verify_token(token: str) -> Dict[str, Any]:
-        """Verify and decode JWT token."""
+        """
+        Verify and decode JWT token.
+        Tokens verified before are answered from the token cache.
+        """
+        payload = token_cache.get(token)
+        if payload is not None:
+            return payload
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY,
-                               algorithms=[settings.ALGORITHM])
+            started = time.perf_counter()
+            key = settings.SECRET_KEY
+            if key_ring.asymmetric:
+                key = key_ring.verification_key(
+                    jwt.get_unverified_header(token).get("kid"))
+                if key is None:
+                    raise InvalidTokenError("Unknown signing key")
+            payload = jwt.decode(token, key,
+                               algorithms=[key_ring.algorithm],
+                               leeway=settings.JWT_LEEWAY_SECONDS)
+            token_cache.put(token, payload, time.perf_counter() - started)
             return payload
         except InvalidTokenError:
             raise HTTPException(
@@ -78,69 +116,89 @@ class AuthService:
             )
 
     @staticmethod
-    def authenticate_user(db: Session, email: str,
-                        password: str) -> Optional[User]:
+    async def authenticate_user(db: AsyncSession, email: str,
+                                password: str) -> Optional[User]:
         """Authenticate user with email and password."""
-        user = db.query(User).filter(User.email == email).first()
+        user = await AuthService.get_user_by_email(db, email)
         if not user:
             return None
-        if not AuthService.verify_password(password, user.hashed_password):
+        if not await AuthService.verify_password_async(
+                password, user.hashed_password):
             return None
         return user
 
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    async def get_user_by_email(db: AsyncSession,
+                                email: str) -> Optional[User]:
         """Get user by email address."""
-        return db.query(User).filter(User.email == email).first()
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
 
     @staticmethod
-    def get_user_by_id(db: Session, user_id: int) -> Optional[User]:
+    async def get_user_by_id(db: AsyncSession,
+                             user_id: int) -> Optional[User]:
         """Get user by ID."""
-        return db.query(User).filter(User.id == user_id).first()
+        return await db.get(User, user_id)
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
     """
     Dependency to get current authenticated user from JWT token.
-    Used with FastAPI's Depends() for route protection.
+    Used with FastAPI's Depends() for route protection. Users are read
+    through the principal cache, so cached requests run no query.
     """
     token = credentials.credentials
     payload = AuthService.verify_token(token)
-
-    user_id: int = payload.get("sub")
-    if user_id is None:
+    # After the token cache: revocations apply to cached tokens too
+    jti = payload.get("jti")
+    if token_revocations.might_be_revoked(jti) and \
+            await token_revocations.is_revoked(db, jti):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+            detail="Token has been revoked",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = AuthService.get_user_by_id(db, user_id=user_id)
-    if user is None:
+    user_id = payload.get("sub")
+    if user_id is None or not str(user_id).isdigit():
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not user.is_active:
+    principal = principal_cache.get(int(user_id))
+    if principal is None:
+        generation = principal_cache.generation
+        user = await AuthService.get_user_by_id(db, user_id=int(user_id))
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        principal = Principal.from_user(user)
+        principal_cache.put(principal, generation)
+
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Inactive user"
         )
 
-    return user
+    return principal
 
 
-def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_admin_user(
+        current_user: Principal = Depends(get_current_user)) -> Principal:
     """
     Dependency to ensure current user has admin role.
     Used for admin-only endpoints.
     """
-    if not current_user.role or current_user.role.name != "admin":
+    if current_user.role_name != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -0,0 +1,239 @@
+"""
+Dashboard service for summary KPIs.
+Computes the summary aggregates in one statement, keeps an in-process
+snapshot of the result with a short TTL and pushes live updates to
+stream subscribers.
+"""
+
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+from sqlalchemy import select, func, case
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import SessionLocal, AsyncSessionLocal
+from ..models.user import User
+from ..models.metrics import Metric
+from ..schemas.metrics import DashboardSummary
+from .event_hub import EventHub
+from .log_counters import error_totals, log_counters
+from .recent_points import RecentPointsService
+
+logger = logging.getLogger(__name__)
+
+
+class SummarySnapshot:
+    """Thread-safe holder for the latest dashboard summary."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._summary: Optional[DashboardSummary] = None
+        self._expires_at = 0.0
+        self._generation = 0
+        self._refreshing = False
+
+    def get(self) -> Tuple[Optional[DashboardSummary], bool]:
+        """Return the snapshot, if any, and whether it is still fresh."""
+        with self._lock:
+            fresh = time.monotonic() < self._expires_at
+            return self._summary, fresh
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def store(self, summary: DashboardSummary, generation: int) -> None:
+        """Store a summary unless a write invalidated it while computing."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._summary = summary
+            self._expires_at = time.monotonic() + self.ttl_seconds
+
+    def invalidate(self) -> None:
+        """Mark the snapshot stale; it stays available for revalidation."""
+        with self._lock:
+            self._generation += 1
+            self._expires_at = 0.0
+
+    def claim_refresh(self) -> bool:
+        """Return True for the single caller allowed to refresh it."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def release_refresh(self) -> None:
+        with self._lock:
+            self._refreshing = False
+
+
+# Global snapshot shared by all requests of this process
+summary_snapshot = SummarySnapshot(settings.SUMMARY_SNAPSHOT_TTL_SECONDS)
+
+
+class DashboardService:
+    """Service class for dashboard summary operations."""
+
+    @staticmethod
+    def compute_summary(db: Session) -> DashboardSummary:
+        """Compute the dashboard summary; all aggregates in one query."""
+        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+
+        # Revenue sum and performance average over the last 30 days
+        metric_stats = select(
+            func.sum(case((Metric.type == "revenue", Metric.value)))
+            .label("total_revenue"),
+            func.avg(case((Metric.type == "performance", Metric.value)))
+            .label("performance_score")
+        ).where(
+            Metric.type.in_(["revenue", "performance"]),
+            Metric.recorded_at >= thirty_days_ago
+        ).subquery()
+
+        stats = db.execute(select(
+            select(func.count(User.id)).scalar_subquery()
+            .label("total_users"),
+            select(func.count(User.id)).where(User.is_active.is_(True))
+            .scalar_subquery().label("active_users"),
+            metric_stats.c.total_revenue,
+            metric_stats.c.performance_score
+        )).one()
+        performance_score = stats.performance_score or 0.0
+
+        # Error rate over the log counter window, without reading logs
+        error_rate = 0.0
+        if log_counters.loaded:
+            total_logs, error_logs = error_totals(log_counters.counts(
+                log_counters.window_start(), datetime.utcnow()))
+            if total_logs:
+                error_rate = error_logs / total_logs * 100
+
+        # Determine system health based on recent error logs and performance
+        system_health = "healthy"
+        if performance_score < 70:
+            system_health = "warning"
+        elif performance_score < 50:
+            system_health = "critical"
+        if error_rate >= 5:
+            system_health = "critical"
+        elif error_rate >= 1 and system_health == "healthy":
+            system_health = "warning"
+
+        # Get recent metrics (last 10)
+        recent_metrics = RecentPointsService.latest(db, 10)
+
+        return DashboardSummary.model_validate({
+            "total_users": stats.total_users,
+            "active_users": stats.active_users,
+            "total_revenue": stats.total_revenue or 0.0,
+            "performance_score": round(performance_score, 2),
+            "error_rate_percentage": round(error_rate, 2),
+            "system_health": system_health,
+            "recent_metrics": recent_metrics
+        }, from_attributes=True)
+
+    @staticmethod
+    def get_summary(db: Session) -> DashboardSummary:
+        """Return the snapshot if fresh, otherwise recompute and store it."""
+        summary, fresh = summary_snapshot.get()
+        if summary is not None and fresh:
+            return summary
+
+        generation = summary_snapshot.generation
+        summary = DashboardService.compute_summary(db)
+        summary_snapshot.store(summary, generation)
+        return summary
+
+    @staticmethod
+    def refresh_snapshot() -> None:
+        """Recompute the snapshot in the background with its own session."""
+        db = SessionLocal()
+        try:
+            generation = summary_snapshot.generation
+            summary_snapshot.store(
+                DashboardService.compute_summary(db), generation)
+        finally:
+            summary_snapshot.release_refresh()
+            db.close()
+
+    @staticmethod
+    def publish_metrics(metrics: Iterable[Any]) -> None:
+        """Push newly committed metrics to live stream subscribers."""
+        if not dashboard_hub.subscriber_count:
+            return
+        dashboard_hub.publish("metrics", [
+            _stream_point(metric) for metric in metrics])
+        summary_broadcaster.schedule()
+
+
+def _stream_point(metric: Any) -> Dict[str, Any]:
+    """Compact representation of a metric for stream events."""
+    if not isinstance(metric, Mapping):
+        metric = {field: getattr(metric, field) for field in (
+            "id", "name", "type", "value", "unit", "source", "recorded_at")}
+    return {
+        "id": metric.get("id"),
+        "name": metric["name"],
+        "type": metric["type"],
+        "value": metric["value"],
+        "unit": metric.get("unit"),
+        "source": metric.get("source"),
+        "recorded_at": metric["recorded_at"].isoformat()
+    }
+
+
+class SummaryBroadcaster:
+    """
+    Publishes the summary fields that changed after metric writes.
+    Writes arriving within the debounce delay share one recomputation,
+    and nothing is computed while no client is subscribed.
+    """
+
+    def __init__(self, hub: EventHub, delay: float):
+        self.hub = hub
+        self.delay = delay
+        self._dirty = False
+        self._task: Optional[asyncio.Task] = None
+        self._last: Optional[Dict[str, Any]] = None
+
+    def schedule(self) -> None:
+        """Request a broadcast; must run on the event loop."""
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(
+                self._broadcast())
+
+    async def _broadcast(self) -> None:
+        while self._dirty and self.hub.subscriber_count:
+            self._dirty = False
+            await asyncio.sleep(self.delay)
+            try:
+                async with AsyncSessionLocal() as db:
+                    summary = await db.run_sync(DashboardService.get_summary)
+            except Exception:
+                logger.exception("Dashboard summary broadcast failed")
+                return
+
+            current = summary.model_dump(mode="json")
+            changed = {
+                field: value for field, value in current.items()
+                if self._last is None or self._last.get(field) != value
+            }
+            self._last = current
+            if changed:
+                self.hub.publish("summary", changed)
+
+
+# Live event fan-out for the dashboard stream endpoint
+dashboard_hub = EventHub(settings.STREAM_QUEUE_SIZE)
+summary_broadcaster = SummaryBroadcaster(
+    dashboard_hub, settings.STREAM_SUMMARY_DEBOUNCE_SECONDS)
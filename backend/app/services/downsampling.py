@@ -0,0 +1,108 @@
+"""
+Downsampling service for chart series.
+Reduces a series to a bounded number of points on the server while
+keeping its visual shape: Largest-Triangle-Three-Buckets for line charts
+and min/max bucketing when every peak and trough must stay visible.
+"""
+
+from datetime import date, datetime
+from enum import Enum as PyEnum
+from typing import Callable, List, Optional, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+
+class DownsampleMethod(PyEnum):
+    """Enum for the available downsampling algorithms."""
+    LTTB = "lttb"
+    MINMAX = "minmax"
+
+
+def time_axis(value: Union[date, datetime]) -> float:
+    """Position of a date or naive UTC datetime on a numeric x axis."""
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float],
+                 max_points: int) -> List[int]:
+    """
+    Pick the indices of the points kept by Largest-Triangle-Three-Buckets.
+    The first and last points are always kept; every bucket in between
+    keeps the point forming the largest triangle with the previously kept
+    point and the average of the next bucket.
+    """
+    count = len(ys)
+    if max_points >= count or max_points < 3:
+        return list(range(count))
+
+    every = (count - 2) / (max_points - 2)
+    selected = [0]
+    previous = 0
+    for bucket in range(max_points - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_start = end
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        if next_start >= next_end:
+            next_start, next_end = count - 1, count
+
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+        prev_x, prev_y = xs[previous], ys[previous]
+
+        best, best_area = start, -1.0
+        for index in range(start, end):
+            area = abs((prev_x - avg_x) * (ys[index] - prev_y) -
+                       (prev_x - xs[index]) * (avg_y - prev_y))
+            if area > best_area:
+                best, best_area = index, area
+        selected.append(best)
+        previous = best
+
+    selected.append(count - 1)
+    return selected
+
+
+def minmax_indices(ys: Sequence[float], max_points: int) -> List[int]:
+    """
+    Pick the minimum and maximum of each of max_points // 2 equal buckets,
+    in their original order.
+    """
+    count = len(ys)
+    buckets = max_points // 2
+    if max_points >= count or buckets < 1:
+        return list(range(count))
+
+    selected = []
+    for bucket in range(buckets):
+        start = bucket * count // buckets
+        end = (bucket + 1) * count // buckets
+        indices = range(start, end)
+        low = min(indices, key=ys.__getitem__)
+        high = max(indices, key=ys.__getitem__)
+        selected.extend(sorted({low, high}))
+    return selected
+
+
+def downsample(points: List[T], max_points: Optional[int],
+               y: Callable[[T], float],
+               x: Optional[Callable[[T], float]] = None,
+               method: str = DownsampleMethod.LTTB.value) -> List[T]:
+    """
+    Reduce points, ordered by x, to at most max_points.
+    x defaults to the point position, which suits evenly spaced series.
+    """
+    if not max_points or len(points) <= max_points:
+        return points
+
+    ys = [y(point) for point in points]
+    if method == DownsampleMethod.MINMAX.value:
+        indices = minmax_indices(ys, max_points)
+    else:
+        xs = ([x(point) for point in points] if x
+              else list(range(len(points))))
+        indices = lttb_indices(xs, ys, max_points)
+    return [points[index] for index in indices]
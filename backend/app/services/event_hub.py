@@ -0,0 +1,71 @@
+"""
+In-process publish/subscribe hub for live dashboard events.
+Each subscriber gets a bounded queue so a slow consumer can never
+back up publishers or other subscribers.
+"""
+
+from typing import Any, Dict, Optional, Set
+import asyncio
+import json
+
+# Sent instead of the dropped events when a subscriber falls behind
+RESYNC_EVENT = {"event": "resync", "data": {"reason": "queue_overflow"}}
+
+
+class Subscription:
+    """A subscriber's bounded queue of pending events."""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, event: Dict[str, Any]) -> None:
+        """Enqueue without blocking; on overflow ask the client to resync."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Drop everything pending: the client refetches current state
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.dropped += 1
+            self.queue.put_nowait(RESYNC_EVENT)
+
+    async def next_event(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """Wait for the next event, or return None after timeout."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class EventHub:
+    """Fan-out of events to all current subscribers."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Set[Subscription] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: Any) -> None:
+        """Deliver an event to every subscriber; must run on the event loop."""
+        message = {"event": event, "data": data}
+        for subscription in list(self._subscribers):
+            subscription.offer(message)
+
+
+def format_sse(message: Dict[str, Any]) -> str:
+    """Render an event in the Server-Sent Events wire format."""
+    data = json.dumps(message["data"], default=str, separators=(",", ":"))
+    return f"event: {message['event']}\ndata: {data}\n\n"
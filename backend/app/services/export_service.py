@@ -0,0 +1,261 @@
+"""
+Export service for streaming metric downloads.
+Reads the export range through a server-side cursor in fixed-size
+batches and encodes each batch as soon as it arrives, so memory stays
+flat and the first bytes leave before the query has finished.
+Columnar formats (Parquet, Arrow IPC) need the optional pyarrow package.
+"""
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+import csv
+import io
+import json
+
+from sqlalchemy import Select, select, desc
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from ..database import AsyncSessionLocal
+from ..models.metrics import Metric
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Columnar exports are disabled without pyarrow
+    pa = pq = None
+
+# Columns exported for every metric, in output order
+EXPORT_COLUMNS = (
+    Metric.id, Metric.name, Metric.type, Metric.value, Metric.unit,
+    Metric.description, Metric.source, Metric.recorded_at, Metric.created_at
+)
+
+CSV_HEADER = [
+    'ID', 'Name', 'Type', 'Value', 'Unit', 'Description',
+    'Source', 'Recorded At', 'Created At'
+]
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+# Repeated strings are dictionary-encoded in columnar exports
+_DICTIONARY_COLUMNS = ("name", "type", "unit", "source")
+
+
+def _arrow_schema():
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    timestamp = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("id", pa.int64()),
+        ("name", dictionary),
+        ("type", dictionary),
+        ("value", pa.float64()),
+        ("unit", dictionary),
+        ("description", pa.string()),
+        ("source", dictionary),
+        ("recorded_at", timestamp),
+        ("created_at", timestamp),
+    ])
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object drained after every batch written to it."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class MetricExportService:
+    """Service class for streamed metric exports."""
+
+    @staticmethod
+    def export_query(date_from: datetime, date_to: datetime,
+                     type_filter: Optional[str] = None) -> Select:
+        """Select the exported columns for a range, newest first."""
+        query = select(*EXPORT_COLUMNS).where(
+            Metric.recorded_at >= date_from,
+            Metric.recorded_at <= date_to
+        )
+        if type_filter:
+            query = query.where(Metric.type == type_filter)
+        return query.order_by(desc(Metric.recorded_at), desc(Metric.id))
+
+    @staticmethod
+    async def iter_batches(query: Select, batch_size: int,
+                           session_factory: Optional[async_sessionmaker] = None
+                           ) -> AsyncIterator[Sequence[Any]]:
+        """
+        Yield result rows in batches from a server-side cursor.
+        Uses its own session: a streaming response outlives the request's
+        dependency session. Report jobs pass the factory of their worker.
+        """
+        async with (session_factory or AsyncSessionLocal)() as session:
+            result = await session.stream(
+                query.execution_options(yield_per=batch_size))
+            async for partition in result.partitions():
+                yield partition
+
+    @staticmethod
+    async def iter_csv(query: Select, batch_size: int,
+                       session_factory: Optional[async_sessionmaker] = None
+                       ) -> AsyncIterator[str]:
+        """Encode the query results as CSV, one chunk per batch."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(CSV_HEADER)
+        yield buffer.getvalue()
+
+        async for rows in MetricExportService.iter_batches(
+                query, batch_size, session_factory):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(MetricExportService._csv_row(row) for row in rows)
+            yield buffer.getvalue()
+
+    @staticmethod
+    async def iter_json(query: Select, batch_size: int,
+                        export_info: Dict[str, Any],
+                        session_factory: Optional[async_sessionmaker] = None
+                        ) -> AsyncIterator[str]:
+        """
+        Encode the results as one JSON object: export_info first, then
+        the metrics array, then total_records once the count is known.
+        """
+        yield f'{{"export_info":{_dumps(export_info)},"metrics":['
+        total = 0
+        async for rows in MetricExportService.iter_batches(
+                query, batch_size, session_factory):
+            chunk = ",".join(
+                _dumps(MetricExportService._json_row(row)) for row in rows)
+            yield ("," if total else "") + chunk
+            total += len(rows)
+        yield f'],"total_records":{total}}}'
+
+    @staticmethod
+    async def iter_ndjson(query: Select, batch_size: int,
+                          export_info: Dict[str, Any],
+                          session_factory: Optional[async_sessionmaker] = None
+                          ) -> AsyncIterator[str]:
+        """
+        Encode the results as newline-delimited JSON: an export_info
+        header line, one line per metric and a total_records trailer line.
+        """
+        yield _dumps({"export_info": export_info}) + "\n"
+        total = 0
+        async for rows in MetricExportService.iter_batches(
+                query, batch_size, session_factory):
+            yield "".join(
+                _dumps(MetricExportService._json_row(row)) + "\n"
+                for row in rows)
+            total += len(rows)
+        yield _dumps({"total_records": total}) + "\n"
+
+    @staticmethod
+    def columnar_available() -> bool:
+        return pa is not None
+
+    @staticmethod
+    def record_batch(rows: Sequence[Any]):
+        """Build an Arrow record batch from exported rows."""
+        schema = _arrow_schema()
+        arrays = []
+        for field in schema:
+            values = [getattr(row, field.name) for row in rows]
+            if field.name in _DICTIONARY_COLUMNS:
+                arrays.append(
+                    pa.array(values, pa.string()).dictionary_encode())
+            else:
+                arrays.append(pa.array(values, field.type))
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+    @staticmethod
+    async def iter_arrow(query: Select, batch_size: int,
+                         session_factory: Optional[async_sessionmaker] = None
+                         ) -> AsyncIterator[bytes]:
+        """Encode the results as an Arrow IPC stream, one batch at a time."""
+        sink = _ChunkSink()
+        writer = pa.ipc.new_stream(sink, _arrow_schema())
+        async for rows in MetricExportService.iter_batches(
+                query, batch_size, session_factory):
+            writer.write_batch(MetricExportService.record_batch(rows))
+            yield sink.drain()
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    async def iter_parquet(query: Select, batch_size: int,
+                           row_group_size: int,
+                           session_factory: Optional[async_sessionmaker] = None
+                           ) -> AsyncIterator[bytes]:
+        """
+        Encode the results as Parquet. Batches are grouped into row groups
+        of about row_group_size rows, each sent once written; the footer
+        follows the last one.
+        """
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, _arrow_schema(), compression="zstd")
+        pending, pending_rows = [], 0
+        async for rows in MetricExportService.iter_batches(
+                query, batch_size, session_factory):
+            pending.append(MetricExportService.record_batch(rows))
+            pending_rows += len(rows)
+            if pending_rows >= row_group_size:
+                writer.write_table(pa.Table.from_batches(pending))
+                pending, pending_rows = [], 0
+                yield sink.drain()
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending))
+        writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def _json_row(row: Any) -> Dict[str, Any]:
+        return {
+            "id": row.id,
+            "name": row.name,
+            "type": row.type,
+            "value": row.value,
+            "unit": row.unit,
+            "description": row.description,
+            "source": row.source,
+            "recorded_at": _isoformat(row.recorded_at),
+            "created_at": _isoformat(row.created_at)
+        }
+
+    @staticmethod
+    def _csv_row(row: Any) -> List[Any]:
+        return [
+            row.id,
+            row.name,
+            row.type,
+            row.value,
+            row.unit or '',
+            row.description or '',
+            row.source or '',
+            _isoformat(row.recorded_at),
+            _isoformat(row.created_at)
+        ]
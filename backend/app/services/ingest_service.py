@@ -0,0 +1,275 @@
+"""
+Metric ingestion service for bulk writes.
+Parses JSON array or NDJSON bodies incrementally and inserts validated
+metrics in chunks, one transaction per chunk.
+"""
+
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import codecs
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.metrics import Metric
+from ..schemas.metrics import MetricCreate
+from .dashboard_service import DashboardService, summary_snapshot
+from .recent_points import RecentPointsService
+from .report_cache import report_cache
+from .rollup_service import RollupService
+
+# Largest single JSON value buffered while waiting for its end
+MAX_ITEM_BYTES = 1024 * 1024
+
+NDJSON_MEDIA_TYPES = ("ndjson", "jsonl")
+
+# (position, parsed item, error message)
+BatchItem = Tuple[int, Any, Optional[str]]
+
+
+class JSONArrayParser:
+    """Incremental parser yielding the elements of a top-level JSON array."""
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "start"  # start, first, value, separator, done
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        """Consume text and return the elements completed so far."""
+        buffer = self._buffer + text
+        pos = 0
+        items = []
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos >= len(buffer):
+                break
+
+            char = buffer[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                pos += 1
+                self._state = "first"
+            elif self._state == "first" and char == "]":
+                pos += 1
+                self._state = "done"
+            elif self._state in ("first", "value"):
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError as e:
+                    if final or len(buffer) - pos > MAX_ITEM_BYTES:
+                        raise ValueError(f"Malformed JSON: {e.msg}")
+                    break
+                if end == len(buffer) and not final:
+                    # A trailing number or literal may still continue
+                    break
+                items.append(item)
+                pos = end
+                self._state = "separator"
+            elif self._state == "separator":
+                if char not in ",]":
+                    raise ValueError("Expected ',' or ']' in JSON array")
+                pos += 1
+                self._state = "value" if char == "," else "done"
+            else:
+                raise ValueError("Unexpected data after JSON array")
+
+        self._buffer = buffer[pos:]
+        if final and self._state != "done":
+            raise ValueError("Unterminated JSON array")
+        return items
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]
+                          ) -> AsyncIterator[BatchItem]:
+    """Yield the elements of a streamed JSON array body."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parser = JSONArrayParser()
+    position = 0
+    try:
+        async for chunk in chunks:
+            for item in parser.feed(decoder.decode(chunk)):
+                yield position, item, None
+                position += 1
+        for item in parser.feed(decoder.decode(b"", final=True), final=True):
+            yield position, item, None
+            position += 1
+    except ValueError as e:
+        # The array structure is broken, nothing after this is usable
+        yield position, None, str(e)
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]
+                      ) -> AsyncIterator[BatchItem]:
+    """
+    Yield one item per non-empty line of a streamed NDJSON body.
+    A line longer than MAX_ITEM_BYTES is reported as an error and skipped
+    up to the next newline without being buffered.
+    """
+    pending: List[bytes] = []  # Pieces of the current unterminated line
+    pending_size = 0
+    skipping = False
+    position = 0
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline < 0:
+                break
+            if skipping:
+                skipping = False
+            else:
+                pending.append(chunk[start:newline])
+                line = b"".join(pending)
+                if line.strip():
+                    yield _parse_line(position, line)
+                    position += 1
+            pending, pending_size = [], 0
+            start = newline + 1
+
+        if skipping:
+            continue
+        rest = chunk[start:]
+        if rest:
+            pending.append(rest)
+            pending_size += len(rest)
+        if pending_size > MAX_ITEM_BYTES:
+            yield (position, None,
+                   f"Line exceeds the {MAX_ITEM_BYTES} byte limit")
+            position += 1
+            pending, pending_size = [], 0
+            skipping = True
+
+    line = b"".join(pending)
+    if line.strip():
+        yield _parse_line(position, line)
+
+
+def _parse_line(position: int, line: bytes) -> BatchItem:
+    try:
+        return position, json.loads(line), None
+    except ValueError as e:
+        return position, None, f"Malformed JSON: {e}"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc']) or 'body'}: "
+        f"{detail['msg']}"
+        for detail in error.errors()
+    )
+
+
+class MetricIngestService:
+    """Service class for bulk metric ingestion."""
+
+    @staticmethod
+    def iter_items(chunks: AsyncIterator[bytes],
+                   content_type: str) -> AsyncIterator[BatchItem]:
+        """Pick the body parser matching the request content type."""
+        if any(kind in content_type for kind in NDJSON_MEDIA_TYPES):
+            return iter_ndjson(chunks)
+        return iter_json_array(chunks)
+
+    @staticmethod
+    def insert_chunk(db: Session, rows: List[Dict[str, Any]],
+                     positions: List[int],
+                     errors: List[Dict[str, Any]]) -> List[Metric]:
+        """
+        Insert a chunk of validated rows in one transaction.
+        If the chunk fails, rows are retried one by one so that only the
+        offending rows are reported. Returns the inserted metrics.
+        """
+        try:
+            metrics = db.execute(
+                insert(Metric).returning(Metric), rows).scalars().all()
+            RollupService.apply_metrics(db, metrics)
+            db.commit()
+            return metrics
+        except SQLAlchemyError:
+            db.rollback()
+            if len(rows) == 1:
+                errors.append({"index": positions[0],
+                               "error": "Database rejected the metric"})
+                return []
+
+        return [
+            metric
+            for row, position in zip(rows, positions)
+            for metric in MetricIngestService.insert_chunk(
+                db, [row], [position], errors)
+        ]
+
+    @staticmethod
+    async def flush_chunk(db: AsyncSession, rows: List[Dict[str, Any]],
+                          positions: List[int],
+                          errors: List[Dict[str, Any]]) -> int:
+        """
+        Insert a chunk, then hand the committed metrics to the recent
+        points buffer before invalidating the summary snapshot, and publish
+        them to live streams.
+        """
+        inserted = await db.run_sync(
+            MetricIngestService.insert_chunk, rows, positions, errors)
+        if inserted:
+            RecentPointsService.record(inserted)
+            summary_snapshot.invalidate()
+            report_cache.note_write(
+                "metrics", [metric.recorded_at for metric in inserted])
+            DashboardService.publish_metrics(inserted)
+        return len(inserted)
+
+    @staticmethod
+    async def ingest(db: AsyncSession, chunks: AsyncIterator[bytes],
+                     content_type: str, created_by: int,
+                     chunk_size: int) -> Dict[str, Any]:
+        """Validate and insert a streamed batch of metrics."""
+        errors: List[Dict[str, Any]] = []
+        rows: List[Dict[str, Any]] = []
+        positions: List[int] = []
+        accepted = 0
+        received = 0
+
+        async for position, item, error in MetricIngestService.iter_items(
+                chunks, content_type):
+            if error is None:
+                received += 1
+            if error is None and not isinstance(item, dict):
+                error = "Expected a JSON object"
+            if error is None:
+                try:
+                    metric = MetricCreate(**item)
+                except ValidationError as e:
+                    error = _validation_message(e)
+            if error is not None:
+                errors.append({"index": position, "error": error})
+                continue
+
+            row = metric.dict()
+            row["recorded_at"] = row["recorded_at"] or datetime.utcnow()
+            row["created_by"] = created_by
+            rows.append(row)
+            positions.append(position)
+
+            if len(rows) >= chunk_size:
+                accepted += await MetricIngestService.flush_chunk(
+                    db, rows, positions, errors)
+                rows, positions = [], []
+
+        if rows:
+            accepted += await MetricIngestService.flush_chunk(
+                db, rows, positions, errors)
+
+        errors.sort(key=lambda entry: entry["index"])
+        return {
+            "received": received,
+            "accepted": accepted,
+            "rejected": len(errors),
+            "errors": errors
+        }
@@ -0,0 +1,210 @@
+"""
+Signing keys for asymmetric JWTs.
+With RS256 or EdDSA, tokens are signed with a private key read from
+JWT_KEYS_DIR, one PEM file per key named <kid>.pem, and carry the key id
+in their header. Public keys are published as a JWKS so other services
+verify tokens locally. To rotate, add a key (see rotate_jwt_key.py): it
+is published as workers re-read the directory, but only signs once its
+file is older than that reload interval plus the JWKS cache lifetime, so
+verifiers holding a cached JWKS already know it.
+The greatest such kid signs new tokens unless JWT_ACTIVE_KID pins one,
+and older keys keep verifying until their files are removed. HS256 keeps
+using the shared SECRET_KEY and publishes no keys.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "EdDSA")
+
+# Least time between directory scans triggered by unknown key ids
+_MISS_RELOAD_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    """A private key and the id published with its public key."""
+    kid: str
+    private_key: Any
+    created_at: float = 0.0  # Epoch seconds the key file was written
+
+    @property
+    def public_key(self) -> Any:
+        return self.private_key.public_key()
+
+    def jwk(self, algorithm: str) -> Dict[str, Any]:
+        to_jwk = (RSAAlgorithm if algorithm == "RS256"
+                  else OKPAlgorithm).to_jwk
+        return {**to_jwk(self.public_key, as_dict=True),
+                "kid": self.kid, "alg": algorithm, "use": "sig"}
+
+
+def generate_private_key(algorithm: str) -> Any:
+    if algorithm == "RS256":
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return ed25519.Ed25519PrivateKey.generate()
+
+
+def write_key(directory: Path, algorithm: str,
+              kid: Optional[str] = None) -> SigningKey:
+    """
+    Generate a key into directory; kids default to the UTC time. Raises
+    FileExistsError when the kid is taken, as by a concurrent writer.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    kid = kid or datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    private_key = generate_private_key(algorithm)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption())
+    # Written aside, then linked into place: readers never see a partial
+    # file, and a key that may have signed tokens is never replaced
+    temporary = directory / f".{kid}.{secrets.token_hex(4)}.tmp"
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                         0o600)
+    try:
+        with os.fdopen(descriptor, "wb") as output:
+            output.write(pem)
+        os.link(temporary, directory / f"{kid}.pem")
+    finally:
+        temporary.unlink()
+    return SigningKey(kid, private_key, time.time())
+
+
+class KeyRing:
+    """
+    The signing keys of one algorithm, re-read from their directory every
+    reload_seconds and whenever a token names an unknown key id.
+    """
+
+    def __init__(self, algorithm: str, directory: str,
+                 active_kid: Optional[str] = None,
+                 reload_seconds: float = 300.0,
+                 publish_seconds: float = 0.0):
+        self._lock = threading.Lock()
+        self.configure(algorithm, directory, active_kid, reload_seconds,
+                       publish_seconds)
+
+    @property
+    def asymmetric(self) -> bool:
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def configure(self, algorithm: str, directory: str,
+                  active_kid: Optional[str] = None,
+                  reload_seconds: float = 300.0,
+                  publish_seconds: float = 0.0) -> None:
+        with self._lock:
+            self.algorithm = algorithm
+            self.directory = Path(directory)
+            self.active_kid = active_kid
+            self.reload_seconds = reload_seconds
+            self.publish_seconds = publish_seconds
+            self._keys: Dict[str, SigningKey] = {}
+            self._loaded_at: Optional[float] = None
+            self._jwks: Optional[Tuple[bytes, str]] = None
+
+    def signing_key(self) -> SigningKey:
+        """
+        The key new tokens are signed with: the greatest kid published for
+        at least publish_seconds, or the oldest key while none has been.
+        """
+        keys = self._current_keys()
+        if not keys:
+            # First start: create a key so the service can sign at all
+            logger.warning("No JWT signing key in %s; generating one",
+                           self.directory)
+            try:
+                write_key(self.directory, self.algorithm)
+            except FileExistsError:
+                pass  # Another worker created it in the same second
+            keys = self._current_keys(force=True)
+        if self.active_kid:
+            if self.active_kid not in keys:
+                raise RuntimeError(
+                    f"JWT_ACTIVE_KID '{self.active_kid}' has no key file")
+            return keys[self.active_kid]
+        published_before = time.time() - self.publish_seconds
+        published = [kid for kid, key in keys.items()
+                     if key.created_at <= published_before]
+        if published:
+            return keys[max(published)]
+        return min(keys.values(), key=lambda key: (key.created_at, key.kid))
+
+    def verification_key(self, kid: Optional[str]) -> Optional[Any]:
+        """The public key for a token's kid, None when unknown."""
+        if not kid:
+            return None
+        keys = self._current_keys()
+        if kid not in keys and self._loaded_at is not None and \
+                time.monotonic() - self._loaded_at >= _MISS_RELOAD_SECONDS:
+            # Possibly a key another worker has just added
+            keys = self._current_keys(force=True)
+        key = keys.get(kid)
+        return key.public_key if key is not None else None
+
+    def jwks(self) -> Tuple[bytes, str]:
+        """The serialized JWKS document and its ETag."""
+        keys = self._current_keys() if self.asymmetric else {}
+        with self._lock:
+            if self._jwks is None:
+                body = json.dumps({"keys": [
+                    keys[kid].jwk(self.algorithm) for kid in sorted(keys)
+                ]}, separators=(",", ":")).encode()
+                etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+                self._jwks = (body, etag)
+            return self._jwks
+
+    def _current_keys(self, force: bool = False) -> Dict[str, SigningKey]:
+        with self._lock:
+            stale = (self._loaded_at is None or time.monotonic()
+                     - self._loaded_at >= self.reload_seconds)
+            if force or stale:
+                keys = self._read_keys()
+                if keys.keys() != self._keys.keys():
+                    self._jwks = None
+                self._keys = keys
+                self._loaded_at = time.monotonic()
+            return self._keys
+
+    def _read_keys(self) -> Dict[str, SigningKey]:
+        expected = (rsa.RSAPrivateKey if self.algorithm == "RS256"
+                    else ed25519.Ed25519PrivateKey)
+        keys = {}
+        for path in sorted(self.directory.glob("*.pem")):
+            try:
+                created_at = path.stat().st_mtime
+                private_key = serialization.load_pem_private_key(
+                    path.read_bytes(), password=None)
+            except (OSError, ValueError, TypeError) as e:
+                logger.error("Skipping JWT key %s: %s", path, e)
+                continue
+            if not isinstance(private_key, expected):
+                logger.error("Skipping JWT key %s: not a %s key", path,
+                             self.algorithm)
+                continue
+            keys[path.stem] = SigningKey(path.stem, private_key, created_at)
+        return keys
+
+
+# Global key ring shared by all requests of this process
+key_ring = KeyRing(settings.ALGORITHM, settings.JWT_KEYS_DIR,
+                   settings.JWT_ACTIVE_KID, settings.JWT_KEY_RELOAD_SECONDS,
+                   settings.JWT_KEY_RELOAD_SECONDS
+                   + settings.JWKS_MAX_AGE_SECONDS)
@@ -0,0 +1,168 @@
+"""
+Log counter service for error-rate queries.
+Counts log rows per minute, level and category over a sliding window,
+loaded from the database at startup and updated whenever a session
+commits new log rows, so error rates over recent ranges are summed from
+one bucket per minute instead of counting log rows. The counters are per
+process: rows committed by other processes are seen after a restart.
+"""
+
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import threading
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.logs import Log
+from .report_cache import report_cache
+from .rollup_service import MINUTE, floor_bucket, to_utc_naive
+
+ERROR_LEVELS = ("error", "critical")
+
+# (level, category)
+CounterKey = Tuple[str, str]
+
+
+class LogCounters:
+    """Thread-safe per-minute log counts over the last window_minutes."""
+
+    def __init__(self, window_minutes: int):
+        self.window = timedelta(minutes=window_minutes)
+        self._lock = threading.Lock()
+        self._buckets: Dict[datetime, Counter] = {}
+        self.loaded = False
+
+    def window_start(self, now: Optional[datetime] = None) -> datetime:
+        """Start of the oldest minute still counted."""
+        now = floor_bucket(now or datetime.utcnow(), MINUTE)
+        return now - self.window + timedelta(minutes=1)
+
+    def covers(self, date_from: datetime) -> bool:
+        """Whether ranges starting at date_from can be answered."""
+        return self.loaded and to_utc_naive(date_from) >= self.window_start()
+
+    def add(self, entries: Iterable[Tuple[str, str, datetime]]) -> None:
+        """Count (level, category, created_at) entries."""
+        start = self.window_start()
+        with self._lock:
+            for level, category, created_at in entries:
+                bucket = floor_bucket(created_at, MINUTE)
+                if bucket < start:
+                    continue
+                if bucket not in self._buckets:
+                    # At most once per minute: drop buckets left the window
+                    for old in [b for b in self._buckets if b < start]:
+                        del self._buckets[old]
+                    self._buckets[bucket] = Counter()
+                self._buckets[bucket][(level, category)] += 1
+
+    def load(self, buckets: Dict[datetime, Counter]) -> None:
+        with self._lock:
+            self._buckets = buckets
+            self.loaded = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets = {}
+            self.loaded = False
+
+    def counts(self, date_from: datetime, date_to: datetime
+               ) -> "Counter[CounterKey]":
+        """Counts of the minutes from date_from's through date_to's."""
+        first = floor_bucket(date_from, MINUTE)
+        last = to_utc_naive(date_to)
+        totals: Counter = Counter()
+        with self._lock:
+            for bucket, counts in self._buckets.items():
+                if first <= bucket <= last:
+                    totals.update(counts)
+        return totals
+
+    def series(self, date_from: datetime, date_to: datetime
+               ) -> List[Tuple[datetime, "Counter[CounterKey]"]]:
+        """Counts of every minute in the range, empty minutes included."""
+        bucket = floor_bucket(date_from, MINUTE)
+        last = to_utc_naive(date_to)
+        result = []
+        with self._lock:
+            while bucket <= last:
+                result.append((bucket, Counter(self._buckets.get(bucket, ()))))
+                bucket += timedelta(minutes=1)
+        return result
+
+
+def error_totals(counts: "Counter[CounterKey]",
+                 category: Optional[str] = None) -> Tuple[int, int]:
+    """(total, errors) of counts, optionally for a single category."""
+    total = errors = 0
+    for (level, log_category), count in counts.items():
+        if category is not None and log_category != category:
+            continue
+        total += count
+        if level in ERROR_LEVELS:
+            errors += count
+    return total, errors
+
+
+# Global counters shared by all requests of this process
+log_counters = LogCounters(settings.LOG_COUNTER_WINDOW_MINUTES)
+
+
+class LogCounterService:
+    """Service class keeping the log counters in step with the database."""
+
+    @staticmethod
+    def load(db: Session) -> int:
+        """Rebuild the counters from the logs inside the window."""
+        minute = _minute_expression(db.bind.dialect.name)
+        query = select(
+            Log.level, Log.category, minute, func.count(Log.id)
+        ).where(
+            Log.created_at >= log_counters.window_start()
+        ).group_by(Log.level, Log.category, minute)
+
+        buckets: Dict[datetime, Counter] = {}
+        rows = 0
+        for level, category, bucket, count in db.execute(query):
+            if isinstance(bucket, str):
+                bucket = datetime.fromisoformat(bucket)
+            bucket = floor_bucket(bucket, MINUTE)
+            buckets.setdefault(bucket, Counter())[(level, category)] += count
+            rows += count
+        log_counters.load(buckets)
+        return rows
+
+
+def _minute_expression(dialect: str):
+    if dialect == "postgresql":
+        return func.date_trunc("minute", Log.created_at)
+    return func.strftime("%Y-%m-%d %H:%M:00", Log.created_at)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_logs(session: Session, flush_context) -> None:
+    # Rows without an explicit created_at get the server's now()
+    now = datetime.utcnow()
+    flushed = [
+        (log.level, log.category, log.__dict__.get("created_at") or now)
+        for log in session.new if isinstance(log, Log)
+    ]
+    if flushed:
+        session.info.setdefault("flushed_logs", []).extend(flushed)
+
+
+@event.listens_for(Session, "after_commit")
+def _count_committed_logs(session: Session) -> None:
+    committed = session.info.pop("flushed_logs", None)
+    if committed:
+        log_counters.add(committed)
+        report_cache.note_write(
+            "logs", [created_at for _, _, created_at in committed])
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_logs(session: Session) -> None:
+    session.info.pop("flushed_logs", None)
@@ -0,0 +1,68 @@
+"""
+Pagination helpers for list endpoints.
+Provides opaque keyset cursors and cheap total-count estimates.
+"""
+
+from datetime import datetime
+from typing import Optional, Tuple
+import base64
+import json
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.engine import Dialect
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+
+def encode_cursor(recorded_at: datetime, row_id: int) -> str:
+    """Encode a (timestamp, id) keyset position as an opaque cursor."""
+    raw = json.dumps([recorded_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        recorded_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(recorded_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def count_rows(db: Session, query: Select) -> int:
+    """Exact row count of a select statement."""
+    return db.execute(
+        select(func.count()).select_from(query.order_by(None).subquery())
+    ).scalar_one()
+
+
+def explain_statement(query: Select, dialect: Dialect) -> str:
+    """
+    EXPLAIN statement for a select with its parameters rendered inline.
+    Inline values keep it independent of the driver's paramstyle, e.g.
+    asyncpg's positional $1 placeholders.
+    """
+    compiled = query.order_by(None).compile(
+        dialect=dialect, compile_kwargs={"literal_binds": True})
+    return f"EXPLAIN (FORMAT JSON) {compiled}"
+
+
+def estimate_rows(db: Session, query: Select) -> Optional[int]:
+    """
+    Planner row estimate of a select statement.
+    Returns None when the backend cannot estimate without counting.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+
+    plan = db.connection().exec_driver_sql(
+        explain_statement(query, bind.dialect)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
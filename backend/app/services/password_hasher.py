@@ -0,0 +1,127 @@
+"""
+Password hashing off the event loop.
+bcrypt costs a few hundred milliseconds of CPU per call, so hashing and
+verification run on a small process pool instead of the request's event
+loop. Calls beyond the pool and its queue are rejected with 503 rather
+than piling up behind a login burst.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+import asyncio
+import multiprocessing
+import threading
+import time
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
+
+from ..config import settings
+
+# Password hashing configuration
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds",
+    "Time password hashing calls waited for a worker", ["operation"])
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_seconds",
+    "Time spent hashing or verifying a password", ["operation"])
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending", "Password hashing calls queued or running")
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total",
+    "Password hashing calls rejected because the pool was saturated")
+
+
+def _run(operation: str, submitted_at: float, *args: str
+         ) -> Tuple[object, float, float]:
+    """Worker side: the result, time waited and time spent hashing."""
+    started_at = time.time()
+    if operation == "hash":
+        result = pwd_context.hash(*args)
+    else:
+        result = pwd_context.verify(*args)
+    return result, started_at - submitted_at, time.time() - started_at
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded pool of workers."""
+
+    def __init__(self, workers: int, queue_size: int,
+                 use_processes: bool = True):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.use_processes = use_processes
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor: Optional[Executor] = None
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit("verify", plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, operation: str, *args: str):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                PASSWORD_HASH_REJECTED.inc()
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Too many authentication requests, try again",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+            PASSWORD_HASH_PENDING.set(self._pending)
+            executor = self._get_executor()
+        try:
+            result, waited, elapsed = await asyncio.wrap_future(
+                executor.submit(_run, operation, time.time(), *args))
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next call
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication temporarily unavailable",
+                headers={"Retry-After": "1"}
+            )
+        finally:
+            with self._lock:
+                self._pending -= 1
+                PASSWORD_HASH_PENDING.set(self._pending)
+
+        PASSWORD_HASH_WAIT.labels(operation=operation).observe(waited)
+        PASSWORD_HASH_DURATION.labels(operation=operation).observe(elapsed)
+        return result
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.use_processes:
+                # spawn: forking a threaded server can copy held locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"))
+            else:
+                # bcrypt releases the GIL, so threads also hash in parallel
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash")
+        return self._executor
+
+
+# Global hasher shared by all requests of this process
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE,
+    settings.PASSWORD_HASH_PROCESSES)
@@ -0,0 +1,96 @@
+"""
+Principal cache for request authentication.
+Keeps what authorization needs about a user (id, username, active flag,
+role name) for a short TTL, so authenticated requests resolve their user
+without querying the users and roles tables. User changes made through
+the API invalidate the entry at once; the TTL bounds staleness from
+changes made by other processes.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import threading
+import time
+
+from ..config import settings
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as seen by route dependencies."""
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    role_name: Optional[str]
+
+    @classmethod
+    def from_user(cls, user: Any) -> "Principal":
+        return cls(id=user.id, username=user.username, email=user.email,
+                   is_active=bool(user.is_active),
+                   role_name=user.role.name if user.role else None)
+
+
+class PrincipalCache:
+    """Thread-safe LRU of principals by user id, with a TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self) -> int:
+        """Take before loading a user, then pass to put()."""
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() < entry[1]:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, principal: Principal, generation: int) -> None:
+        """Store a principal unless an invalidation ran while loading it."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[principal.id] = (
+                principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses}
+
+
+# Global principal cache shared by all requests of this process
+principal_cache = PrincipalCache(settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+                                 settings.PRINCIPAL_CACHE_TTL_SECONDS)
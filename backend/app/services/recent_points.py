@@ -0,0 +1,327 @@
+"""
+Recent points service for "latest metrics" queries.
+Keeps the newest points of every (name, type, source) series in
+fixed-size ring buffers, loaded from the database at startup and kept
+current by the metric write paths, so recent-value lookups never touch
+the metrics table. The buffer is per process.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import heapq
+import threading
+
+from sqlalchemy import select, func, desc
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models.metrics import Metric
+from .rollup_service import to_utc_naive
+
+# (name, type, source) with a missing source stored as ""
+SeriesKey = Tuple[str, str, str]
+
+
+class RecentPoint(NamedTuple):
+    """Immutable copy of a metric row, readable like the ORM object."""
+    id: int
+    name: str
+    type: str
+    value: float
+    unit: Optional[str]
+    description: Optional[str]
+    source: Optional[str]
+    tags: Optional[str]
+    recorded_at: datetime
+    created_at: datetime
+    created_by: Optional[int]
+
+    @classmethod
+    def from_metric(cls, metric: Any) -> "RecentPoint":
+        return cls(*(getattr(metric, field) for field in cls._fields))
+
+    @property
+    def series_key(self) -> SeriesKey:
+        return (self.name, self.type, self.source or "")
+
+    @property
+    def sort_key(self) -> Tuple[datetime, int]:
+        return (to_utc_naive(self.recorded_at), self.id)
+
+
+class SeriesRing:
+    """
+    Fixed-capacity buffer of a series' newest points.
+    Points normally arrive in time order and are written over the oldest
+    slot; a back-dated point is merged in place. truncated records that
+    older points exist in the database than the buffer holds.
+    """
+
+    __slots__ = ("capacity", "size", "truncated", "_slots", "_start")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.truncated = False
+        self._slots: List[Optional[RecentPoint]] = [None] * capacity
+        self._start = 0
+
+    def newest(self) -> Optional[RecentPoint]:
+        if not self.size:
+            return None
+        return self._slots[(self._start + self.size - 1) % self.capacity]
+
+    def oldest(self) -> Optional[RecentPoint]:
+        return self._slots[self._start] if self.size else None
+
+    def append(self, point: RecentPoint) -> None:
+        newest = self.newest()
+        if newest is not None and point.sort_key < newest.sort_key:
+            self._insert_sorted(point)
+            return
+
+        if self.size < self.capacity:
+            self._slots[(self._start + self.size) % self.capacity] = point
+            self.size += 1
+        else:
+            self._slots[self._start] = point
+            self._start = (self._start + 1) % self.capacity
+            self.truncated = True
+
+    def _insert_sorted(self, point: RecentPoint) -> None:
+        points = list(reversed(list(self.newest_first())))
+        if len(points) == self.capacity and point.sort_key < points[0].sort_key:
+            # Older than everything kept
+            self.truncated = True
+            return
+        points.append(point)
+        points.sort(key=lambda p: p.sort_key)
+        self.replace(points, self.truncated)
+
+    def replace(self, points: List[RecentPoint], truncated: bool) -> None:
+        """Reset the ring to the given points, oldest first."""
+        if len(points) > self.capacity:
+            points = points[-self.capacity:]
+            truncated = True
+        self._slots = list(points) + [None] * (self.capacity - len(points))
+        self._start = 0
+        self.size = len(points)
+        self.truncated = truncated
+
+    def newest_first(self) -> Iterable[RecentPoint]:
+        for offset in range(self.size - 1, -1, -1):
+            yield self._slots[(self._start + offset) % self.capacity]
+
+
+class RecentPointsBuffer:
+    """
+    Thread-safe collection of series rings with a bounded series count.
+    Queries return None when memory alone cannot give the exact answer,
+    so callers fall back to the database.
+    """
+
+    def __init__(self, capacity: int, max_series: int):
+        self.capacity = capacity
+        self.max_series = max_series
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._series: "OrderedDict[SeriesKey, SeriesRing]" = OrderedDict()
+        # Newest point among series dropped to honour max_series
+        self._evicted_newest: Optional[Tuple[datetime, int]] = None
+
+    @property
+    def series_count(self) -> int:
+        return len(self._series)
+
+    def load(self, series: Dict[SeriesKey, Tuple[List[RecentPoint], bool]]
+             ) -> None:
+        """Replace the contents with points per series, oldest first."""
+        ranked = sorted(series.items(),
+                        key=lambda item: item[1][0][-1].sort_key)
+        kept = ranked[-self.max_series:]
+        dropped = ranked[:-self.max_series] if len(ranked) > len(kept) else []
+        with self._lock:
+            self._series.clear()
+            for key, (points, truncated) in kept:
+                ring = SeriesRing(self.capacity)
+                ring.replace(points, truncated)
+                self._series[key] = ring
+            self._evicted_newest = (
+                dropped[-1][1][0][-1].sort_key if dropped else None)
+            self.loaded = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._evicted_newest = None
+            self.loaded = False
+
+    def add(self, points: Iterable[RecentPoint]) -> None:
+        if not self.loaded:
+            return
+        with self._lock:
+            for point in points:
+                key = point.series_key
+                ring = self._series.get(key)
+                if ring is None:
+                    ring = self._series[key] = SeriesRing(self.capacity)
+                    self._evict()
+                self._series.move_to_end(key)
+                ring.append(point)
+
+    def _evict(self) -> None:
+        while len(self._series) > self.max_series:
+            _, ring = self._series.popitem(last=False)
+            newest = ring.newest()
+            if newest is not None and (self._evicted_newest is None or
+                                       newest.sort_key > self._evicted_newest):
+                self._evicted_newest = newest.sort_key
+
+    def replace_series(self, key: SeriesKey, points: List[RecentPoint],
+                       truncated: bool) -> None:
+        if not self.loaded:
+            return
+        with self._lock:
+            if not points:
+                self._series.pop(key, None)
+                return
+            ring = self._series.get(key)
+            if ring is None:
+                ring = self._series[key] = SeriesRing(self.capacity)
+                self._evict()
+            ring.replace(points, truncated)
+
+    def latest(self, limit: int, name: Optional[str] = None,
+               type: Optional[str] = None, source: Optional[str] = None,
+               since: Optional[datetime] = None,
+               until: Optional[datetime] = None
+               ) -> Optional[List[RecentPoint]]:
+        """
+        Newest points, newest first, across the series matching the
+        filters and with recorded_at within [since, until].
+        """
+        if not self.loaded or limit > self.capacity:
+            return None
+        since = to_utc_naive(since) if since else None
+        until = to_utc_naive(until) if until else None
+
+        candidates = []
+        with self._lock:
+            for (s_name, s_type, s_source), ring in self._series.items():
+                if ((name is not None and s_name != name) or
+                        (type is not None and s_type != type) or
+                        (source is not None and s_source != source)):
+                    continue
+                matched = 0
+                for point in ring.newest_first():
+                    recorded_at = point.sort_key[0]
+                    if until is not None and recorded_at > until:
+                        continue
+                    if since is not None and recorded_at < since:
+                        break
+                    candidates.append(point)
+                    matched += 1
+                    if matched == limit:
+                        break
+                else:
+                    # Ran out of buffered points: older ones may be missing
+                    oldest = ring.oldest()
+                    if ring.truncated and (
+                            since is None or oldest.sort_key[0] >= since):
+                        return None
+            evicted = self._evicted_newest
+
+        result = heapq.nlargest(limit, candidates, key=lambda p: p.sort_key)
+        if evicted is not None and (
+                len(result) < limit or result[-1].sort_key <= evicted):
+            return None
+        return result
+
+
+# Global buffer shared by the metric read and write paths
+recent_points = RecentPointsBuffer(settings.RECENT_POINTS_PER_SERIES,
+                                   settings.RECENT_POINTS_MAX_SERIES)
+
+
+class RecentPointsService:
+    """Service class keeping the recent points buffer in sync."""
+
+    @staticmethod
+    def series_filter(key: SeriesKey):
+        name, type_, source = key
+        return [Metric.name == name, Metric.type == type_,
+                func.coalesce(Metric.source, "") == source]
+
+    @staticmethod
+    def load(db: Session) -> int:
+        """Fill the buffer with the newest points of every series."""
+        rank = func.row_number().over(
+            partition_by=(Metric.name, Metric.type,
+                          func.coalesce(Metric.source, "")),
+            order_by=(desc(Metric.recorded_at), desc(Metric.id))
+        ).label("rank")
+        ranked = select(Metric.id, rank).subquery()
+        # One extra row per series tells whether older points exist
+        query = select(Metric).join(ranked, Metric.id == ranked.c.id).where(
+            ranked.c.rank <= recent_points.capacity + 1
+        ).order_by(Metric.recorded_at, Metric.id)
+
+        series: Dict[SeriesKey, List[RecentPoint]] = {}
+        for metric in db.execute(query).scalars():
+            point = RecentPoint.from_metric(metric)
+            series.setdefault(point.series_key, []).append(point)
+
+        recent_points.load({
+            key: (points[-recent_points.capacity:],
+                  len(points) > recent_points.capacity)
+            for key, points in series.items()
+        })
+        return sum(len(points) for points in series.values())
+
+    @staticmethod
+    def record(metrics: Iterable[Any]) -> None:
+        """Append newly committed metrics."""
+        recent_points.add(RecentPoint.from_metric(m) for m in metrics)
+
+    @staticmethod
+    def reload_series(db: Session, keys: Iterable[SeriesKey]) -> None:
+        """Re-read series after updates or deletes changed their points."""
+        if not recent_points.loaded:
+            return
+        for key in set(keys):
+            metrics = db.execute(
+                select(Metric).where(*RecentPointsService.series_filter(key))
+                .order_by(desc(Metric.recorded_at), desc(Metric.id))
+                .limit(recent_points.capacity + 1)
+            ).scalars().all()
+            points = [RecentPoint.from_metric(m) for m in reversed(metrics)]
+            recent_points.replace_series(
+                key, points[-recent_points.capacity:],
+                len(points) > recent_points.capacity)
+
+    @staticmethod
+    def latest(db: Session, limit: int, name: Optional[str] = None,
+               type: Optional[str] = None, source: Optional[str] = None,
+               since: Optional[datetime] = None,
+               until: Optional[datetime] = None) -> List[Any]:
+        """Newest metrics from memory, or from the database if needed."""
+        points = recent_points.latest(limit, name, type, source, since, until)
+        if points is not None:
+            return points
+
+        query = select(Metric)
+        if name is not None:
+            query = query.where(Metric.name == name)
+        if type is not None:
+            query = query.where(Metric.type == type)
+        if source is not None:
+            query = query.where(func.coalesce(Metric.source, "") == source)
+        if since is not None:
+            query = query.where(Metric.recorded_at >= since)
+        if until is not None:
+            query = query.where(Metric.recorded_at <= until)
+        return db.execute(
+            query.order_by(desc(Metric.recorded_at), desc(Metric.id))
+            .limit(limit)
+        ).scalars().all()
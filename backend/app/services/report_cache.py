@@ -0,0 +1,198 @@
+"""
+Report result cache.
+Keeps computed reports keyed on their normalized parameters. An entry
+stays valid until a write lands inside the time range it was computed
+over, which each table's write watermark records, or until its TTL runs
+out for writes made by other processes. Eviction is LRU within a byte
+budget.
+"""
+
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Hashable, Iterable, Optional, Sequence, Tuple
+import json
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+
+from ..config import settings
+from .rollup_service import to_utc_naive
+
+# (table, start, end); a None bound leaves that side of the range open
+Dependency = Tuple[str, Optional[datetime], Optional[datetime]]
+
+REPORT_CACHE_REQUESTS = Counter(
+    "report_cache_requests_total", "Report cache lookups", ["report", "result"])
+REPORT_CACHE_EVICTIONS = Counter(
+    "report_cache_evictions_total", "Report cache entries evicted for space")
+REPORT_CACHE_BYTES = Gauge(
+    "report_cache_bytes", "Approximate size of the cached reports")
+
+
+def align_window(value: datetime, seconds: int) -> datetime:
+    """Floor a datetime to a multiple of seconds since the epoch."""
+    value = to_utc_naive(value).replace(microsecond=0)
+    if seconds <= 1:
+        return value
+    offset = int((value - datetime(1970, 1, 1)).total_seconds()) % seconds
+    return value - timedelta(seconds=offset)
+
+
+class WriteWatermark:
+    """
+    Write generation of one table and the time ranges of its recent
+    writes. Writes older than the history are treated as overlapping.
+    """
+
+    def __init__(self, history: int = 1024):
+        self._lock = threading.Lock()
+        self.generation = 0
+        self._writes: deque = deque(maxlen=history)
+
+    def note(self, low: Optional[datetime] = None,
+             high: Optional[datetime] = None) -> None:
+        """Record a write; no bounds means it may touch any range."""
+        with self._lock:
+            self.generation += 1
+            self._writes.append((self.generation, low, high))
+
+    def changed_since(self, generation: int, start: Optional[datetime],
+                      end: Optional[datetime]) -> bool:
+        """Whether a write after generation may fall in [start, end]."""
+        with self._lock:
+            if generation == self.generation:
+                return False
+            if not self._writes or self._writes[0][0] > generation + 1:
+                return True
+            for write_generation, low, high in reversed(self._writes):
+                if write_generation <= generation:
+                    break
+                if low is None or high is None:
+                    return True
+                if (end is None or low <= end) and \
+                        (start is None or high >= start):
+                    return True
+            return False
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    dependencies: Sequence[Dependency]
+    generations: Dict[str, int]
+    expires_at: float
+
+
+class ReportCache:
+    """LRU cache of report results invalidated by write watermarks."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._watermarks: Dict[str, WriteWatermark] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def watermark(self, table: str) -> WriteWatermark:
+        with self._lock:
+            if table not in self._watermarks:
+                self._watermarks[table] = WriteWatermark()
+            return self._watermarks[table]
+
+    def note_write(self, table: str,
+                   timestamps: Optional[Iterable[datetime]] = None) -> None:
+        """
+        Record a committed write to a table. Timestamps are the time
+        column values written; None means the write can affect any range.
+        """
+        if timestamps is None:
+            self.watermark(table).note()
+            return
+        values = [to_utc_naive(value) for value in timestamps if value]
+        if values:
+            self.watermark(table).note(min(values), max(values))
+
+    def generations(self, tables: Iterable[str]) -> Dict[str, int]:
+        """Watermarks to take before computing a report for put()."""
+        return {table: self.watermark(table).generation for table in tables}
+
+    def get(self, report: str, key: Hashable) -> Optional[Any]:
+        value = self._lookup(key)
+        result = "hit" if value is not None else "miss"
+        REPORT_CACHE_REQUESTS.labels(report=report, result=result).inc()
+        return value
+
+    def put(self, key: Hashable, value: Any,
+            dependencies: Sequence[Dependency],
+            generations: Dict[str, int]) -> None:
+        """Store a result unless a write it depends on landed meanwhile."""
+        if not self.enabled or self._stale(dependencies, generations):
+            return
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        entry = _Entry(value, size, dependencies, generations,
+                       time.monotonic() + self.ttl_seconds)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                REPORT_CACHE_EVICTIONS.inc()
+            REPORT_CACHE_BYTES.set(self._bytes)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            REPORT_CACHE_BYTES.set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes,
+                    "max_bytes": self.max_bytes, "hits": self.hits,
+                    "misses": self.misses}
+
+    def _lookup(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+        valid = (entry is not None and time.monotonic() < entry.expires_at
+                 and not self._stale(entry.dependencies, entry.generations))
+        with self._lock:
+            if valid and self._entries.get(key) is entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None and self._entries.get(key) is entry:
+                del self._entries[key]
+                self._bytes -= entry.size
+                REPORT_CACHE_BYTES.set(self._bytes)
+            self.misses += 1
+            return None
+
+    def _stale(self, dependencies: Sequence[Dependency],
+               generations: Dict[str, int]) -> bool:
+        return any(
+            self.watermark(table).changed_since(
+                generations[table], start, end)
+            for table, start, end in dependencies
+        )
+
+
+# Global report cache shared by all requests of this process
+report_cache = ReportCache(settings.REPORT_CACHE_MAX_BYTES,
+                           settings.REPORT_CACHE_TTL_SECONDS)
@@ -0,0 +1,58 @@
+"""
+Report engine for metric reports.
+Reads a range once, grouped by day, type and source, and folds the
+grouped rows into every aggregate a report needs, instead of scanning the
+same range once per output.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from .rollup_service import RollupAggregate, RollupService
+
+
+@dataclass
+class MetricsSummary:
+    """Aggregates of a metrics summary report."""
+    by_type: Dict[str, RollupAggregate] = field(default_factory=dict)
+    by_day: Dict[date, RollupAggregate] = field(default_factory=dict)
+    by_source: Dict[Optional[str], RollupAggregate] = field(
+        default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(aggregate.count for aggregate in self.by_type.values())
+
+    def top_sources(self, limit: int = 10
+                    ) -> List[Tuple[Optional[str], RollupAggregate]]:
+        """Sources with the most metrics; ties are ordered by name."""
+        return sorted(self.by_source.items(),
+                      key=lambda item: (-item[1].count, item[0] or ""))[:limit]
+
+
+class ReportEngine:
+    """Service class computing metric reports in a single pass."""
+
+    @staticmethod
+    def metrics_summary(db: Session, date_from: datetime, date_to: datetime,
+                        type_filter: Optional[str] = None) -> MetricsSummary:
+        """
+        Per-type, per-day and per-source aggregates of an inclusive range,
+        from one grouped read of the rollups and raw edges.
+        """
+        grouped = RollupService.collect(
+            db, date_from, date_to, group_by=("type", "source"),
+            per_day=True, type_filter=type_filter)
+
+        summary = MetricsSummary()
+        for (day, metric_type, source), aggregate in grouped.items():
+            for key, target in ((metric_type, summary.by_type),
+                                (day, summary.by_day),
+                                (source, summary.by_source)):
+                target.setdefault(key, RollupAggregate()).add(
+                    aggregate.count, aggregate.total, aggregate.minimum,
+                    aggregate.maximum, aggregate.sum_squares)
+        return summary
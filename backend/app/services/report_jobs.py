@@ -0,0 +1,213 @@
+"""
+Background report jobs.
+Long reports and exports run on a bounded pool of worker threads instead
+of inside the request; each result is written to local disk for later
+download. Identical jobs submitted by the same user while one is still
+queued or running share that job.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum as PyEnum
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Hashable, Optional
+from typing import Tuple, Union
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# A runner receives the worker's session factory and yields result chunks
+JobRunner = Callable[[async_sessionmaker], AsyncIterator[Union[str, bytes]]]
+
+
+class JobStatus(PyEnum):
+    """Enum for report job states."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class ReportJob:
+    """A submitted report and where its result is written."""
+    id: str
+    template_id: str
+    parameters: Dict[str, Any]
+    filename: str
+    media_type: str
+    created_by: str
+    status: JobStatus = JobStatus.QUEUED
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    bytes_written: int = 0
+    chunks_written: int = 0
+    error: Optional[str] = None
+    path: Optional[Path] = None
+    expires_at: float = 0.0  # monotonic; set when the job finishes
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.COMPLETED, JobStatus.FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        def isoformat(value):
+            return value.isoformat() if value else None
+        return {
+            "id": self.id,
+            "template_id": self.template_id,
+            "parameters": self.parameters,
+            "status": self.status.value,
+            "progress": {
+                "bytes_written": self.bytes_written,
+                "chunks_written": self.chunks_written
+            },
+            "created_by": self.created_by,
+            "created_at": isoformat(self.created_at),
+            "started_at": isoformat(self.started_at),
+            "finished_at": isoformat(self.finished_at),
+            "error": self.error,
+            "result_url": (f"/api/reports/jobs/{self.id}/result"
+                           if self.status == JobStatus.COMPLETED else None)
+        }
+
+
+class ReportJobQueue:
+    """
+    Runs report jobs on a fixed number of worker threads.
+    Each worker runs the job's async runner on its own event loop with its
+    own connection, so jobs never block the API's event loop. At most
+    workers + queue_size jobs are accepted at once.
+    """
+
+    def __init__(self, workers: int, queue_size: int, directory: str,
+                 ttl_seconds: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ReportJob] = {}
+        self._active: Dict[Hashable, str] = {}  # dedupe key -> job id
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def submit(self, key: Hashable, runner: JobRunner, template_id: str,
+               parameters: Dict[str, Any], filename: str, media_type: str,
+               created_by: str) -> Tuple[ReportJob, bool]:
+        """
+        Queue a job, or return the queued or running job with the same
+        key. The flag is True when a new job was created.
+        """
+        self.expire()
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id is not None:
+                return self._jobs[active_id], False
+            if len(self._active) >= self.workers + self.queue_size:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Report job queue is full, try again later",
+                    headers={"Retry-After": "30"}
+                )
+
+            job = ReportJob(id=uuid.uuid4().hex, template_id=template_id,
+                            parameters=parameters, filename=filename,
+                            media_type=media_type, created_by=created_by)
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="report-job")
+            self._executor.submit(self._run, job, key, runner)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def expire(self) -> None:
+        """Forget finished jobs past their TTL and delete their results."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.finished and job.expires_at <= now]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.path is not None:
+                job.path.unlink(missing_ok=True)
+
+    async def expire_loop(self, interval: float) -> None:
+        """Expire finished jobs every interval seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.expire()
+            except Exception:
+                logger.exception("Report job expiry failed")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _run(self, job: ReportJob, key: Hashable, runner: JobRunner) -> None:
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        try:
+            asyncio.run(self._execute(job, runner))
+            job.status = JobStatus.COMPLETED
+        except Exception as e:
+            logger.exception("Report job %s failed", job.id)
+            job.error = str(e) or type(e).__name__
+            job.status = JobStatus.FAILED
+        finally:
+            job.finished_at = datetime.utcnow()
+            job.expires_at = time.monotonic() + self.ttl_seconds
+            with self._lock:
+                self._active.pop(key, None)
+
+    async def _execute(self, job: ReportJob, runner: JobRunner) -> None:
+        # Connections belong to the loop that opened them, so each job gets
+        # an unpooled engine on the worker's own loop
+        engine = create_async_engine(
+            AsyncSessionLocal.kw["bind"].url, poolclass=NullPool)
+        session_factory = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        partial = self.directory / f"{job.id}.part"
+        try:
+            with open(partial, "wb") as output:
+                async for chunk in runner(session_factory):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    output.write(chunk)
+                    job.bytes_written += len(chunk)
+                    job.chunks_written += 1
+            path = self.directory / job.id
+            os.replace(partial, path)
+            job.path = path
+        finally:
+            partial.unlink(missing_ok=True)
+            await engine.dispose()
+
+
+# Global job queue shared by all requests of this process
+report_jobs = ReportJobQueue(
+    settings.REPORT_JOB_WORKERS, settings.REPORT_JOB_QUEUE_SIZE,
+    settings.REPORT_JOB_DIR, settings.REPORT_JOB_TTL_SECONDS)
@@ -0,0 +1,666 @@
+"""
+Rollup service for pre-aggregated metric data.
+Maintains minute, hourly and daily rollups with quantile sketches and
+answers range aggregations from them.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+from typing import Tuple
+import asyncio
+import logging
+import math
+
+from sqlalchemy import select, delete, update, func, case, or_, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.metrics import Metric
+from ..models.rollups import MetricRollup, RollupGranularity
+from .tdigest import TDigest
+
+MINUTE = RollupGranularity.MINUTE.value
+HOUR = RollupGranularity.HOUR.value
+DAY = RollupGranularity.DAY.value
+
+# Bucket sizes ordered from finest to coarsest
+BUCKET_SIZES = {
+    MINUTE: timedelta(minutes=1),
+    HOUR: timedelta(hours=1),
+    DAY: timedelta(days=1),
+}
+
+# Series columns that rollups can be grouped by
+SERIES_COLUMNS = ("name", "type", "source")
+
+# Dialects with native INSERT ... ON CONFLICT DO UPDATE support
+_UPSERT_INSERTS = {
+    "postgresql": pg_insert,
+    "sqlite": sqlite_insert,
+}
+
+_CONFLICT_COLUMNS = ["granularity", "bucket_start", "name", "type", "source"]
+
+# Bucket keys looked up per statement when merging sketches
+_SKETCH_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Convert a datetime to naive UTC, the representation used by rollups."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def floor_bucket(value: datetime, granularity: str) -> datetime:
+    """Return the start of the bucket containing the given datetime."""
+    value = to_utc_naive(value)
+    if granularity == DAY:
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == MINUTE:
+        return value.replace(second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_bucket(value: datetime, granularity: str) -> datetime:
+    """Return the first bucket boundary at or after the given datetime."""
+    floored = floor_bucket(value, granularity)
+    if floored == to_utc_naive(value):
+        return floored
+    return floored + BUCKET_SIZES[granularity]
+
+
+@dataclass
+class RollupAggregate:
+    """Mergeable aggregate of metric values."""
+    count: int = 0
+    total: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    sum_squares: float = 0.0
+
+    def add(self, count: int, total: float, minimum: float,
+            maximum: float, sum_squares: float) -> None:
+        """Merge another partial aggregate into this one."""
+        if not count:
+            return
+        self.count += int(count)
+        self.total += float(total or 0.0)
+        self.sum_squares += float(sum_squares or 0.0)
+        if self.minimum is None or minimum < self.minimum:
+            self.minimum = float(minimum)
+        if self.maximum is None or maximum > self.maximum:
+            self.maximum = float(maximum)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stddev(self) -> float:
+        if not self.count:
+            return 0.0
+        variance = self.sum_squares / self.count - self.mean ** 2
+        return math.sqrt(max(variance, 0.0))
+
+
+@dataclass(frozen=True)
+class RangeSegment:
+    """Part of a queried time range and the table that answers it."""
+    granularity: Optional[str]  # None means the raw metrics table
+    start: datetime
+    end: datetime
+    include_end: bool = False
+
+
+class RollupService:
+    """Service class for maintaining and querying metric rollups."""
+
+    @staticmethod
+    def apply_metrics(db: Session, metrics: Iterable[Any],
+                      coarse_sketches: bool = False) -> int:
+        """
+        Fold newly written metrics into the minute, hourly and daily
+        rollups. Sketches are merged into the minute buckets only; hourly
+        and daily sketches are composed from them when queried and by
+        compact_sketches, except for metrics past the minute retention or
+        when coarse_sketches is set, as when rebuilding whole days.
+        Accepts ORM metrics, rows or mappings with name, type, source,
+        value and recorded_at. Does not commit, so the caller controls the
+        transaction the rollups are written in.
+        """
+        deltas: Dict[tuple, RollupAggregate] = {}
+        sketches: Dict[tuple, TDigest] = {}
+        minute_cutoff = RollupService.minute_cutoff()
+        for metric in metrics:
+            if isinstance(metric, Mapping):
+                metric = SimpleNamespace(**metric)
+            series = (metric.name, metric.type, metric.source or "")
+            value = float(metric.value)
+            # Past the minute rollup retention window: no minute bucket
+            has_minute = floor_bucket(metric.recorded_at,
+                                      MINUTE) >= minute_cutoff
+            for granularity in BUCKET_SIZES:
+                if granularity == MINUTE and not has_minute:
+                    continue
+                bucket_start = floor_bucket(metric.recorded_at, granularity)
+                key = (granularity, bucket_start) + series
+                deltas.setdefault(key, RollupAggregate()).add(
+                    1, value, value, value, value * value)
+                if granularity != MINUTE and has_minute and \
+                        not coarse_sketches:
+                    continue
+                if key not in sketches:
+                    sketches[key] = TDigest(settings.SKETCH_COMPRESSION)
+                sketches[key].add(value)
+
+        RollupService._upsert(db, deltas)
+        RollupService._merge_sketches(db, sketches)
+        return len(deltas)
+
+    @staticmethod
+    def minute_cutoff(now: Optional[datetime] = None) -> datetime:
+        """Oldest minute bucket kept by the minute rollup retention."""
+        now = to_utc_naive(now) if now else datetime.utcnow()
+        return floor_bucket(
+            now - timedelta(days=settings.SERIES_MINUTE_RETENTION_DAYS),
+            MINUTE)
+
+    @staticmethod
+    def purge_minute_rollups(db: Session,
+                             now: Optional[datetime] = None) -> int:
+        """
+        Delete minute rollups older than the retention window. Hourly and
+        daily rollups still cover that range; their sketches are compacted
+        first, while the minute sketches they are composed from remain.
+        Returns the rows deleted; the caller commits.
+        """
+        RollupService.compact_sketches(db)
+        result = db.execute(delete(MetricRollup).where(
+            MetricRollup.granularity == MINUTE,
+            MetricRollup.bucket_start < RollupService.minute_cutoff(now)
+        ))
+        return result.rowcount
+
+    @staticmethod
+    async def retention_loop(interval: float) -> None:
+        """
+        Compact hourly and daily sketches and purge expired minute
+        rollups every interval seconds.
+        """
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.run_sync(RollupService.purge_minute_rollups)
+                    await db.commit()
+            except Exception:
+                logger.exception("Minute rollup purge failed")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def refresh_series(db: Session,
+                       points: Iterable[Tuple[str, str, Optional[str],
+                                              datetime]]) -> None:
+        """
+        Recompute the rollups of the days touched by updated or deleted
+        metrics. Points are (name, type, source, recorded_at) tuples.
+        """
+        days = {
+            (name, metric_type, source or "", floor_bucket(recorded_at, DAY))
+            for name, metric_type, source, recorded_at in points
+        }
+        for name, metric_type, source, day_start in days:
+            day_end = day_start + BUCKET_SIZES[DAY]
+            db.execute(delete(MetricRollup).where(
+                MetricRollup.name == name,
+                MetricRollup.type == metric_type,
+                MetricRollup.source == source,
+                MetricRollup.bucket_start >= day_start,
+                MetricRollup.bucket_start < day_end
+            ))
+
+            source_filter = (
+                or_(Metric.source.is_(None), Metric.source == "")
+                if source == "" else Metric.source == source
+            )
+            rows = db.execute(select(
+                Metric.name, Metric.type, Metric.source,
+                Metric.value, Metric.recorded_at
+            ).where(
+                Metric.name == name,
+                Metric.type == metric_type,
+                source_filter,
+                Metric.recorded_at >= day_start,
+                Metric.recorded_at < day_end
+            )).all()
+            RollupService.apply_metrics(db, rows, coarse_sketches=True)
+
+    @staticmethod
+    def rebuild(db: Session, date_from: Optional[datetime] = None,
+                date_to: Optional[datetime] = None,
+                chunk_size: int = 5000) -> int:
+        """
+        Rebuild rollups from the raw metrics table.
+        The range is widened to whole days. Returns the number of metrics
+        read; the caller commits.
+        """
+        rollup_filters = []
+        metric_filters = []
+        if date_from:
+            start = floor_bucket(date_from, DAY)
+            rollup_filters.append(MetricRollup.bucket_start >= start)
+            metric_filters.append(Metric.recorded_at >= start)
+        if date_to:
+            end = floor_bucket(date_to, DAY) + BUCKET_SIZES[DAY]
+            rollup_filters.append(MetricRollup.bucket_start < end)
+            metric_filters.append(Metric.recorded_at < end)
+
+        db.execute(delete(MetricRollup).where(*rollup_filters))
+
+        result = db.execute(
+            select(Metric.name, Metric.type, Metric.source,
+                   Metric.value, Metric.recorded_at)
+            .where(*metric_filters)
+            .execution_options(yield_per=chunk_size)
+        )
+        processed = 0
+        for partition in result.partitions():
+            RollupService.apply_metrics(db, partition, coarse_sketches=True)
+            processed += len(partition)
+        return processed
+
+    @staticmethod
+    def compose_sketches(db: Session, granularity: str,
+                         wanted: Mapping[tuple, int]) -> Dict[tuple, TDigest]:
+        """
+        Build hourly or daily sketches from the finer rollups inside their
+        buckets. wanted maps (bucket_start, name, type, source) keys to the
+        bucket's sample_count; a key is only returned when the finer
+        sketches cover exactly that many samples. Hours without a complete
+        sketch of their own are composed from their minutes in turn.
+        """
+        if not wanted:
+            return {}
+        finer = MINUTE if granularity == HOUR else HOUR
+        composed: Dict[tuple, TDigest] = {}
+        weights: Dict[tuple, int] = {}
+        pending: Dict[tuple, int] = {}
+        for key, row in RollupService._finer_rows(db, granularity, wanted,
+                                                  MetricRollup.sketch):
+            if row.sketch and row.sketch_count == row.sample_count:
+                RollupService._add_sketch(
+                    composed, weights, key,
+                    TDigest.from_bytes(row.sketch), row.sample_count)
+            elif finer == HOUR:
+                pending[(row.bucket_start,) + key[1:]] = row.sample_count
+
+        for hour_key, sketch in RollupService.compose_sketches(
+                db, HOUR, pending).items():
+            key = (floor_bucket(hour_key[0], granularity),) + hour_key[1:]
+            RollupService._add_sketch(composed, weights, key, sketch,
+                                      pending[hour_key])
+
+        return {key: sketch for key, sketch in composed.items()
+                if weights[key] == wanted[key]}
+
+    @staticmethod
+    def compact_sketches(db: Session, now: Optional[datetime] = None) -> int:
+        """
+        Store the composed sketches of hourly and daily buckets whose own
+        sketch no longer covers all their samples. Hours are composed
+        from minutes, so only those the minute rollups still cover are
+        tried; days are composed from hours. Returns the buckets updated;
+        the caller commits.
+        """
+        hour_cutoff = floor_bucket(RollupService.minute_cutoff(now), HOUR)
+        updated = 0
+        for granularity in (HOUR, DAY):
+            query = select(
+                MetricRollup.id, MetricRollup.bucket_start, MetricRollup.name,
+                MetricRollup.type, MetricRollup.source,
+                MetricRollup.sample_count
+            ).where(
+                MetricRollup.granularity == granularity,
+                or_(MetricRollup.sketch_count.is_(None),
+                    MetricRollup.sketch_count != MetricRollup.sample_count)
+            )
+            if granularity == HOUR:
+                query = query.where(MetricRollup.bucket_start >= hour_cutoff)
+            # Locked so writers cannot add samples while composing
+            rows = db.execute(query.with_for_update()).all()
+            wanted = {tuple(row[1:5]): row.sample_count for row in rows}
+            ids = {tuple(row[1:5]): row.id for row in rows}
+            updates = [
+                {"id": ids[key], "sketch": sketch.to_bytes(),
+                 "sketch_count": wanted[key]}
+                for key, sketch in RollupService.compose_sketches(
+                    db, granularity, wanted).items()
+            ]
+            if updates:
+                db.execute(update(MetricRollup), updates)
+                updated += len(updates)
+        return updated
+
+    @staticmethod
+    def incomplete_sketch_days(db: Session) -> List[datetime]:
+        """
+        Days with hourly buckets holding samples that neither their own
+        sketch nor complete minute sketches cover, as with rollups written
+        before sketches existed. Their percentiles stay unavailable until
+        the days are rebuilt from the raw metrics.
+        """
+        rows = db.execute(select(
+            MetricRollup.bucket_start, MetricRollup.name, MetricRollup.type,
+            MetricRollup.source, MetricRollup.sample_count
+        ).where(
+            MetricRollup.granularity == HOUR,
+            or_(MetricRollup.sketch_count.is_(None),
+                MetricRollup.sketch_count != MetricRollup.sample_count)
+        )).all()
+        wanted = {tuple(row[:4]): row.sample_count for row in rows}
+        # Minutes are read after their hours, so samples written in
+        # between can only hide an incomplete hour, never invent one
+        covered: Dict[tuple, int] = {}
+        for key, row in RollupService._finer_rows(db, HOUR, wanted):
+            if row.sketch_count == row.sample_count:
+                covered[key] = covered.get(key, 0) + row.sample_count
+        return sorted({floor_bucket(key[0], DAY)
+                       for key, count in wanted.items()
+                       if covered.get(key, 0) < count})
+
+    @staticmethod
+    def plan_segments(date_from: datetime, date_to: datetime,
+                      coarsest: str = DAY) -> List[RangeSegment]:
+        """
+        Split an inclusive range into segments answered by the coarsest
+        rollup, up to the given granularity, that covers them exactly.
+        Only the ragged edges shorter than an hour are read from the raw
+        metrics table, and no raw segment crosses an hour boundary.
+        """
+        start = to_utc_naive(date_from)
+        end = to_utc_naive(date_to)
+        if end < start:
+            return []
+
+        hour_start = ceil_bucket(start, HOUR)
+        hour_end = floor_bucket(end, HOUR)
+        day_start = ceil_bucket(start, DAY)
+        day_end = floor_bucket(end, DAY)
+
+        if coarsest == DAY and day_start < day_end:
+            bounds = [
+                (None, start, hour_start),
+                (HOUR, hour_start, day_start),
+                (DAY, day_start, day_end),
+                (HOUR, day_end, hour_end),
+            ]
+            tail_start = hour_end
+        elif hour_start < hour_end:
+            bounds = [
+                (None, start, hour_start),
+                (HOUR, hour_start, hour_end),
+            ]
+            tail_start = hour_end
+        elif hour_start <= end:
+            # Less than two hours crossing an hour: keep the hours apart
+            bounds = [(None, start, hour_start)]
+            tail_start = hour_start
+        else:
+            bounds = []
+            tail_start = start
+
+        segments = [
+            RangeSegment(granularity, seg_start, seg_end)
+            for granularity, seg_start, seg_end in bounds
+            if seg_start < seg_end
+        ]
+        segments.append(RangeSegment(None, tail_start, end, include_end=True))
+        return segments
+
+    @staticmethod
+    def collect(db: Session, date_from: datetime, date_to: datetime,
+                group_by: Sequence[str] = (), per_day: bool = False,
+                type_filter: Optional[str] = None, per_hour: bool = False
+                ) -> Dict[tuple, RollupAggregate]:
+        """
+        Aggregate metric values over an inclusive range.
+        Results are keyed by the group_by column values, prefixed with the
+        UTC date when per_day is set, or with the start of the UTC hour
+        when per_hour is set. A missing source is keyed as None.
+        """
+        for column in group_by:
+            if column not in SERIES_COLUMNS:
+                raise ValueError(f"Cannot group rollups by '{column}'")
+
+        per_bucket = per_day or per_hour
+        segments = RollupService.plan_segments(
+            date_from, date_to, coarsest=HOUR if per_hour else DAY)
+        results: Dict[tuple, RollupAggregate] = {}
+        for segment in segments:
+            if segment.granularity is None:
+                rows = RollupService._raw_rows(
+                    db, segment, group_by, type_filter)
+            else:
+                rows = RollupService._rollup_rows(
+                    db, segment, group_by, per_bucket, type_filter)
+
+            for row in rows:
+                bucket, *groups, count, total, minimum, maximum, squares = row
+                if not count:
+                    continue
+                groups = tuple(
+                    value or None if column == "source" else value
+                    for column, value in zip(group_by, groups)
+                )
+                if per_hour:
+                    key = (floor_bucket(bucket, HOUR),) + groups
+                else:
+                    key = ((bucket.date(),) if per_day else ()) + groups
+                results.setdefault(key, RollupAggregate()).add(
+                    count, total, minimum, maximum, squares)
+
+        return results
+
+    @staticmethod
+    def _raw_rows(db: Session, segment: RangeSegment,
+                  group_by: Sequence[str], type_filter: Optional[str]):
+        """Aggregate a raw segment, which never spans more than one day."""
+        group_columns = [getattr(Metric, column) for column in group_by]
+        upper = (Metric.recorded_at <= segment.end if segment.include_end
+                 else Metric.recorded_at < segment.end)
+        query = select(
+            *group_columns,
+            func.count(Metric.id),
+            func.sum(Metric.value),
+            func.min(Metric.value),
+            func.max(Metric.value),
+            func.sum(Metric.value * Metric.value)
+        ).where(Metric.recorded_at >= segment.start, upper)
+        if type_filter:
+            query = query.where(Metric.type == type_filter)
+        if group_columns:
+            query = query.group_by(*group_columns)
+
+        return [(segment.start,) + tuple(row) for row in db.execute(query)]
+
+    @staticmethod
+    def _rollup_rows(db: Session, segment: RangeSegment,
+                     group_by: Sequence[str], per_day: bool,
+                     type_filter: Optional[str]):
+        """Aggregate a rollup segment, per bucket when days are needed."""
+        group_columns = [getattr(MetricRollup, column) for column in group_by]
+        if per_day:
+            group_columns.insert(0, MetricRollup.bucket_start)
+        query = select(
+            *group_columns,
+            func.sum(MetricRollup.sample_count),
+            func.sum(MetricRollup.sum_value),
+            func.min(MetricRollup.min_value),
+            func.max(MetricRollup.max_value),
+            func.sum(MetricRollup.sum_squares)
+        ).where(
+            MetricRollup.granularity == segment.granularity,
+            MetricRollup.bucket_start >= segment.start,
+            MetricRollup.bucket_start < segment.end
+        )
+        if type_filter:
+            query = query.where(MetricRollup.type == type_filter)
+        if group_columns:
+            query = query.group_by(*group_columns)
+
+        rows = db.execute(query).all()
+        if per_day:
+            return [tuple(row) for row in rows]
+        return [(segment.start,) + tuple(row) for row in rows]
+
+    @staticmethod
+    def _upsert(db: Session, deltas: Dict[tuple, RollupAggregate]) -> None:
+        """Add aggregate deltas to their buckets, creating missing ones."""
+        if not deltas:
+            return
+
+        rows = [
+            {
+                "granularity": granularity,
+                "bucket_start": bucket_start,
+                "name": name,
+                "type": metric_type,
+                "source": source,
+                "sample_count": aggregate.count,
+                "sum_value": aggregate.total,
+                "min_value": aggregate.minimum,
+                "max_value": aggregate.maximum,
+                "sum_squares": aggregate.sum_squares,
+            }
+            for (granularity, bucket_start, name, metric_type, source),
+            aggregate in deltas.items()
+        ]
+
+        insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+        if insert is None:
+            RollupService._merge_rows(db, rows)
+            return
+
+        stmt = insert(MetricRollup)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=_CONFLICT_COLUMNS,
+            set_={
+                "sample_count": (MetricRollup.sample_count
+                                 + excluded.sample_count),
+                "sum_value": MetricRollup.sum_value + excluded.sum_value,
+                "min_value": case(
+                    (excluded.min_value < MetricRollup.min_value,
+                     excluded.min_value),
+                    else_=MetricRollup.min_value),
+                "max_value": case(
+                    (excluded.max_value > MetricRollup.max_value,
+                     excluded.max_value),
+                    else_=MetricRollup.max_value),
+                "sum_squares": (MetricRollup.sum_squares
+                                + excluded.sum_squares),
+                "updated_at": func.now(),
+            }
+        )
+        db.execute(stmt, rows)
+
+    @staticmethod
+    def _finer_rows(db: Session, granularity: str,
+                    wanted: Mapping[tuple, int], *columns: Any):
+        """
+        Yield (key, row) for the rollups one granularity finer inside the
+        wanted hourly or daily buckets, keyed like wanted. Rows carry the
+        series, bucket_start, sample_count, sketch_count and columns.
+        """
+        finer = MINUTE if granularity == HOUR else HOUR
+        keys = sorted(wanted)
+        for start in range(0, len(keys), _SKETCH_BATCH_SIZE):
+            batch = keys[start:start + _SKETCH_BATCH_SIZE]
+            query = select(
+                MetricRollup.bucket_start, MetricRollup.name,
+                MetricRollup.type, MetricRollup.source,
+                MetricRollup.sample_count, MetricRollup.sketch_count, *columns
+            ).where(
+                MetricRollup.granularity == finer,
+                MetricRollup.bucket_start >= batch[0][0],
+                MetricRollup.bucket_start
+                < batch[-1][0] + BUCKET_SIZES[granularity],
+                tuple_(MetricRollup.name, MetricRollup.type,
+                       MetricRollup.source).in_(
+                    sorted({key[1:] for key in batch}))
+            )
+            for row in db.execute(query).all():
+                key = (floor_bucket(row.bucket_start, granularity),
+                       row.name, row.type, row.source)
+                if key in wanted:
+                    yield key, row
+
+    @staticmethod
+    def _add_sketch(composed: Dict[tuple, TDigest], weights: Dict[tuple, int],
+                    key: tuple, sketch: TDigest, count: int) -> None:
+        if key in composed:
+            composed[key].merge(sketch)
+        else:
+            composed[key] = sketch
+        weights[key] = weights.get(key, 0) + count
+
+    @staticmethod
+    def _merge_sketches(db: Session, sketches: Dict[tuple, TDigest]) -> None:
+        """
+        Merge sketch deltas into their (existing) buckets.
+        Sketches cannot be combined in SQL, so the stored ones are read
+        under a row lock, merged and written back with the number of
+        samples they now cover.
+        """
+        db.flush()
+        keys = sorted(sketches)
+        for start in range(0, len(keys), _SKETCH_BATCH_SIZE):
+            batch = keys[start:start + _SKETCH_BATCH_SIZE]
+            rows = db.execute(
+                select(MetricRollup.id, *[
+                    getattr(MetricRollup, column)
+                    for column in _CONFLICT_COLUMNS
+                ], MetricRollup.sketch, MetricRollup.sketch_count).where(
+                    tuple_(*[getattr(MetricRollup, column)
+                             for column in _CONFLICT_COLUMNS]).in_(batch)
+                ).with_for_update()
+            ).all()
+
+            updates = []
+            for rollup_id, *key, stored, stored_count in rows:
+                sketch = sketches[tuple(key)]
+                count = round(sketch.count)
+                if stored:
+                    merged = TDigest.from_bytes(stored)
+                    merged.merge(sketch)
+                    sketch = merged
+                    count += stored_count or 0
+                updates.append({"id": rollup_id, "sketch": sketch.to_bytes(),
+                                "sketch_count": count})
+            if updates:
+                db.execute(update(MetricRollup), updates)
+
+    @staticmethod
+    def _merge_rows(db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Read-modify-write fallback for dialects without upserts."""
+        for row in rows:
+            rollup = db.execute(
+                select(MetricRollup).filter_by(
+                    **{column: row[column] for column in _CONFLICT_COLUMNS}
+                ).with_for_update()
+            ).scalar_one_or_none()
+            if rollup is None:
+                db.add(MetricRollup(**row))
+                continue
+            rollup.sample_count += row["sample_count"]
+            rollup.sum_value += row["sum_value"]
+            rollup.min_value = min(rollup.min_value, row["min_value"])
+            rollup.max_value = max(rollup.max_value, row["max_value"])
+            rollup.sum_squares += row["sum_squares"]
@@ -0,0 +1,168 @@
+"""
+Series service for time-bucketed metric queries.
+Answers arbitrary bucket sizes from the minute, hourly and daily rollups,
+merging their aggregates and t-digest sketches, so percentiles over long
+ranges never read raw metric rows. Hourly and daily sketches that do not
+yet cover all their samples are composed from finer ones.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models.rollups import MetricRollup
+from .rollup_service import MINUTE, HOUR, DAY, RollupAggregate
+from .rollup_service import RollupService, floor_bucket, to_utc_naive
+from .tdigest import TDigest
+
+# Bucket name -> (rollup granularity read, bucket size)
+SERIES_BUCKETS: Dict[str, Tuple[str, timedelta]] = {
+    "1m": (MINUTE, timedelta(minutes=1)),
+    "5m": (MINUTE, timedelta(minutes=5)),
+    "1h": (HOUR, timedelta(hours=1)),
+    "1d": (DAY, timedelta(days=1)),
+    "1w": (DAY, timedelta(weeks=1)),
+}
+
+# Range queried when no date_from is given
+DEFAULT_SPANS = {
+    "1m": timedelta(hours=6),
+    "5m": timedelta(days=1),
+    "1h": timedelta(days=7),
+    "1d": timedelta(days=90),
+    "1w": timedelta(days=365),
+}
+
+PERCENTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+AGGREGATIONS = ("avg", "min", "max", "sum", "count") + tuple(PERCENTILES)
+
+# Weeks start on Monday; 1970-01-05 was one
+_WEEK_ORIGIN = datetime(1970, 1, 5)
+
+
+def align_bucket(value: datetime, bucket: str) -> datetime:
+    """Return the start of the series bucket containing the datetime."""
+    granularity, size = SERIES_BUCKETS[bucket]
+    value = floor_bucket(value, granularity)
+    origin = _WEEK_ORIGIN if bucket == "1w" else datetime(1970, 1, 1)
+    return value - (value - origin) % size
+
+
+class SeriesService:
+    """Service class for bucketed series queries."""
+
+    @staticmethod
+    def resolve_range(bucket: str, date_from: Optional[datetime],
+                      date_to: Optional[datetime]
+                      ) -> Tuple[datetime, datetime]:
+        """Whole-bucket range [start, end) covering the requested one."""
+        end = to_utc_naive(date_to) if date_to else datetime.utcnow()
+        start = (to_utc_naive(date_from) if date_from
+                 else end - DEFAULT_SPANS[bucket])
+        size = SERIES_BUCKETS[bucket][1]
+        return align_bucket(start, bucket), align_bucket(end, bucket) + size
+
+    @staticmethod
+    def within_retention(bucket: str, start: datetime) -> bool:
+        """Whether the rollups read for the bucket still cover start."""
+        if SERIES_BUCKETS[bucket][0] != MINUTE:
+            return True
+        return start >= RollupService.minute_cutoff()
+
+    @staticmethod
+    def bucket_count(bucket: str, start: datetime, end: datetime) -> int:
+        return max(0, int((end - start) / SERIES_BUCKETS[bucket][1]))
+
+    @staticmethod
+    def query(db: Session, bucket: str, aggs: Sequence[str],
+              start: datetime, end: datetime, name: Optional[str] = None,
+              type_filter: Optional[str] = None,
+              source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregate all series matching the filters per bucket.
+        Returns one entry per non-empty bucket with the requested
+        aggregations; percentiles are None for buckets whose samples are
+        not all covered by sketches.
+        """
+        granularity = SERIES_BUCKETS[bucket][0]
+        with_sketches = any(agg in PERCENTILES for agg in aggs)
+
+        columns = [MetricRollup.bucket_start, MetricRollup.sample_count,
+                   MetricRollup.sum_value, MetricRollup.min_value,
+                   MetricRollup.max_value, MetricRollup.sum_squares]
+        if with_sketches:
+            columns += [MetricRollup.name, MetricRollup.type,
+                        MetricRollup.source, MetricRollup.sketch_count,
+                        MetricRollup.sketch]
+        query = select(*columns).where(
+            MetricRollup.granularity == granularity,
+            MetricRollup.bucket_start >= start,
+            MetricRollup.bucket_start < end
+        )
+        if name is not None:
+            query = query.where(MetricRollup.name == name)
+        if type_filter is not None:
+            query = query.where(MetricRollup.type == type_filter)
+        if source is not None:
+            query = query.where(MetricRollup.source == source)
+
+        aggregates: Dict[datetime, RollupAggregate] = {}
+        sketches: Dict[datetime, TDigest] = {}
+        incomplete = set()
+        # Rollup keys whose sketches are composed from finer rollups
+        pending: Dict[tuple, int] = {}
+        for row in db.execute(query.execution_options(yield_per=5000)):
+            key = align_bucket(row.bucket_start, bucket)
+            aggregates.setdefault(key, RollupAggregate()).add(
+                row.sample_count, row.sum_value, row.min_value,
+                row.max_value, row.sum_squares)
+            if not with_sketches:
+                continue
+            if row.sketch and row.sketch_count == row.sample_count:
+                _merge_into(sketches, key, TDigest.from_bytes(row.sketch))
+            elif granularity == MINUTE:
+                incomplete.add(key)
+            else:
+                pending[(row.bucket_start, row.name, row.type,
+                         row.source)] = row.sample_count
+
+        composed = RollupService.compose_sketches(db, granularity, pending)
+        for rollup_key in pending:
+            key = align_bucket(rollup_key[0], bucket)
+            if rollup_key in composed:
+                _merge_into(sketches, key, composed[rollup_key])
+            else:
+                incomplete.add(key)
+
+        points = []
+        for key in sorted(aggregates):
+            aggregate = aggregates[key]
+            point: Dict[str, Any] = {"bucket_start": key}
+            for agg in aggs:
+                if agg in PERCENTILES:
+                    sketch = sketches.get(key)
+                    point[agg] = (sketch.quantile(PERCENTILES[agg])
+                                  if sketch and key not in incomplete
+                                  else None)
+                elif agg == "avg":
+                    point[agg] = aggregate.mean
+                elif agg == "min":
+                    point[agg] = aggregate.minimum
+                elif agg == "max":
+                    point[agg] = aggregate.maximum
+                elif agg == "sum":
+                    point[agg] = aggregate.total
+                else:
+                    point[agg] = aggregate.count
+            points.append(point)
+        return points
+
+
+def _merge_into(sketches: Dict[datetime, TDigest], key: datetime,
+                sketch: TDigest) -> None:
+    if key in sketches:
+        sketches[key].merge(sketch)
+    else:
+        sketches[key] = sketch
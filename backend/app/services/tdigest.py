@@ -0,0 +1,136 @@
+"""
+Mergeable quantile sketch (t-digest) for metric rollups.
+A digest keeps a bounded number of weighted centroids, small near the
+tails and larger around the median, so p99 stays accurate after any
+number of merges. Digests serialize to a compact binary form stored with
+each rollup bucket.
+"""
+
+from typing import List, Optional, Tuple
+import math
+import struct
+
+# compression, minimum, maximum, then (mean, weight) pairs
+_HEADER = struct.Struct("<ddd")
+_CENTROID = struct.Struct("<dd")
+
+# Unmerged values buffered per unit of compression before compressing
+_BUFFER_FACTOR = 5
+
+
+class TDigest:
+    """Merging t-digest using the k1 (arcsine) scale function."""
+
+    def __init__(self, compression: float = 100.0):
+        self.compression = float(compression)
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._centroids: List[Tuple[float, float]] = []
+        self._buffer: List[Tuple[float, float]] = []
+
+    @property
+    def count(self) -> float:
+        return (sum(weight for _, weight in self._centroids) +
+                sum(weight for _, weight in self._buffer))
+
+    @property
+    def centroid_count(self) -> int:
+        self._compress()
+        return len(self._centroids)
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        value = float(value)
+        self._buffer.append((value, float(weight)))
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        if len(self._buffer) > _BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """Fold another digest into this one."""
+        if not other._centroids and not other._buffer:
+            return
+        self._buffer.extend(other._centroids)
+        self._buffer.extend(other._buffer)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        if len(self._buffer) > _BUFFER_FACTOR * self.compression:
+            self._compress()
+
+    def _q_limit(self, q: float) -> float:
+        """Largest quantile a centroid starting at q may extend to."""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+        k_next = k + 1
+        if k_next >= self.compression / 4:
+            return 1.0
+        return (math.sin(k_next * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        centroids = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in centroids)
+
+        merged = []
+        cumulative = 0.0
+        mean, weight = centroids[0]
+        limit = total * self._q_limit(0.0)
+        for next_mean, next_weight in centroids[1:]:
+            if cumulative + weight + next_weight <= limit:
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                merged.append((mean, weight))
+                cumulative += weight
+                limit = total * self._q_limit(cumulative / total)
+                mean, weight = next_mean, next_weight
+        merged.append((mean, weight))
+        self._centroids = merged
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the value at quantile q (0..1), None when empty."""
+        self._compress()
+        if not self._centroids:
+            return None
+        if q <= 0:
+            return self.minimum
+        if q >= 1:
+            return self.maximum
+
+        total = sum(weight for _, weight in self._centroids)
+        target = q * total
+        # Interpolate between centroid centers, anchored at min and max
+        previous_mean, previous_center = self.minimum, 0.0
+        cumulative = 0.0
+        for mean, weight in self._centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                if weight == 1 and target >= cumulative:
+                    # A singleton centroid is an exact sample
+                    return mean
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_mean, previous_center = mean, center
+            cumulative += weight
+
+        span = total - previous_center
+        fraction = (target - previous_center) / span if span else 0
+        return previous_mean + (self.maximum - previous_mean) * fraction
+
+    def to_bytes(self) -> bytes:
+        self._compress()
+        parts = [_HEADER.pack(self.compression, self.minimum, self.maximum)]
+        parts.extend(_CENTROID.pack(mean, weight)
+                     for mean, weight in self._centroids)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        compression, minimum, maximum = _HEADER.unpack_from(data)
+        digest = cls(compression)
+        digest.minimum, digest.maximum = minimum, maximum
+        digest._centroids = list(
+            _CENTROID.iter_unpack(data[_HEADER.size:]))
+        return digest
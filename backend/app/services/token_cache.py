@@ -0,0 +1,107 @@
+"""
+Verified token cache.
+Remembers the decoded payload of tokens that passed verification, keyed
+by a SHA-256 digest of the token, so repeated requests with the same
+bearer token skip signature checks and JSON decoding. An entry never
+outlives the token's exp (plus the decode leeway) by the wall clock, nor
+max_ttl_seconds by the monotonic clock, so clock adjustments cannot keep
+an expired token alive. Checks that can reject a token before its exp
+must run after the cache, or discard() the token.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import threading
+import time
+
+from prometheus_client import Counter
+
+from ..config import settings
+
+# (payload, exp + leeway on the wall clock, monotonic deadline)
+_Entry = Tuple[Dict[str, Any], float, float]
+
+TOKEN_CACHE_REQUESTS = Counter(
+    "token_cache_requests_total", "Verified token cache lookups", ["result"])
+TOKEN_DECODE_SECONDS = Counter(
+    "token_decode_seconds_total", "Time spent decoding and verifying tokens")
+TOKEN_DECODE_SECONDS_SAVED = Counter(
+    "token_decode_seconds_saved_total",
+    "Estimated decode time avoided by cache hits")
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TokenCache:
+    """Thread-safe LRU of verified token payloads."""
+
+    def __init__(self, max_entries: int, max_ttl_seconds: float,
+                 leeway_seconds: float = 0.0):
+        self.max_entries = max_entries
+        self.max_ttl_seconds = max_ttl_seconds
+        self.leeway_seconds = leeway_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._decode_seconds = 0.0  # Moving average of a decode
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        digest = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                payload, expires_at, deadline = entry
+                if time.time() < expires_at and time.monotonic() < deadline:
+                    self._entries.move_to_end(digest)
+                    self.hits += 1
+                    TOKEN_CACHE_REQUESTS.labels(result="hit").inc()
+                    TOKEN_DECODE_SECONDS_SAVED.inc(self._decode_seconds)
+                    return dict(payload)
+                del self._entries[digest]
+            self.misses += 1
+        TOKEN_CACHE_REQUESTS.labels(result="miss").inc()
+        return None
+
+    def put(self, token: str, payload: Dict[str, Any],
+            decode_seconds: float) -> None:
+        """Store a verified payload; tokens without exp are not cached."""
+        TOKEN_DECODE_SECONDS.inc(decode_seconds)
+        exp = payload.get("exp")
+        with self._lock:
+            self._decode_seconds += (decode_seconds - self._decode_seconds) / 8
+            if self.max_entries <= 0 or not isinstance(exp, (int, float)):
+                return
+            expires_at = exp + self.leeway_seconds
+            remaining = min(expires_at - time.time(), self.max_ttl_seconds)
+            if remaining <= 0:
+                return
+            digest = token_digest(token)
+            self._entries[digest] = (dict(payload), expires_at,
+                                     time.monotonic() + remaining)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(token_digest(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "misses": self.misses,
+                    "decode_seconds": self._decode_seconds}
+
+
+# Global token cache shared by all requests of this process
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_ENTRIES,
+                         settings.TOKEN_CACHE_MAX_TTL_SECONDS,
+                         settings.JWT_LEEWAY_SECONDS)
@@ -0,0 +1,193 @@
+"""
+Token revocation for logout.
+Revoked token ids (jti) are stored in revoked_tokens until the token
+expires, and every worker keeps a Bloom filter of them in memory. Tokens
+the filter has never seen, which is nearly all of them, are accepted
+without touching the database; only filter hits are confirmed against
+the store. Workers pick up each other's revocations by reading rows
+revoked since their last sync, and expired rows are purged periodically.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional
+import asyncio
+import logging
+import math
+
+from prometheus_client import Counter
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import AsyncSessionLocal
+from ..models.revoked_tokens import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REVOCATION_LOOKUPS = Counter(
+    "token_revocation_lookups_total",
+    "Revocation store lookups after a Bloom filter hit", ["result"])
+
+
+class BloomFilter:
+    """
+    A Bloom filter of strings, tuned for fast negative answers: fewer hash
+    functions over a larger, power-of-two bit array than the
+    memory-optimal layout, so at capacity about three quarters of the bits
+    are clear and most absent items are settled by the first probe.
+    Positions come from the process's own str hash, which is cached on the
+    string; each process builds its own filter, so hash randomization does
+    not matter.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.hashes = max(1, math.ceil(-math.log2(error_rate) / 2))
+        bits = -self.hashes * self.capacity / math.log(
+            1 - error_rate ** (1 / self.hashes))
+        self.size = 1 << max(6, math.ceil(bits - 1).bit_length())
+        self._mask = self.size - 1
+        self._bits = bytearray(self.size // 8)
+        self.count = 0
+
+    def add(self, item: str) -> None:
+        h = hash(item)
+        position, step = h & self._mask, (h >> 32) | 1
+        for _ in range(self.hashes):
+            self._bits[position >> 3] |= 1 << (position & 7)
+            position = (position + step) & self._mask
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        h = hash(item)
+        bits, mask = self._bits, self._mask
+        position = h & mask
+        if not bits[position >> 3] >> (position & 7) & 1:
+            return False
+        step = (h >> 32) | 1
+        for _ in range(self.hashes - 1):
+            position = (position + step) & mask
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+
+class TokenRevocations:
+    """The revocation store of one process, fronted by its Bloom filter."""
+
+    def __init__(self, capacity: int, error_rate: float,
+                 sync_lookback_seconds: float = 30.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_lookback = timedelta(seconds=sync_lookback_seconds)
+        self.clear()
+
+    def might_be_revoked(self, jti: Optional[str]) -> bool:
+        """The fast check: False means the token is certainly not revoked."""
+        return jti is not None and jti in self._filter
+
+    async def is_revoked(self, db: AsyncSession, jti: Optional[str]) -> bool:
+        if not self.might_be_revoked(jti):
+            return False
+        revoked = await db.scalar(select(RevokedToken.jti).where(
+            RevokedToken.jti == jti)) is not None
+        TOKEN_REVOCATION_LOOKUPS.labels(
+            result="revoked" if revoked else "false_positive").inc()
+        return revoked
+
+    async def revoke(self, db: AsyncSession,
+                     payloads: Iterable[Dict[str, Any]],
+                     user_id: Optional[int] = None) -> None:
+        """
+        Store the tokens' ids until they expire. Tokens without a jti or
+        exp were issued before revocation existed and cannot be revoked.
+        """
+        jtis = []
+        for payload in payloads:
+            jti, exp = payload.get("jti"), payload.get("exp")
+            if not jti or not isinstance(exp, (int, float)):
+                continue
+            await db.merge(RevokedToken(
+                jti=jti, user_id=user_id,
+                expires_at=datetime.fromtimestamp(exp, timezone.utc)
+                .replace(tzinfo=None)
+                + timedelta(seconds=settings.JWT_LEEWAY_SECONDS),
+                revoked_at=datetime.utcnow()))
+            jtis.append(jti)
+        await db.commit()
+        for jti in jtis:
+            self._filter.add(jti)
+
+    def load(self, db: Session) -> None:
+        """Build the filter from the unexpired revocations."""
+        started = datetime.utcnow()
+        jtis = db.scalars(select(RevokedToken.jti).where(
+            RevokedToken.expires_at > started)).all()
+        self._replace(jtis, started)
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Add revocations made by other workers since the last sync."""
+        started = datetime.utcnow()
+        since = self._synced_at - self.sync_lookback
+        jtis = (await db.scalars(select(RevokedToken.jti).where(
+            RevokedToken.revoked_at >= since))).all()
+        for jti in jtis:
+            self._filter.add(jti)
+        self._synced_at = started
+        if self._filter.count > self._filter.capacity:
+            await self.rebuild(db)
+        return len(jtis)
+
+    async def purge(self, db: AsyncSession) -> int:
+        """Delete expired revocations and drop them from the filter."""
+        result = await db.execute(delete(RevokedToken).where(
+            RevokedToken.expires_at <= datetime.utcnow()))
+        await db.commit()
+        await self.rebuild(db)
+        return result.rowcount
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        started = datetime.utcnow()
+        jtis = (await db.scalars(select(RevokedToken.jti).where(
+            RevokedToken.expires_at > started))).all()
+        self._replace(jtis, started)
+
+    async def sync_loop(self, interval: float, purge_interval: float) -> None:
+        """Sync every interval seconds and purge every purge_interval."""
+        purged_at = asyncio.get_running_loop().time()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                async with AsyncSessionLocal() as db:
+                    now = asyncio.get_running_loop().time()
+                    if now - purged_at >= purge_interval:
+                        await self.purge(db)
+                        purged_at = now
+                    else:
+                        await self.sync(db)
+            except Exception:
+                logger.exception("Token revocation sync failed")
+
+    def clear(self) -> None:
+        self._filter = BloomFilter(self.capacity, self.error_rate)
+        self._synced_at = datetime.utcnow()
+
+    def _replace(self, jtis: Iterable[str], started: datetime) -> None:
+        jtis = list(jtis)
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)),
+                            self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        # Checks see either the old or the new filter, never a partial one;
+        # revocations committed while rebuilding arrive with the next sync
+        self._filter = bloom
+        self._synced_at = started
+
+
+# Global revocation filter shared by all requests of this process
+token_revocations = TokenRevocations(
+    settings.REVOCATION_FILTER_CAPACITY,
+    settings.REVOCATION_FILTER_ERROR_RATE,
+    settings.REVOCATION_SYNC_LOOKBACK_SECONDS)
@@ -3,19 +3,19 @@ Database initialization script for MicroShell Backend.
 Creates tables, roles, and initial admin user.
 """
 
-from app.database import SessionLocal, engine
-from app.models import Base, User, Role
+from app.database import SessionLocal, run_migrations
+from app.models import User, Role
 from app.services.auth_service import AuthService
 from app.config import settings
 
 
 def init_database():
     """Initialize database with tables and initial data."""
-    print("🔄 Creating database tables...")
+    print("🔄 Applying database migrations...")
 
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully")
+    # Create or upgrade all tables
+    run_migrations()
+    print("✅ Database schema is up to date")
 
     # Create initial data
     db = SessionLocal()
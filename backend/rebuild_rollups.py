@@ -0,0 +1,42 @@
+"""
+Rollup rebuild script for MicroShell Backend.
+Recomputes the metric rollups and their sketches from the raw metrics table.
+"""
+
+import argparse
+from datetime import datetime
+
+from app.database import SessionLocal, engine
+from app.models import Base
+from app.services.rollup_service import RollupService
+
+
+def rebuild_rollups(date_from=None, date_to=None):
+    """Rebuild metric rollups, optionally limited to a range of days."""
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        processed = RollupService.rebuild(db, date_from, date_to)
+        db.commit()
+        print(f"✅ Rollups rebuilt from {processed} metrics")
+    except Exception as e:
+        print(f"❌ Error during rollup rebuild: {str(e)}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--from", dest="date_from",
+                        type=datetime.fromisoformat,
+                        help="first day to rebuild (ISO format)")
+    parser.add_argument("--to", dest="date_to",
+                        type=datetime.fromisoformat,
+                        help="last day to rebuild (ISO format)")
+    args = parser.parse_args()
+
+    print("🚀 Rebuilding metric rollups...")
+    rebuild_rollups(args.date_from, args.date_to)
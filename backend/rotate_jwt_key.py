@@ -0,0 +1,33 @@
+"""
+JWT key rotation script for MicroShell Backend.
+Adds a signing key to JWT_KEYS_DIR. Workers publish it in the JWKS once
+they re-read the directory (JWT_KEY_RELOAD_SECONDS), but only sign with
+it once the file is JWT_KEY_RELOAD_SECONDS + JWKS_MAX_AGE_SECONDS old,
+so services holding a cached JWKS know the key before any token uses it.
+Tokens signed by older keys keep verifying until those key files are
+removed, once the tokens they signed have expired.
+"""
+
+import argparse
+from pathlib import Path
+
+from app.config import settings
+from app.services.jwt_keys import ASYMMETRIC_ALGORITHMS, write_key
+
+
+def rotate_key(kid=None):
+    """Generate a new signing key for the configured algorithm."""
+    if settings.ALGORITHM not in ASYMMETRIC_ALGORITHMS:
+        raise SystemExit(f"❌ ALGORITHM is {settings.ALGORITHM}; "
+                         f"key rotation needs one of {ASYMMETRIC_ALGORITHMS}")
+    key = write_key(Path(settings.JWT_KEYS_DIR), settings.ALGORITHM, kid)
+    delay = settings.JWT_KEY_RELOAD_SECONDS + settings.JWKS_MAX_AGE_SECONDS
+    print(f"✅ Added {settings.ALGORITHM} key '{key.kid}' "
+          f"to {settings.JWT_KEYS_DIR}; it signs new tokens in {delay:g}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kid", help="key id (default: current UTC time)")
+    args = parser.parse_args()
+    rotate_key(args.kid)
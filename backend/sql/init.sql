@@ -17,4 +17,4 @@ ALTER DATABASE microshell_db SET search_path TO public;
 -- CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 
 -- Additional database setup can be added here
--- Tables will be created by SQLAlchemy/FastAPI on application startup 
\ No newline at end of file
+-- Tables are created by the Alembic migrations (init_db.py / app startup) 
\ No newline at end of file
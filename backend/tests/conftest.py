@@ -0,0 +1,77 @@
+"""
+Shared fixtures for the MicroShell backend tests.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.database import SessionLocal, AsyncSessionLocal
+from app.database import engine as app_engine, async_engine as app_async_engine
+from app.models import Base, User, Role
+from app.services.auth_service import get_current_user
+from app.services.log_counters import LogCounterService
+from app.services.principal_cache import principal_cache
+from app.services.report_cache import report_cache
+from app.services.token_cache import token_cache
+from app.services.token_revocation import token_revocations
+from app.main import app
+
+
+@pytest.fixture
+def db(tmp_path):
+    """
+    Provide a session bound to a fresh database file.
+    The application's sync and async session factories are pointed at the
+    same file for the duration of the test.
+    """
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    # NullPool: TestClient may run each request on its own event loop
+    async_engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://"), poolclass=NullPool)
+    Base.metadata.create_all(bind=engine)
+
+    SessionLocal.configure(bind=engine)
+    AsyncSessionLocal.configure(bind=async_engine)
+    # Cached reports, users, revocations and log counts belong to the
+    # previous database
+    report_cache.clear()
+    principal_cache.clear()
+    token_cache.clear()
+    token_revocations.clear()
+    session = sessionmaker(bind=engine)()
+    LogCounterService.load(session)
+    try:
+        yield session
+    finally:
+        session.close()
+        SessionLocal.configure(bind=app_engine)
+        AsyncSessionLocal.configure(bind=app_async_engine)
+        engine.dispose()
+
+
+@pytest.fixture
+def user(db):
+    """Create an active admin user."""
+    role = Role(name="admin", description="Administrator role")
+    db.add(role)
+    db.flush()
+    admin = User(email="admin@example.com", username="admin",
+                 hashed_password="not-a-real-hash", role_id=role.id,
+                 is_active=True)
+    db.add(admin)
+    db.commit()
+    return admin
+
+
+@pytest.fixture
+def client(db, user):
+    """Test client authenticated as the admin user on the test database."""
+    app.dependency_overrides[get_current_user] = lambda: user
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,145 @@
+"""
+Tests for the NumPy analytics service and endpoints.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+np = pytest.importorskip("numpy")
+
+from app.models import Metric  # noqa: E402
+from app.services.analytics import (  # noqa: E402
+    AnalyticsService, moving_average, rate_of_change, rolling_std, zscores
+)
+
+START = datetime.utcnow().replace(microsecond=0) - timedelta(days=1)
+
+
+def _seed(db, count=200):
+    rng = random.Random(7)
+    metrics = [
+        Metric(name="Response Time", type="performance",
+               source=rng.choice(["api-gateway", None]),
+               value=rng.gauss(100, 10), unit="ms",
+               recorded_at=START + timedelta(minutes=index))
+        for index in range(count)
+    ]
+    metrics[150].value = 500.0
+    db.add_all(metrics)
+    db.commit()
+    return metrics
+
+
+def test_rolling_functions_match_naive_loops():
+    rng = random.Random(3)
+    values = np.array([rng.uniform(1e6, 1e6 + 50) for _ in range(100)])
+    window = 7
+
+    average, deviation = moving_average(values, window), rolling_std(
+        values, window)
+    assert np.isnan(average[:window - 1]).all()
+    assert np.isnan(deviation[:window - 1]).all()
+    for end in range(window, len(values) + 1):
+        chunk = values[end - window:end]
+        assert average[end - 1] == pytest.approx(chunk.mean())
+        assert deviation[end - 1] == pytest.approx(chunk.std(), rel=1e-6)
+
+    assert np.isnan(moving_average(values[:3], window)).all()
+
+
+def test_rate_of_change_and_grouped_zscores():
+    seconds = np.array([0.0, 10.0, 10.0, 30.0])
+    values = np.array([1.0, 6.0, 8.0, 4.0])
+    rates = rate_of_change(seconds, values)
+    assert np.isnan(rates[0]) and np.isnan(rates[2])
+    assert rates[1] == pytest.approx(0.5)
+    assert rates[3] == pytest.approx(-0.2)
+
+    values = np.array([1.0, 3.0, 100.0, 300.0, 5.0])
+    groups = np.array([4, 4, 9, 9, 2])
+    scores = zscores(values, groups)
+    assert scores.tolist() == pytest.approx([-1.0, 1.0, -1.0, 1.0, 0.0])
+
+
+def test_load_encodes_categories(db):
+    metrics = _seed(db)
+    arrays = AnalyticsService.load(db, START, START + timedelta(days=1))
+    assert len(arrays) == len(metrics)
+    assert arrays.names == ["Response Time"]
+    assert arrays.sources == [None, "api-gateway"]
+    assert [arrays.sources[code] for code in arrays.source_codes] == \
+        [metric.source for metric in metrics]
+    assert arrays.values.tolist() == [metric.value for metric in metrics]
+    assert arrays.timestamps[0].tolist() == START
+
+    empty = AnalyticsService.load(db, START - timedelta(days=2),
+                                  START - timedelta(days=1))
+    assert len(empty) == 0 and empty.names == []
+
+
+def test_load_in_batches_matches_single_batch(db):
+    _seed(db)
+    db.add(Metric(name="Latency", type="network", value=1.0,
+                  recorded_at=START + timedelta(seconds=30)))
+    db.commit()
+    window = (START, START + timedelta(days=1))
+    whole = AnalyticsService.load(db, *window)
+    batched = AnalyticsService.load(db, *window, batch_size=7)
+
+    assert batched.names == whole.names == ["Latency", "Response Time"]
+    assert batched.types == ["network", "performance"]
+    for field in ("timestamps", "values", "name_codes", "type_codes",
+                  "source_codes"):
+        assert (getattr(batched, field) == getattr(whole, field)).all()
+
+    with pytest.raises(HTTPException) as error:
+        AnalyticsService.load(db, *window, max_rows=200)
+    assert error.value.status_code == 400
+
+
+def test_analytics_endpoints(client, db):
+    metrics = _seed(db)
+    params = {"date_from": START.isoformat(),
+              "date_to": (START + timedelta(days=1)).isoformat()}
+
+    response = client.get("/api/reports/analytics/moving-average",
+                          params={**params, "window": 5})
+    assert response.status_code == 200
+    points = response.json()["points"]
+    assert len(points) == len(metrics)
+    assert points[3]["moving_average"] is None
+    assert points[4]["moving_average"] == pytest.approx(
+        sum(metric.value for metric in metrics[:5]) / 5)
+
+    response = client.get("/api/reports/analytics/rolling-stddev",
+                          params={**params, "max_points": 50})
+    assert response.status_code == 200
+    assert len(response.json()["points"]) == 50
+
+    response = client.get("/api/reports/analytics/rate-of-change",
+                          params=params)
+    assert response.status_code == 200
+    assert response.json()["points"][1]["rate_per_second"] == pytest.approx(
+        (metrics[1].value - metrics[0].value) / 60)
+
+    response = client.get("/api/reports/analytics/histogram",
+                          params={**params, "bins": 4, "min_value": 0,
+                                  "max_value": 400})
+    assert response.status_code == 200
+    histogram = response.json()
+    assert [bin["count"] for bin in histogram["bins"]][-1] == 0
+    assert histogram["total"] == len(metrics) - 1
+
+    response = client.get("/api/reports/analytics/anomalies",
+                          params={**params, "per_series": "false"})
+    assert response.status_code == 200
+    anomalies = response.json()["anomalies"]
+    assert [anomaly["value"] for anomaly in anomalies] == [500.0]
+    assert anomalies[0]["recorded_at"] == \
+        metrics[150].recorded_at.isoformat()
+
+    response = client.get("/api/reports/analytics/histogram",
+                          params={**params, "min_value": 5})
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+"""
+Tests for the authentication flow on the async database path.
+"""
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.main import app
+from app.models import AuthEvent, Role, User
+from app.services.auth_service import AuthService
+
+
+def _register_and_login(db):
+    db.add(Role(name="user", description="Standard user role"))
+    db.commit()
+    client = TestClient(app)
+    response = client.post("/api/auth/register", json={
+        "email": "jane@example.com", "username": "jane",
+        "password": "secret123"
+    })
+    assert response.status_code == 200
+    assert response.json()["role"]["name"] == "user"
+
+    response = client.post("/api/auth/login", json={
+        "email": "jane@example.com", "password": "secret123"
+    })
+    assert response.status_code == 200
+    return client, response.json()
+
+
+def test_login_issues_tokens_accepted_by_protected_routes(db):
+    client, tokens = _register_and_login(db)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    me = client.get("/api/auth/me", headers=headers)
+    assert me.status_code == 200
+    assert me.json()["username"] == "jane"
+
+    # Non-admin users are rejected by admin routes
+    assert client.get("/api/users/", headers=headers).status_code == 403
+
+
+def test_wrong_password_is_rejected(db):
+    client, _ = _register_and_login(db)
+    response = client.post("/api/auth/login", json={
+        "email": "jane@example.com", "password": "wrong-password"
+    })
+    assert response.status_code == 401
+
+
+def test_invalid_subject_is_rejected(db):
+    token = AuthService.create_access_token({"sub": "not-a-number"})
+    response = TestClient(app).get(
+        "/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+
+
+def test_auth_events_are_recorded(db):
+    client, tokens = _register_and_login(db)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    client.post("/api/auth/login", json={
+        "email": "jane@example.com", "password": "wrong-password"
+    })
+    assert client.post("/api/auth/refresh", json={
+        "refresh_token": tokens["refresh_token"]}).status_code == 200
+    assert client.post("/api/auth/change-password", headers=headers, json={
+        "current_password": "secret123", "new_password": "secret456"
+    }).status_code == 200
+    assert client.post("/api/auth/logout",
+                       headers=headers).status_code == 200
+
+    events = db.execute(select(
+        AuthEvent.event_type, AuthEvent.user_id).order_by(AuthEvent.id)).all()
+    jane = db.execute(select(User.id).where(
+        User.username == "jane")).scalar_one()
+    assert events == [("login_success", jane), ("login_failure", None),
+                      ("refresh", jane), ("password_change", jane),
+                      ("logout", jane)]
+
+
+def test_activity_report_counts_login_events(client, db):
+    # Before the end of the default, minute-aligned report window
+    created_at = datetime.utcnow() - timedelta(minutes=5)
+    db.add_all([
+        AuthEvent(event_type=event_type, created_at=created_at)
+        for event_type in ("login_success", "login_success", "login_failure",
+                           "logout")
+    ])
+    db.commit()
+
+    response = client.get("/api/reports/user-activity")
+    assert response.status_code == 200
+    assert response.json()["login_activity"] == [
+        {"date": created_at.date().isoformat(), "count": 2}]
@@ -0,0 +1,136 @@
+"""
+Tests for the response compression middleware.
+"""
+import asyncio
+import gzip
+import zlib
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app import compression
+from app.compression import CompressionMiddleware, negotiate_encoding
+
+LINE = "metric,usage,42.0,ms\n"
+
+
+async def _chunks():
+    for _ in range(3):
+        yield LINE * 100
+
+
+def _app(minimum_size=500):
+    async def large(request):
+        return PlainTextResponse(LINE * 200)
+
+    async def small(request):
+        return PlainTextResponse("ok")
+
+    async def stream(request):
+        return StreamingResponse(_chunks(), media_type="text/csv")
+
+    async def events(request):
+        return StreamingResponse(_chunks(), media_type="text/event-stream")
+
+    async def opt_out(request):
+        return PlainTextResponse(LINE * 200,
+                                 headers={"Cache-Control": "no-transform"})
+
+    app = Starlette(routes=[
+        Route("/large", large), Route("/small", small),
+        Route("/stream", stream), Route("/events", events),
+        Route("/opt-out", opt_out)
+    ])
+    return CompressionMiddleware(app, minimum_size=minimum_size)
+
+
+async def _call(app, path, accept_encoding):
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path":
+        path.encode(), "query_string": b"", "root_path": "",
+        "scheme": "http", "server": ("test", 80), "http_version": "1.1",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        # The request once; the client then never disconnects, and the
+        # response cancels its disconnect listener once the body is sent
+        if requests:
+            return requests.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    headers = {key.decode(): value.decode()
+               for key, value in messages[0]["headers"]}
+    return headers, [m.get("body", b"") for m in messages[1:]]
+
+
+def test_negotiates_by_quality_then_server_preference(monkeypatch):
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("br") is None
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("*") in ("zstd", "gzip")
+    assert negotiate_encoding("*, gzip;q=0") != "gzip"
+
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert negotiate_encoding("zstd, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("zstd") is None
+
+
+def test_compresses_large_bodies_and_skips_small_ones():
+    app = _app()
+    headers, bodies = asyncio.run(_call(app, "/large", "gzip"))
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(bodies[0])
+    assert gzip.decompress(bodies[0]).decode() == LINE * 200
+
+    headers, bodies = asyncio.run(_call(app, "/small", "gzip"))
+    assert "content-encoding" not in headers
+    assert bodies == [b"ok"]
+
+
+def test_streams_are_compressed_chunk_by_chunk():
+    headers, bodies = asyncio.run(_call(_app(), "/stream", "gzip"))
+    assert headers["content-encoding"] == "gzip"
+    assert "content-length" not in headers
+
+    # Every chunk is flushed, so each decodes as soon as it arrives
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for body in bodies[:3]:
+        assert decoder.decompress(body).decode() == LINE * 100
+    decoder.decompress(bodies[3])
+    assert decoder.eof
+    assert sum(map(len, bodies)) < len(LINE) * 300 / 10
+
+
+def test_event_streams_and_opt_outs_are_not_compressed():
+    app = _app()
+    for path in ("/events", "/opt-out"):
+        headers, bodies = asyncio.run(_call(app, path, "gzip"))
+        assert "content-encoding" not in headers
+        assert b"".join(bodies).decode().startswith(LINE)
+
+
+def test_zstd_when_available():
+    zstandard = pytest.importorskip("zstandard")
+    headers, bodies = asyncio.run(_call(_app(), "/stream", "gzip, zstd"))
+    assert headers["content-encoding"] == "zstd"
+    decoder = zstandard.ZstdDecompressor().decompressobj()
+    assert decoder.decompress(b"".join(bodies)).decode() == LINE * 300
+
+
+def test_csv_export_is_gzipped(client, db):
+    response = client.get("/api/reports/export/csv",
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text.startswith("ID,Name,Type")
@@ -0,0 +1,151 @@
+"""
+Tests for the dashboard summary and metric write endpoints.
+"""
+import asyncio
+
+from app.services.dashboard_service import summary_snapshot
+from app.services.dashboard_service import dashboard_hub, summary_broadcaster
+from app.services.event_hub import EventHub, RESYNC_EVENT, format_sse
+from app.services import ingest_service
+from app.services.ingest_service import JSONArrayParser, iter_ndjson
+
+
+def _create_metric(client, value):
+    response = client.post("/api/dashboard/metrics", json={
+        "name": "Daily Revenue", "type": "revenue", "value": value,
+        "source": "billing-service"
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_summary_snapshot_is_invalidated_by_metric_writes(client):
+    """The cached summary is reused until a metric write commits."""
+    summary_snapshot.invalidate()
+    _create_metric(client, 100.0)
+
+    first = client.get("/api/dashboard/summary").json()
+    assert first["total_revenue"] == 100.0
+    assert first["total_users"] == 1
+
+    cached, fresh = summary_snapshot.get()
+    assert fresh and cached.total_revenue == 100.0
+
+    _create_metric(client, 50.0)
+    assert not summary_snapshot.get()[1]
+    second = client.get("/api/dashboard/summary").json()
+    assert second["total_revenue"] == 150.0
+    assert len(second["recent_metrics"]) == 2
+
+
+def test_stale_while_revalidate_serves_previous_snapshot(client):
+    summary_snapshot.invalidate()
+    _create_metric(client, 10.0)
+    client.get("/api/dashboard/summary")
+    _create_metric(client, 20.0)
+
+    stale = client.get("/api/dashboard/summary",
+                       params={"stale_while_revalidate": True}).json()
+    assert stale["total_revenue"] == 10.0
+
+
+def test_batch_ingest_reports_rejected_rows(client, db):
+    """NDJSON rows are inserted in chunks and bad rows are reported."""
+    lines = [
+        '{"name": "CPU Usage", "type": "system", "value": 10}',
+        '{"name": "CPU Usage", "type": "bogus", "value": 20}',
+        'not json',
+        '{"name": "CPU Usage", "type": "system", "value": 30}',
+    ]
+    response = client.post(
+        "/api/dashboard/metrics/batch",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["received"] == 3
+    assert data["accepted"] == 2
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+
+    listed = client.get("/api/dashboard/metrics").json()
+    assert sorted(m["value"] for m in listed["metrics"]) == [10.0, 30.0]
+
+
+def test_truncated_array_counts_only_decoded_rows(client, db):
+    response = client.post(
+        "/api/dashboard/metrics/batch",
+        content=b'[{"name": "CPU Usage", "type": "system", "value": 1}, {"na',
+        headers={"Content-Type": "application/json"}
+    )
+    data = response.json()
+    assert (data["received"], data["accepted"], data["rejected"]) == (1, 1, 1)
+    assert data["errors"][0]["index"] == 1
+
+
+def test_json_array_parser_handles_split_chunks():
+    """Array elements are recovered whatever the chunk boundaries are."""
+    body = '[{"value": 1}, 23, {"nested": [1, 2]}, "x,]"]'
+    for size in (1, 2, 7, len(body)):
+        parser = JSONArrayParser()
+        items = []
+        for start in range(0, len(body), size):
+            items.extend(parser.feed(body[start:start + size]))
+        items.extend(parser.feed("", final=True))
+        assert items == [{"value": 1}, 23, {"nested": [1, 2]}, "x,]"]
+
+
+def test_ndjson_overlong_line_is_rejected_without_buffering(monkeypatch):
+    """A line over MAX_ITEM_BYTES is one error; parsing resumes after it."""
+    monkeypatch.setattr(ingest_service, "MAX_ITEM_BYTES", 16)
+    chunks = [b'{"a": 1}\n{"b": ', b"x" * 10, b"y" * 10, b"z" * 1000,
+              b'}\n{"c"', b": 3}\n[4]"]
+
+    async def collect():
+        async def body():
+            for chunk in chunks:
+                yield chunk
+        return [item async for item in iter_ndjson(body())]
+
+    items = asyncio.run(collect())
+    assert [(position, item) for position, item, _ in items] == [
+        (0, {"a": 1}), (1, None), (2, {"c": 3}), (3, [4])]
+    assert "16 byte limit" in items[1][2]
+
+
+def test_metric_writes_are_published_to_stream_subscribers(
+        client, monkeypatch):
+    monkeypatch.setattr(summary_broadcaster, "schedule", lambda: None)
+    subscription = dashboard_hub.subscribe()
+    try:
+        created = _create_metric(client, 42.0)
+        client.post(
+            "/api/dashboard/metrics/batch",
+            content=b'{"name": "CPU Usage", "type": "system", "value": 7}',
+            headers={"Content-Type": "application/x-ndjson"}
+        )
+    finally:
+        dashboard_hub.unsubscribe(subscription)
+
+    single = subscription.queue.get_nowait()
+    assert single["event"] == "metrics"
+    assert single["data"][0]["id"] == created["id"]
+    assert single["data"][0]["value"] == 42.0
+    batch = subscription.queue.get_nowait()
+    assert [point["value"] for point in batch["data"]] == [7]
+
+
+def test_slow_subscriber_gets_resync_instead_of_blocking():
+    async def scenario():
+        hub = EventHub(queue_size=2)
+        slow = hub.subscribe()
+        for value in range(4):
+            hub.publish("metrics", [value])
+        return slow
+
+    slow = asyncio.run(scenario())
+    assert slow.queue.qsize() == 2
+    assert slow.queue.get_nowait() == RESYNC_EVENT
+    assert slow.queue.get_nowait()["data"] == [3]
+    assert slow.dropped == 3
+    assert format_sse(RESYNC_EVENT).startswith("event: resync\ndata: ")
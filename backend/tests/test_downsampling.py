@@ -0,0 +1,68 @@
+"""
+Tests for server-side chart downsampling.
+"""
+import math
+from datetime import datetime, timedelta
+
+from app.models import Metric
+from app.services.downsampling import downsample, lttb_indices
+from app.services.downsampling import minmax_indices
+from app.services.rollup_service import RollupService
+
+
+def _wave(count):
+    ys = [math.sin(i / 15) * 10 for i in range(count)]
+    ys[137] = 500.0  # a single spike
+    return ys
+
+
+def test_lttb_keeps_endpoints_and_the_spike():
+    ys = _wave(1000)
+    indices = lttb_indices(list(range(1000)), ys, 50)
+
+    assert len(indices) == 50
+    assert indices[0] == 0 and indices[-1] == 999
+    assert indices == sorted(set(indices))
+    assert 137 in indices
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    ys = _wave(1000)
+    indices = minmax_indices(ys, 40)
+
+    assert len(indices) <= 40
+    assert indices == sorted(indices)
+    assert 137 in indices
+    assert min(ys) in [ys[i] for i in indices]
+
+
+def test_short_series_are_returned_unchanged():
+    points = [1, 2, 3]
+    assert downsample(points, 10, y=float) is points
+    assert downsample(points, None, y=float) is points
+
+
+def test_chart_payload_is_bounded_by_max_points(client, db):
+    start = datetime.utcnow().replace(minute=30) - timedelta(days=6)
+    metrics = [
+        Metric(name="Response Time", type="performance",
+               value=100 + (900 if hour == 50 else hour % 7),
+               recorded_at=start + timedelta(hours=hour))
+        for hour in range(144)
+    ]
+    db.add_all(metrics)
+    db.flush()
+    RollupService.apply_metrics(db, metrics)
+    db.commit()
+
+    full = client.get("/api/dashboard/charts/performance",
+                      params={"days": 7, "granularity": "hour"}).json()
+    assert full["source_points"] == len(full["chart_data"]) >= 144
+
+    for method in ("lttb", "minmax"):
+        reduced = client.get("/api/dashboard/charts/performance", params={
+            "days": 7, "granularity": "hour", "max_points": 20,
+            "downsampling": method
+        }).json()
+        assert len(reduced["chart_data"]) <= 20
+        assert max(p["value"] for p in reduced["chart_data"]) == 1000.0
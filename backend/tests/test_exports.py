@@ -0,0 +1,132 @@
+"""
+Tests for the streamed metric exports.
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.models import Metric
+from app.services.export_service import MetricExportService
+
+
+def _add_metrics(db, count):
+    now = datetime.utcnow()
+    metrics = [
+        Metric(name=f"Metric {i}", type="usage" if i % 3 else "system",
+               value=float(i), unit="ms",
+               description='with "quotes", commas' if i == 5 else None,
+               recorded_at=now - timedelta(minutes=i))
+        for i in range(count)
+    ]
+    db.add_all(metrics)
+    db.commit()
+    return metrics
+
+
+def test_csv_export_streams_every_row_in_batches(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 7)
+    _add_metrics(db, 50)
+
+    with client.stream("GET", "/api/reports/export/csv") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers["content-disposition"]
+        body = response.read().decode()
+
+    rows = list(csv.reader(io.StringIO(body)))
+    assert rows[0][:4] == ["ID", "Name", "Type", "Value"]
+    assert len(rows) == 51
+    # Newest first, and quoting survives chunk boundaries
+    assert [row[1] for row in rows[1:4]] == ["Metric 0", "Metric 1",
+                                             "Metric 2"]
+    assert rows[6][5] == 'with "quotes", commas'
+
+    filtered = client.get("/api/reports/export/csv",
+                          params={"type_filter": "system"})
+    assert len(filtered.text.strip().splitlines()) == 1 + 17
+
+
+def test_csv_is_encoded_one_chunk_per_batch(db):
+    _add_metrics(db, 20)
+    query = MetricExportService.export_query(
+        datetime.utcnow() - timedelta(days=1), datetime.utcnow())
+
+    async def collect():
+        return [chunk async for chunk in
+                MetricExportService.iter_csv(query, batch_size=8)]
+
+    chunks = asyncio.run(collect())
+    # Header, then batches of 8, 8 and 4 rows
+    assert [chunk.count("\n") for chunk in chunks] == [1, 8, 8, 4]
+
+
+def test_json_export_streams_header_rows_and_trailer(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 4)
+    _add_metrics(db, 10)
+
+    data = client.get("/api/reports/export/json").json()
+    assert data["export_info"]["exported_by"] == "admin"
+    assert data["total_records"] == 10
+    assert [m["value"] for m in data["metrics"]] == [float(i) for i in range(10)]
+
+    response = client.get("/api/reports/export/json",
+                          params={"format": "ndjson", "type_filter": "usage"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert "export_info" in lines[0]
+    assert lines[-1] == {"total_records": 6}
+    assert {line["type"] for line in lines[1:-1]} == {"usage"}
+
+    empty = client.get("/api/reports/export/json", params={
+        "date_from": "2000-01-01T00:00:00", "date_to": "2000-01-02T00:00:00"})
+    assert empty.json()["metrics"] == []
+
+
+def test_columnar_exports_round_trip(client, db, monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 16)
+    monkeypatch.setattr(settings, "EXPORT_PARQUET_ROW_GROUP_SIZE", 40)
+    _add_metrics(db, 100)
+
+    response = client.get("/api/reports/export/arrow")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == \
+        "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 100
+    assert pa.types.is_dictionary(table.schema.field("name").type)
+    assert table.column("value").to_pylist() == [float(i) for i in range(100)]
+    assert table.column("recorded_at").type.tz == "UTC"
+
+    response = client.get("/api/reports/export/parquet",
+                          params={"type_filter": "usage"})
+    assert response.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(response.content))
+    assert parquet.metadata.num_rows == 66
+    # Batches of 16 are grouped into row groups of at least 40 rows
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert set(table.column("type").to_pylist()) == {"usage"}
+    assert pa.types.is_dictionary(table.schema.field("unit").type)
+
+
+def test_arrow_stream_sends_one_record_batch_per_chunk(db):
+    pytest.importorskip("pyarrow")
+    _add_metrics(db, 20)
+    query = MetricExportService.export_query(
+        datetime.utcnow() - timedelta(days=1), datetime.utcnow())
+
+    async def collect():
+        return [chunk async for chunk in
+                MetricExportService.iter_arrow(query, batch_size=8)]
+
+    chunks = asyncio.run(collect())
+    # Schema with the first batch, two more batches, then end-of-stream
+    assert len(chunks) == 4
+    assert all(chunks)
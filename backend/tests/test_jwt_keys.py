@@ -0,0 +1,145 @@
+"""
+Tests for asymmetric JWT signing and the JWKS endpoint.
+"""
+import os
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services import jwt_keys
+from app.services.auth_service import AuthService
+from app.services.jwt_keys import key_ring, write_key
+from app.services.token_cache import token_cache
+
+
+@pytest.fixture
+def keys_dir(tmp_path):
+    yield tmp_path
+    key_ring.configure(settings.ALGORITHM, settings.JWT_KEYS_DIR,
+                       settings.JWT_ACTIVE_KID,
+                       settings.JWT_KEY_RELOAD_SECONDS,
+                       settings.JWT_KEY_RELOAD_SECONDS
+                       + settings.JWKS_MAX_AGE_SECONDS)
+    token_cache.clear()
+
+
+def _verify_with_jwks(client, token):
+    """Verify a token the way another service would."""
+    jwk_set = jwt.PyJWKSet.from_dict(
+        client.get("/.well-known/jwks.json").json())
+    kid = jwt.get_unverified_header(token)["kid"]
+    key = next(key for key in jwk_set.keys if key.key_id == kid)
+    return jwt.decode(token, key.key, algorithms=[key.algorithm_name])
+
+
+@pytest.mark.parametrize("algorithm", ["RS256", "EdDSA"])
+def test_tokens_verify_against_published_keys(client, keys_dir, algorithm):
+    key_ring.configure(algorithm, str(keys_dir))
+    token = AuthService.create_access_token({"sub": "7"})
+
+    header = jwt.get_unverified_header(token)
+    assert header["alg"] == algorithm
+    assert (keys_dir / f"{header['kid']}.pem").exists()
+    assert AuthService.verify_token(token)["sub"] == "7"
+    assert _verify_with_jwks(client, token)["sub"] == "7"
+
+
+def test_rotation_keeps_old_tokens_valid(client, keys_dir):
+    key_ring.configure("EdDSA", str(keys_dir), reload_seconds=0)
+    write_key(keys_dir, "EdDSA", "2026a")
+    old_token = AuthService.create_access_token({"sub": "7"})
+
+    write_key(keys_dir, "EdDSA", "2026b")
+    new_token = AuthService.create_access_token({"sub": "8"})
+
+    assert jwt.get_unverified_header(old_token)["kid"] == "2026a"
+    assert jwt.get_unverified_header(new_token)["kid"] == "2026b"
+    token_cache.clear()
+    assert AuthService.verify_token(old_token)["sub"] == "7"
+    assert _verify_with_jwks(client, old_token)["sub"] == "7"
+    assert _verify_with_jwks(client, new_token)["sub"] == "8"
+
+    # Removing a key revokes everything it signed
+    (keys_dir / "2026a.pem").unlink()
+    token_cache.clear()
+    with pytest.raises(HTTPException):
+        AuthService.verify_token(old_token)
+
+
+def test_new_keys_are_published_before_they_sign(client, keys_dir):
+    key_ring.configure("EdDSA", str(keys_dir), reload_seconds=0,
+                       publish_seconds=300)
+    write_key(keys_dir, "EdDSA", "2026a")
+    write_key(keys_dir, "EdDSA", "2026b")
+    published = time.time() - 301
+    os.utime(keys_dir / "2026a.pem", (published, published))
+
+    # Served to verifiers at once, but not signing yet
+    kids = [key["kid"] for key in
+            client.get("/.well-known/jwks.json").json()["keys"]]
+    assert kids == ["2026a", "2026b"]
+    token = AuthService.create_access_token({"sub": "7"})
+    assert jwt.get_unverified_header(token)["kid"] == "2026a"
+
+    os.utime(keys_dir / "2026b.pem", (published, published))
+    token = AuthService.create_access_token({"sub": "7"})
+    assert jwt.get_unverified_header(token)["kid"] == "2026b"
+
+
+def test_concurrent_first_keys_do_not_fail(keys_dir, monkeypatch):
+    key_ring.configure("EdDSA", str(keys_dir), publish_seconds=300)
+    write = jwt_keys.write_key
+
+    def racing_write(directory, algorithm, kid=None):
+        # Another worker links its key first
+        write(directory, algorithm, "other-worker")
+        raise FileExistsError(kid)
+
+    monkeypatch.setattr(jwt_keys, "write_key", racing_write)
+    token = AuthService.create_access_token({"sub": "7"})
+    assert jwt.get_unverified_header(token)["kid"] == "other-worker"
+    assert [path.name for path in keys_dir.iterdir()] == ["other-worker.pem"]
+
+
+def test_active_kid_pins_the_signing_key(keys_dir):
+    write_key(keys_dir, "RS256", "a")
+    write_key(keys_dir, "RS256", "b")
+    key_ring.configure("RS256", str(keys_dir), active_kid="a")
+    token = AuthService.create_access_token({"sub": "7"})
+    assert jwt.get_unverified_header(token)["kid"] == "a"
+
+
+def test_unknown_kid_and_foreign_algorithm_are_rejected(keys_dir):
+    key_ring.configure("EdDSA", str(keys_dir))
+    AuthService.create_access_token({"sub": "7"})
+
+    hs_token = jwt.encode({"sub": "7"}, settings.SECRET_KEY,
+                          algorithm="HS256", headers={"kid": "missing"})
+    with pytest.raises(HTTPException):
+        AuthService.verify_token(hs_token)
+
+
+def test_jwks_is_cacheable(client, keys_dir):
+    key_ring.configure("RS256", str(keys_dir))
+    write_key(keys_dir, "RS256", "only")
+
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == (
+        f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}")
+    [key] = response.json()["keys"]
+    assert key["kid"] == "only" and key["kty"] == "RSA"
+    assert "d" not in key
+
+    etag = response.headers["etag"]
+    cached = client.get("/.well-known/jwks.json",
+                        headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+
+def test_shared_secret_publishes_no_keys(client):
+    assert settings.ALGORITHM == "HS256"
+    assert client.get("/.well-known/jwks.json").json() == {"keys": []}
@@ -0,0 +1,78 @@
+"""
+Tests for the sliding-window log counters.
+"""
+from datetime import datetime, timedelta
+
+from app.models import Log
+from app.services.log_counters import (
+    LogCounterService, error_totals, log_counters
+)
+
+# Mid-minute, and before the minute-aligned end of default report windows
+NOW = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(
+    seconds=30)
+
+
+def _logs(*entries):
+    return [
+        Log(level=level, category=category, message=f"{level} {category}",
+            created_at=NOW - timedelta(minutes=minutes_ago))
+        for level, category, minutes_ago in entries
+    ]
+
+
+def test_committed_logs_are_counted(db):
+    db.add_all(_logs(("info", "api", 0), ("error", "api", 0),
+                     ("critical", "system", 2)))
+    db.commit()
+    db.add_all(_logs(("error", "api", 0)))
+    db.flush()
+    db.rollback()
+    # Outside the window
+    db.add_all(_logs(("error", "api", 2 * 1440)))
+    db.commit()
+
+    counts = log_counters.counts(NOW - timedelta(minutes=5), NOW)
+    assert error_totals(counts) == (3, 2)
+    assert error_totals(counts, "api") == (2, 1)
+    assert error_totals(log_counters.counts(NOW, NOW)) == (2, 1)
+
+
+def test_counters_are_rehydrated_from_the_database(db):
+    db.add_all(_logs(("info", "api", 0), ("error", "api", 1),
+                     ("warning", "auth", 1), ("error", "api", 3000)))
+    db.commit()
+    expected = log_counters.series(NOW - timedelta(minutes=10), NOW)
+
+    log_counters.clear()
+    assert LogCounterService.load(db) == 3
+    assert log_counters.series(NOW - timedelta(minutes=10), NOW) == expected
+    assert error_totals(log_counters.counts(
+        NOW - timedelta(minutes=1), NOW - timedelta(minutes=1))) == (2, 1)
+
+
+def test_health_and_error_rate_use_the_counters(client, db):
+    db.add_all(_logs(("info", "api", 1), ("info", "api", 1),
+                     ("info", "auth", 3), ("error", "api", 3)))
+    db.commit()
+
+    health = client.get("/api/reports/system-health").json()["summary"]
+    assert health["total_logs"] == 4
+    assert health["error_rate_percentage"] == 25.0
+
+    response = client.get("/api/reports/error-rate",
+                          params={"minutes": 10, "category": "api"})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["points"]) == 10
+    assert (body["total_logs"], body["error_logs"]) == (3, 1)
+    by_minute = {point["bucket_start"]: point for point in body["points"]}
+    errored = (NOW - timedelta(minutes=3)).replace(second=0).isoformat()
+    assert by_minute[errored]["error_rate_percentage"] == 100.0
+
+    summary = client.get("/api/dashboard/summary").json()
+    assert summary["error_rate_percentage"] == 25.0
+    assert summary["system_health"] == "critical"
+
+    log_counters.clear()
+    assert client.get("/api/reports/error-rate").status_code == 503
@@ -0,0 +1,191 @@
+"""
+Tests for the Alembic migrations and the indexes they create.
+"""
+import re
+from datetime import datetime, timedelta
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.database import ALEMBIC_INI, AsyncSessionLocal, run_migrations
+from app.main import app
+from app.models import AuthEvent, Base, Log, Metric, MetricRollup
+from app.services.tdigest import TDigest
+
+# A plain "SCAN <table>" is a full table scan; index scans name the index
+TABLE_SCAN = re.compile(r"\bSCAN (metrics|logs|auth_events)\b(?! USING)")
+
+
+def test_migrations_build_the_model_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    run_migrations(engine)
+    # Running again on an up-to-date database is a no-op
+    run_migrations(engine)
+
+    with engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection),
+                                Base.metadata)
+        indexes = {index["name"]
+                   for index in inspect(connection).get_indexes("metrics")}
+    engine.dispose()
+
+    assert diff == []
+    assert {"ix_metrics_type_recorded_at", "ix_metrics_source_recorded_at",
+            "ix_metrics_recorded_at_id"} <= indexes
+
+
+def _create_legacy_schema(path):
+    """Schema as create_all built it before rollups and migrations."""
+    engine = create_engine(f"sqlite:///{path}")
+    legacy = [table for table in Base.metadata.sorted_tables
+              if table.name not in ("metric_rollups", "auth_events",
+                                    "revoked_tokens")]
+    Base.metadata.create_all(engine, tables=legacy)
+    with engine.begin() as connection:
+        for name in ("ix_metrics_type_recorded_at",
+                     "ix_metrics_source_recorded_at",
+                     "ix_metrics_recorded_at_id", "ix_logs_level_created_at",
+                     "ix_logs_category_created_at", "ix_logs_created_at"):
+            connection.exec_driver_sql(f"DROP INDEX {name}")
+        for name, table, column in (("ix_metrics_type", "metrics", "type"),
+                                    ("ix_logs_level", "logs", "level"),
+                                    ("ix_logs_category", "logs", "category")):
+            connection.exec_driver_sql(
+                f"CREATE INDEX {name} ON {table} ({column})")
+    return engine
+
+
+def test_legacy_database_is_stamped_before_upgrading(tmp_path):
+    """Schemas created by create_all are adopted, not recreated."""
+    engine = _create_legacy_schema(tmp_path / "legacy.db")
+    run_migrations(engine)
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection),
+                                Base.metadata) == []
+    engine.dispose()
+
+
+def test_existing_metrics_are_rolled_up_when_migrating(tmp_path):
+    """Databases with metrics but no rollups get their rollups rebuilt."""
+    engine = _create_legacy_schema(tmp_path / "legacy.db")
+    # Within the minute rollup retention
+    recorded_at = datetime.utcnow() - timedelta(hours=1)
+    with Session(engine) as session:
+        session.add_all([
+            Metric(name="Latency", type="performance", value=float(value),
+                   recorded_at=recorded_at)
+            for value in (10, 20, 30)
+        ])
+        session.commit()
+
+    run_migrations(engine)
+    with Session(engine) as session:
+        rows = session.execute(select(
+            MetricRollup.granularity, MetricRollup.sample_count,
+            MetricRollup.sum_value)).all()
+    engine.dispose()
+
+    assert sorted(rows) == [("day", 3, 60.0), ("hour", 3, 60.0),
+                            ("minute", 3, 60.0)]
+
+
+def test_existing_sketches_are_counted_when_migrating(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sketches.db'}")
+    config = Config(str(ALEMBIC_INI))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "0006")
+        sketch = TDigest()
+        for value in range(40):
+            sketch.add(value)
+        connection.exec_driver_sql(
+            "INSERT INTO metric_rollups (granularity, bucket_start, name, "
+            "type, source, sample_count, sum_value, min_value, max_value, "
+            "sum_squares, sketch) VALUES ('hour', '2024-05-01 12:00:00', "
+            "'Latency', 'performance', '', 50, 0, 0, 39, 0, ?)",
+            (sketch.to_bytes(),))
+
+    run_migrations(engine)
+    with Session(engine) as session:
+        counts = session.execute(select(
+            MetricRollup.sample_count, MetricRollup.sketch_count)).all()
+    engine.dispose()
+
+    # A sketch missing samples is told apart from a complete one
+    assert counts == [(50, 40)]
+
+
+def test_login_logs_are_copied_to_auth_events(tmp_path):
+    engine = _create_legacy_schema(tmp_path / "legacy.db")
+    created_at = datetime(2024, 5, 1, 12, 0)
+    with Session(engine) as session:
+        session.add_all([
+            Log(level="info", category=category, message=message,
+                ip_address="10.0.0.1", created_at=created_at)
+            for category, message in (("auth", "User Login"),
+                                      ("auth", "Password reset"),
+                                      ("api", "login endpoint slow"))
+        ])
+        session.commit()
+
+    run_migrations(engine)
+    with Session(engine) as session:
+        rows = session.execute(select(
+            AuthEvent.event_type, AuthEvent.ip_address)).all()
+    engine.dispose()
+
+    assert rows == [("login_success", "10.0.0.1")]
+
+
+def test_report_queries_use_indexes(client, db):
+    """Every metrics, logs or auth_events report query is index-driven."""
+    client.post("/api/dashboard/seed-data")
+    now = datetime.utcnow()
+    db.add_all([
+        Log(level=level, category=category, message=f"{category} login",
+            created_at=now - timedelta(hours=hours))
+        for hours, (level, category) in enumerate(
+            [("info", "auth"), ("error", "system"), ("critical", "api")])
+    ])
+    db.add_all([
+        AuthEvent(event_type=event_type, user_id=1, created_at=now)
+        for event_type in ("login_success", "login_failure", "logout")
+    ])
+    db.commit()
+
+    statements = []
+    engine = AsyncSessionLocal.kw["bind"].sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if re.search(r"\bFROM (metrics|logs|auth_events)\b", statement):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        api = TestClient(app)
+        for url in ("/api/reports/system-health",
+                    "/api/reports/user-activity",
+                    "/api/reports/metrics-summary",
+                    "/api/reports/export/csv",
+                    "/api/reports/export/csv?type_filter=performance",
+                    "/api/reports/export/json?type_filter=usage",
+                    "/api/dashboard/metrics?type_filter=revenue",
+                    "/api/dashboard/metrics?source_filter=billing",
+                    "/api/dashboard/charts/performance"):
+            # A failing endpoint would skip the queries it never reached
+            assert api.get(url).status_code == 200, url
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert len(statements) >= 8
+    connection = db.connection()
+    for statement, parameters in statements:
+        plan = connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        details = " | ".join(row[-1] for row in plan)
+        assert not TABLE_SCAN.search(details), f"{statement}\n{details}"
@@ -0,0 +1,73 @@
+"""
+Tests for keyset pagination of the dashboard metrics list.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import asyncpg
+
+from app.models import Metric
+from app.services.pagination import explain_statement
+
+
+def _seed(db, count=25):
+    base = datetime(2024, 3, 1, 12, 0)
+    # Pairs of metrics share a timestamp so the id tie-breaker matters
+    db.add_all([
+        Metric(name="CPU Usage", type="system", value=float(i),
+               recorded_at=base + timedelta(minutes=i // 2))
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def test_cursor_pages_cover_all_metrics_once(client, db):
+    """Following next_cursor visits every metric exactly once, in order."""
+    _seed(db)
+    seen = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get("/api/dashboard/metrics",
+                              params={"cursor": cursor, "per_page": 10})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] is None
+        seen.extend(metric["id"] for metric in data["metrics"])
+        cursor = data["next_cursor"]
+        assert data["has_next"] == (cursor is not None)
+
+    assert len(seen) == len(set(seen)) == 25
+    expected = [m.id for m in db.query(Metric).order_by(
+        Metric.recorded_at.desc(), Metric.id.desc())]
+    assert seen == expected
+
+
+def test_page_mode_keeps_legacy_response(client, db):
+    """Offset pagination still reports totals and page flags."""
+    _seed(db)
+    data = client.get("/api/dashboard/metrics",
+                      params={"page": 3, "per_page": 10}).json()
+    assert data["total"] == 25
+    assert data["page"] == 3
+    assert len(data["metrics"]) == 5
+    assert data["has_prev"] and not data["has_next"]
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get("/api/dashboard/metrics",
+                          params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_estimate_statement_inlines_parameters_for_asyncpg():
+    """asyncpg binds positionally, so the EXPLAIN carries its values."""
+    query = select(Metric.id).where(
+        Metric.type == "system",
+        Metric.recorded_at >= datetime(2024, 3, 1)
+    ).order_by(Metric.id)
+    statement = explain_statement(query, asyncpg.dialect())
+
+    assert statement.startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "metrics.type = 'system'" in statement
+    assert "metrics.recorded_at >= '2024-03-01 00:00:00'" in statement
+    assert "$1" not in statement and "ORDER BY" not in statement
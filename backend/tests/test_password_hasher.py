@@ -0,0 +1,71 @@
+"""
+Tests for the bounded password hashing pool.
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+
+from app.services.password_hasher import PasswordHasher
+
+
+def _observations(name, operation):
+    return REGISTRY.get_sample_value(
+        f"{name}_count", {"operation": operation}) or 0.0
+
+
+@pytest.mark.parametrize("use_processes", [False, True])
+def test_hashes_and_verifies_on_the_pool(use_processes):
+    hasher = PasswordHasher(workers=2, queue_size=4,
+                            use_processes=use_processes)
+    waits = _observations("password_hash_wait_seconds", "verify")
+    durations = _observations("password_hash_seconds", "hash")
+
+    async def run():
+        hashed = await hasher.hash("secret123")
+        return hashed, await asyncio.gather(
+            hasher.verify("secret123", hashed),
+            hasher.verify("wrong-password", hashed))
+
+    try:
+        hashed, results = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+    assert hashed.startswith("$2")
+    assert results == [True, False]
+    assert _observations("password_hash_wait_seconds", "verify") == waits + 2
+    assert _observations("password_hash_seconds", "hash") == durations + 1
+
+
+def test_event_loop_keeps_running_while_hashing():
+    hasher = PasswordHasher(workers=1, queue_size=0, use_processes=False)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        ticker = asyncio.create_task(tick())
+        hashing = asyncio.create_task(hasher.hash("secret123"))
+        await asyncio.sleep(0)
+        # The single slot is taken, so another call is turned away
+        with pytest.raises(HTTPException) as error:
+            await hasher.verify("secret123", "$2b$12$invalid")
+        await hashing
+        ticker.cancel()
+        return ticks, error.value
+
+    try:
+        ticks, error = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "1"
+    assert ticks > 5
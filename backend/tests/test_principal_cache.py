@@ -0,0 +1,106 @@
+"""
+Tests for the principal cache behind get_current_user.
+"""
+import re
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.models import Role, User
+from app.services.auth_service import AuthService
+from app.services.principal_cache import Principal, PrincipalCache
+
+
+def _principal(user_id):
+    return Principal(id=user_id, username=f"user{user_id}",
+                     email=f"user{user_id}@example.com", is_active=True,
+                     role_name="user")
+
+
+def test_lru_ttl_and_stale_loads():
+    cache = PrincipalCache(max_entries=2, ttl_seconds=60)
+    for user_id in (1, 2):
+        cache.put(_principal(user_id), cache.generation)
+    assert cache.get(1) is not None
+    cache.put(_principal(3), cache.generation)
+    # 2 was the least recently used
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+
+    # A load that raced an invalidation is not stored
+    generation = cache.generation
+    cache.invalidate(1)
+    cache.put(_principal(1), generation)
+    assert cache.get(1) is None
+
+    expiring = PrincipalCache(max_entries=2, ttl_seconds=0.01)
+    expiring.put(_principal(1), expiring.generation)
+    time.sleep(0.02)
+    assert expiring.get(1) is None
+
+
+def _admin_and_user(db):
+    admin_role, user_role = Role(name="admin"), Role(name="user")
+    db.add_all([admin_role, user_role])
+    db.flush()
+    users = [
+        User(email=f"{name}@example.com", username=name,
+             hashed_password=AuthService.get_password_hash("secret123"),
+             role_id=role.id, is_active=True)
+        for name, role in (("root", admin_role), ("jane", user_role))
+    ]
+    db.add_all(users)
+    db.commit()
+    return [
+        {"Authorization": "Bearer " + AuthService.create_access_token(
+            {"sub": str(user.id)})}
+        for user in users
+    ] + [users[1].id]
+
+
+def test_cached_requests_skip_user_queries(db):
+    admin, _, _ = _admin_and_user(db)
+    client = TestClient(app)
+    assert client.get("/api/dashboard/charts/performance",
+                      headers=admin).status_code == 200
+
+    statements = []
+    engine = AsyncSessionLocal.kw["bind"].sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if re.search(r"\bFROM (users|roles)\b", statement):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        assert client.get("/api/dashboard/charts/performance",
+                          headers=admin).status_code == 200
+        assert client.get("/api/users/roles/",
+                          headers=admin).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    # Only the roles listing itself
+    assert len(statements) == 1
+
+
+def test_user_changes_take_effect_immediately(db):
+    admin, jane, jane_id = _admin_and_user(db)
+    client = TestClient(app)
+    assert client.get("/api/auth/me", headers=jane).status_code == 200
+
+    client.post(f"/api/users/{jane_id}/deactivate", headers=admin)
+    assert client.get("/api/auth/me", headers=jane).status_code == 400
+    client.post(f"/api/users/{jane_id}/activate", headers=admin)
+    assert client.get("/api/auth/me", headers=jane).status_code == 200
+
+    admin_role_id = db.query(Role.id).filter(Role.name == "admin").scalar()
+    assert client.get("/api/users/", headers=jane).status_code == 403
+    client.put(f"/api/users/{jane_id}", headers=admin,
+               json={"role_id": admin_role_id})
+    assert client.get("/api/users/", headers=jane).status_code == 200
+
+    client.delete(f"/api/users/{jane_id}", headers=admin)
+    assert client.get("/api/auth/me", headers=jane).status_code == 401
@@ -0,0 +1,106 @@
+"""
+Tests for the in-memory recent points buffer.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import Metric
+from app.services.dashboard_service import summary_snapshot
+from app.services.recent_points import RecentPoint, RecentPointsBuffer
+from app.services.recent_points import RecentPointsService, recent_points
+
+BASE = datetime(2024, 5, 1, 12, 0)
+
+
+def _point(id, minutes, name="CPU Usage", type="performance", source=None):
+    return RecentPoint(id, name, type, float(id), "%", None, source, None,
+                       BASE + timedelta(minutes=minutes), BASE, None)
+
+
+@pytest.fixture
+def loaded(db):
+    RecentPointsService.load(db)
+    try:
+        yield recent_points
+    finally:
+        recent_points.clear()
+
+
+def test_ring_keeps_newest_points_in_order():
+    buffer = RecentPointsBuffer(capacity=3, max_series=10)
+    buffer.load({})
+    buffer.add(_point(i, i) for i in range(5))
+    # A back-dated point lands in order; one older than the ring is dropped
+    buffer.add([_point(5, 3.5), _point(6, -10)])
+
+    assert [p.id for p in buffer.latest(3)] == [4, 5, 3]
+    # Only 3 points are kept and older ones exist
+    assert buffer.latest(3, since=BASE) == [_point(4, 4), _point(5, 3.5),
+                                            _point(3, 3)]
+    assert buffer.latest(2, until=BASE + timedelta(minutes=2)) is None
+    assert buffer.latest(4) is None
+
+
+def test_series_limit_falls_back_when_evicted_points_could_matter():
+    buffer = RecentPointsBuffer(capacity=2, max_series=2)
+    buffer.load({})
+    buffer.add([_point(1, 30, name="a"), _point(2, 10, name="b"),
+                _point(3, 20, name="c")])
+
+    assert buffer.series_count == 2
+    # Series "a" was evicted and holds the newest point overall
+    assert buffer.latest(1) is None
+    buffer.add([_point(4, 40, name="d")])
+    assert [p.id for p in buffer.latest(1)] == [4]
+
+
+def test_summary_and_reports_match_database(client, db, loaded):
+    client.post("/api/dashboard/seed-data")
+    client.post("/api/dashboard/metrics", json={
+        "name": "Response Time", "type": "performance", "value": 99.0,
+        "recorded_at": (datetime.utcnow() - timedelta(days=3)).isoformat()
+    })
+    metric = db.query(Metric).order_by(
+        Metric.recorded_at.desc(), Metric.id.desc()).first()
+    client.put(f"/api/dashboard/metrics/{metric.id}",
+               json={"name": "Renamed Metric"})
+
+    def from_database(limit, **filters):
+        loaded.clear()
+        try:
+            return [m.id for m in RecentPointsService.latest(
+                db, limit, **filters)]
+        finally:
+            RecentPointsService.load(db)
+
+    assert loaded.latest(10) is not None
+    summary = client.get("/api/dashboard/summary").json()
+    assert [m["id"] for m in summary["recent_metrics"]] == from_database(10)
+    assert summary["recent_metrics"][0]["name"] == "Renamed Metric"
+
+    recent = client.get("/api/dashboard/metrics/recent",
+                        params={"type_filter": "performance", "limit": 5})
+    assert [m["id"] for m in recent.json()] == from_database(
+        5, type="performance")
+
+
+def test_points_are_recorded_before_the_snapshot_is_invalidated(
+        client, loaded, monkeypatch):
+    """A summary computed before the record must not be stored."""
+    record = RecentPointsService.record
+    generations = []
+
+    def tracking_record(metrics):
+        generations.append(summary_snapshot.generation)
+        record(metrics)
+
+    monkeypatch.setattr(RecentPointsService, "record", tracking_record)
+    before = summary_snapshot.generation
+    client.post("/api/dashboard/metrics", json={
+        "name": "CPU Usage", "type": "performance", "value": 5.0})
+    client.post("/api/dashboard/metrics/batch", json=[
+        {"name": "CPU Usage", "type": "performance", "value": 6.0}])
+
+    assert generations == [before, before + 1]
+    assert summary_snapshot.generation == before + 2
@@ -0,0 +1,92 @@
+"""
+Tests for the report result cache and its write watermarks.
+"""
+from datetime import datetime, timedelta
+
+from app.models import Metric
+from app.services.report_cache import ReportCache, align_window, report_cache
+
+DAY = datetime(2024, 5, 1)
+
+
+def test_windows_align_to_the_configured_boundary():
+    value = datetime(2024, 5, 1, 12, 34, 56, 789)
+    assert align_window(value, 60) == datetime(2024, 5, 1, 12, 34)
+    assert align_window(value, 3600) == datetime(2024, 5, 1, 12)
+    assert align_window(value, 1) == datetime(2024, 5, 1, 12, 34, 56)
+
+
+def test_entries_survive_writes_outside_their_range():
+    cache = ReportCache(max_bytes=10_000, ttl_seconds=60)
+    dependencies = [("metrics", DAY, DAY + timedelta(days=1))]
+    cache.put("k", {"total": 1}, dependencies, cache.generations(["metrics"]))
+
+    cache.note_write("metrics", [DAY + timedelta(days=3)])
+    cache.note_write("logs")
+    assert cache.get("test", "k") == {"total": 1}
+
+    cache.note_write("metrics", [DAY + timedelta(hours=5)])
+    assert cache.get("test", "k") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_results_computed_across_a_write_are_not_stored():
+    cache = ReportCache(max_bytes=10_000, ttl_seconds=60)
+    generations = cache.generations(["metrics"])
+    cache.note_write("metrics", [DAY])  # lands while computing
+    cache.put("k", {"total": 1}, [("metrics", None, None)], generations)
+    assert cache.get("test", "k") is None
+
+
+def test_least_recently_used_entries_are_evicted_for_space():
+    cache = ReportCache(max_bytes=60, ttl_seconds=60)
+    for key in ("a", "b"):
+        cache.put(key, {"payload": "x" * 10}, [], {})
+    assert cache.get("test", "a") is not None
+    cache.put("c", {"payload": "x" * 10}, [], {})
+
+    assert cache.get("test", "b") is None
+    assert cache.get("test", "a") is not None
+    assert cache.stats()["bytes"] <= 60
+
+
+def test_reports_are_served_from_cache_until_a_write_lands(client, db):
+    client.post("/api/dashboard/seed-data")
+    first = client.get("/api/reports/metrics-summary").json()
+    hits = report_cache.hits
+    second = client.get("/api/reports/metrics-summary").json()
+    assert report_cache.hits == hits + 1
+    assert second["summary"] == first["summary"]
+    assert second["report_info"]["date_to"] == first["report_info"]["date_to"]
+
+    # A write inside the window invalidates the entry
+    client.post("/api/dashboard/metrics", json={
+        "name": "CPU Usage", "type": "performance", "value": 1.0,
+        "recorded_at": (datetime.utcnow() - timedelta(days=1)).isoformat()})
+    third = client.get("/api/reports/metrics-summary").json()
+    assert third["summary"]["total_metrics"] == \
+        first["summary"]["total_metrics"] + 1
+
+    # A write after the aligned window end does not
+    db.add(Metric(name="CPU Usage", type="performance", value=2.0,
+                  recorded_at=datetime.utcnow()))
+    db.commit()
+    report_cache.note_write("metrics", [datetime.utcnow()])
+    hits = report_cache.hits
+    client.get("/api/reports/metrics-summary")
+    assert report_cache.hits == hits + 1
+
+    metrics = client.get("/metrics")
+    assert 'report_cache_requests_total{report="metrics_summary",' \
+           'result="hit"}' in metrics.text
+
+
+def test_default_start_is_relative_to_now(client, db):
+    """Only passing an end keeps the start at the last 30 days."""
+    date_to = datetime.utcnow() - timedelta(days=10)
+    info = client.get("/api/reports/metrics-summary", params={
+        "date_to": date_to.isoformat()}).json()["report_info"]
+    date_from = datetime.fromisoformat(info["date_from"])
+    assert abs(date_from - (datetime.utcnow() - timedelta(days=30))) < \
+        timedelta(minutes=2)
+    assert datetime.fromisoformat(info["date_to"]) == date_to
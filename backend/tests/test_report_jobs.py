@@ -0,0 +1,157 @@
+"""
+Tests for background report jobs.
+"""
+import asyncio
+import csv
+import io
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app.main import app
+from app.models import Metric
+from app.services.auth_service import get_current_user
+from app.services.principal_cache import Principal
+from app.services.report_jobs import ReportJobQueue, report_jobs
+
+
+@pytest.fixture(autouse=True)
+def job_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_jobs, "directory", tmp_path / "jobs")
+    yield tmp_path / "jobs"
+
+
+def _wait(client, job_id):
+    for _ in range(200):
+        job = client.get(f"/api/reports/jobs/{job_id}").json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError("report job did not finish")
+
+
+def test_report_job_result_matches_inline_report(client, db):
+    client.post("/api/dashboard/seed-data")
+    params = {"date_from": (datetime.utcnow() - timedelta(days=7)).isoformat(),
+              "date_to": datetime.utcnow().isoformat()}
+
+    response = client.post("/api/reports/jobs", json={
+        "template_id": "metrics_summary", "parameters": params})
+    assert response.status_code == 202
+    job = _wait(client, response.json()["id"])
+    assert job["status"] == "completed"
+    assert job["progress"]["bytes_written"] > 0
+
+    result = client.get(job["result_url"])
+    assert result.headers["content-type"] == "application/json"
+    assert "attachment" in result.headers["content-disposition"]
+    inline = client.get("/api/reports/metrics-summary", params=params).json()
+    assert result.json()["summary"] == inline["summary"]
+    assert result.json()["type_statistics"] == inline["type_statistics"]
+
+
+def test_export_job_writes_csv(client, db):
+    db.add_all([Metric(name="CPU", type="system", value=float(i),
+                       recorded_at=datetime.utcnow() - timedelta(hours=i))
+                for i in range(30)])
+    db.commit()
+
+    job_id = client.post("/api/reports/jobs", json={
+        "template_id": "metrics_export", "format": "csv",
+        "parameters": {"type_filter": "system"}}).json()["id"]
+    assert _wait(client, job_id)["status"] == "completed"
+    rows = list(csv.reader(io.StringIO(
+        client.get(f"/api/reports/jobs/{job_id}/result").text)))
+    assert len(rows) == 31
+
+
+def test_job_requests_are_validated(client):
+    assert client.post("/api/reports/jobs", json={
+        "template_id": "nope"}).status_code == 404
+    assert client.post("/api/reports/jobs", json={
+        "template_id": "system_health", "format": "csv"}).status_code == 400
+    assert client.post("/api/reports/jobs", json={
+        "template_id": "user_activity",
+        "parameters": {"type_filter": "usage"}}).status_code == 400
+    assert client.get("/api/reports/jobs/missing").status_code == 404
+
+
+def test_jobs_are_private_to_their_owner(client, db):
+    admin_job = client.post("/api/reports/jobs", json={
+        "template_id": "system_health"}).json()
+    assert _wait(client, admin_job["id"])["status"] == "completed"
+
+    app.dependency_overrides[get_current_user] = lambda: Principal(
+        id=999, username="viewer", email="viewer@example.com",
+        is_active=True, role_name="user")
+    for path in (f"/api/reports/jobs/{admin_job['id']}",
+                 f"/api/reports/jobs/{admin_job['id']}/result"):
+        assert client.get(path).status_code == 404
+
+    # Identical requests of different users are separate jobs
+    job = client.post("/api/reports/jobs", json={
+        "template_id": "system_health"}).json()
+    assert job["id"] != admin_job["id"] and not job["deduplicated"]
+    assert client.get(f"/api/reports/jobs/{job['id']}").status_code == 200
+
+
+def test_identical_jobs_are_deduplicated_while_active(tmp_path):
+    queue = ReportJobQueue(workers=1, queue_size=1, directory=str(tmp_path),
+                           ttl_seconds=60)
+    release = threading.Event()
+
+    async def blocked(session_factory):
+        release.wait(5)
+        yield "done"
+
+    submit = dict(template_id="t", parameters={}, filename="t.json",
+                  media_type="application/json", created_by="admin")
+    first, created = queue.submit("a", blocked, **submit)
+    again, created_again = queue.submit("a", blocked, **submit)
+    assert created and not created_again and again is first
+
+    # One running and one queued job fill the queue
+    queue.submit("b", blocked, **submit)
+    with pytest.raises(HTTPException) as error:
+        queue.submit("c", blocked, **submit)
+    assert error.value.status_code == 503
+
+    release.set()
+    for _ in range(200):
+        if first.finished and queue.get(first.id).finished:
+            break
+        time.sleep(0.01)
+    assert (tmp_path / first.id).read_bytes() == b"done"
+    # Finished jobs no longer absorb new submissions
+    assert queue.submit("a", blocked, **submit)[1]
+    queue.shutdown()
+
+
+def test_expire_loop_deletes_old_results(tmp_path):
+    queue = ReportJobQueue(workers=1, queue_size=1, directory=str(tmp_path),
+                           ttl_seconds=0)
+
+    async def runner(session_factory):
+        yield "done"
+
+    job, _ = queue.submit("a", runner, template_id="t", parameters={},
+                          filename="t.json", media_type="application/json",
+                          created_by="admin")
+    for _ in range(200):
+        if job.finished:
+            break
+        time.sleep(0.01)
+    assert (tmp_path / job.id).exists()
+
+    async def run_once():
+        task = asyncio.create_task(queue.expire_loop(0.01))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(run_once())
+    assert queue.get(job.id) is None
+    assert not (tmp_path / job.id).exists()
+    queue.shutdown()
@@ -0,0 +1,141 @@
+"""
+Tests for the metric rollup service.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+from app.models import Metric, MetricRollup
+from app.services.report_engine import ReportEngine
+from app.services.rollup_service import RollupService
+
+
+def _seed(db, count=500):
+    rng = random.Random(42)
+    start = datetime(2024, 3, 1, 5, 17)
+    metrics = [
+        Metric(
+            name=rng.choice(["Response Time", "CPU Usage"]),
+            type=rng.choice(["performance", "system"]),
+            source=rng.choice(["api-gateway", "monitoring", None]),
+            value=rng.uniform(0, 200),
+            recorded_at=start + timedelta(minutes=rng.randint(0, 4 * 1440))
+        )
+        for _ in range(count)
+    ]
+    db.add_all(metrics)
+    db.flush()
+    RollupService.apply_metrics(db, metrics)
+    db.commit()
+    return metrics
+
+
+def _expected(metrics, date_from, date_to, key):
+    expected = {}
+    for metric in metrics:
+        if date_from <= metric.recorded_at <= date_to:
+            expected.setdefault(key(metric), []).append(metric.value)
+    return expected
+
+
+def _assert_matches(result, expected):
+    assert set(result) == set(expected)
+    for key, values in expected.items():
+        assert result[key].count == len(values)
+        assert result[key].total == pytest.approx(sum(values))
+        assert result[key].minimum == pytest.approx(min(values))
+        assert result[key].maximum == pytest.approx(max(values))
+
+
+@pytest.mark.parametrize("date_from,date_to", [
+    (datetime(2024, 3, 1, 7, 31), datetime(2024, 3, 4, 22, 5)),
+    (datetime(2024, 3, 2, 0, 0), datetime(2024, 3, 3, 0, 0)),
+    (datetime(2024, 3, 2, 23, 40), datetime(2024, 3, 3, 0, 20)),
+    (datetime(2024, 3, 2, 10, 10), datetime(2024, 3, 2, 13, 50)),
+])
+def test_collect_matches_raw_aggregation(db, date_from, date_to):
+    """Rollup-backed aggregates equal a brute force pass over raw rows."""
+    metrics = _seed(db)
+
+    by_type = RollupService.collect(db, date_from, date_to,
+                                    group_by=("type",))
+    _assert_matches(by_type, _expected(
+        metrics, date_from, date_to, lambda m: (m.type,)))
+
+    by_day = RollupService.collect(db, date_from, date_to, per_day=True,
+                                   type_filter="performance")
+    _assert_matches(by_day, _expected(
+        [m for m in metrics if m.type == "performance"],
+        date_from, date_to, lambda m: (m.recorded_at.date(),)))
+
+    by_source = RollupService.collect(db, date_from, date_to,
+                                      group_by=("source",))
+    _assert_matches(by_source, _expected(
+        metrics, date_from, date_to, lambda m: (m.source,)))
+
+    by_hour = RollupService.collect(db, date_from, date_to, per_hour=True,
+                                    group_by=("name",))
+    _assert_matches(by_hour, _expected(
+        metrics, date_from, date_to,
+        lambda m: (m.recorded_at.replace(minute=0, second=0,
+                                         microsecond=0), m.name)))
+
+
+def test_refresh_and_rebuild_keep_rollups_consistent(db):
+    """Deleting a metric and rebuilding offline both yield exact rollups."""
+    metrics = _seed(db, count=100)
+    removed = metrics.pop()
+    point = (removed.name, removed.type, removed.source, removed.recorded_at)
+    db.delete(removed)
+    db.flush()
+    RollupService.refresh_series(db, [point])
+    db.commit()
+
+    date_from, date_to = datetime(2024, 3, 1), datetime(2024, 3, 6)
+    expected = _expected(metrics, date_from, date_to, lambda m: (m.name,))
+    _assert_matches(RollupService.collect(
+        db, date_from, date_to, group_by=("name",)), expected)
+
+    before = db.execute(select(MetricRollup.sample_count)).scalars().all()
+    assert RollupService.rebuild(db) == len(metrics)
+    db.commit()
+    after = db.execute(select(MetricRollup.sample_count)).scalars().all()
+    assert sorted(before) == sorted(after)
+    _assert_matches(RollupService.collect(
+        db, date_from, date_to, group_by=("name",)), expected)
+
+
+def test_report_engine_summary_matches_separate_reads(db):
+    """One grouped read yields the per-type, per-day and per-source results."""
+    metrics = _seed(db)
+    date_from = datetime(2024, 3, 1, 7, 31)
+    date_to = datetime(2024, 3, 4, 22, 5)
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.bind, "before_cursor_execute", listener)
+    try:
+        summary = ReportEngine.metrics_summary(db, date_from, date_to)
+        single_pass = len(statements)
+        statements.clear()
+        for kwargs in ({"group_by": ("type",)}, {"per_day": True},
+                       {"group_by": ("source",)}):
+            RollupService.collect(db, date_from, date_to, **kwargs)
+    finally:
+        event.remove(db.bind, "before_cursor_execute", listener)
+    assert single_pass * 3 == len(statements)
+
+    _assert_matches({(k,): v for k, v in summary.by_type.items()}, _expected(
+        metrics, date_from, date_to, lambda m: (m.type,)))
+    _assert_matches({(k,): v for k, v in summary.by_day.items()}, _expected(
+        metrics, date_from, date_to, lambda m: (m.recorded_at.date(),)))
+    _assert_matches({(k,): v for k, v in summary.by_source.items()},
+                    _expected(metrics, date_from, date_to,
+                              lambda m: (m.source,)))
+    assert summary.total == sum(1 for m in metrics
+                                if date_from <= m.recorded_at <= date_to)
+
+    counts = [stat.count for _, stat in summary.top_sources(2)]
+    assert len(counts) == 2 and counts == sorted(counts, reverse=True)
@@ -0,0 +1,203 @@
+"""
+Tests for bucketed series queries and the t-digest sketches behind them.
+"""
+import bisect
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.database import backfill_rollups
+from app.models import Metric, MetricRollup
+from app.services.rollup_service import RollupService
+from app.services.series_service import align_bucket
+from app.services.tdigest import TDigest
+
+# Recent enough for the minute rollup retention
+START = (datetime.utcnow() - timedelta(days=2)).replace(
+    hour=0, minute=0, second=0, microsecond=0)
+
+
+def _rank(values, estimate):
+    """Fraction of the values at or below an estimate."""
+    return bisect.bisect(sorted(values), estimate) / len(values)
+
+
+def test_merged_digests_track_exact_quantiles():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 0.8) for _ in range(20000)]
+    parts = [TDigest() for _ in range(24)]
+    for index, value in enumerate(values):
+        parts[index % 24].add(value)
+
+    merged = TDigest()
+    for part in parts:
+        merged.merge(TDigest.from_bytes(part.to_bytes()))
+
+    assert merged.count == len(values)
+    assert merged.centroid_count < 200
+    for q in (0.5, 0.95, 0.99):
+        assert _rank(values, merged.quantile(q)) == pytest.approx(q, abs=0.005)
+    assert merged.quantile(0) == min(values)
+    assert merged.quantile(1) == max(values)
+
+
+def test_buckets_align_to_their_size():
+    value = datetime(2024, 4, 3, 13, 47, 12)  # a Wednesday
+    assert align_bucket(value, "1m") == datetime(2024, 4, 3, 13, 47)
+    assert align_bucket(value, "5m") == datetime(2024, 4, 3, 13, 45)
+    assert align_bucket(value, "1d") == datetime(2024, 4, 3)
+    assert align_bucket(value, "1w") == datetime(2024, 4, 1)
+
+
+def test_series_percentiles_come_from_rollup_sketches(client, db):
+    rng = random.Random(3)
+    metrics = [
+        Metric(name="Response Time", type="performance",
+               source=rng.choice(["api-gateway", "web"]),
+               value=rng.expovariate(1 / 120),
+               recorded_at=START + timedelta(seconds=rng.randint(0, 86399)))
+        for _ in range(3000)
+    ]
+    db.add_all(metrics)
+    db.flush()
+    RollupService.apply_metrics(db, metrics)
+    db.commit()
+
+    params = {"bucket": "1d", "agg": ["count", "avg", "p50", "p99"],
+              "name": "Response Time", "date_from": START.isoformat(),
+              "date_to": (START + timedelta(days=1, seconds=-1)).isoformat()}
+    data = client.get("/api/dashboard/series", params=params).json()
+    assert len(data["points"]) == 1
+    day = data["points"][0]
+    values = [m.value for m in metrics]
+    assert day["count"] == len(values)
+    assert day["avg"] == pytest.approx(sum(values) / len(values))
+    assert _rank(values, day["p50"]) == pytest.approx(0.5, abs=0.01)
+    assert _rank(values, day["p99"]) == pytest.approx(0.99, abs=0.005)
+
+    # Minute rollups regrouped into 5 minute buckets
+    params.update(bucket="5m", agg=["count", "max"], source_filter="web")
+    data = client.get("/api/dashboard/series", params=params).json()
+    web = [m for m in metrics if m.source == "web"]
+    assert sum(point["count"] for point in data["points"]) == len(web)
+    assert max(point["max"] for point in data["points"]) == pytest.approx(
+        max(m.value for m in web))
+
+
+def test_series_rejects_unknown_aggregations_and_huge_ranges(client):
+    response = client.get("/api/dashboard/series", params={"agg": "p42"})
+    assert response.status_code == 400
+
+    response = client.get("/api/dashboard/series", params={
+        "bucket": "1m", "date_from": "2020-01-01T00:00:00"})
+    assert response.status_code == 400
+
+
+def test_minute_rollups_expire_after_the_retention_window(client, db):
+    retention = timedelta(days=settings.SERIES_MINUTE_RETENTION_DAYS)
+    now = datetime.utcnow()
+    old = now - retention - timedelta(days=1)
+    metrics = [Metric(name="Queue Depth", type="system", value=1.0,
+                      recorded_at=recorded_at)
+               for recorded_at in (old, now - timedelta(hours=1))]
+    db.add_all(metrics)
+    db.flush()
+    RollupService.apply_metrics(db, metrics)
+    db.commit()
+
+    def minute_buckets():
+        return db.query(MetricRollup).filter_by(granularity="minute").count()
+
+    # Metrics older than the window get no minute rollup at all
+    assert minute_buckets() == 1
+    assert db.query(MetricRollup).filter_by(granularity="hour").count() == 2
+
+    # Rows that age past the window are purged
+    assert RollupService.purge_minute_rollups(db, now=now + retention) == 1
+    db.commit()
+    assert minute_buckets() == 0
+
+    response = client.get("/api/dashboard/series", params={
+        "bucket": "5m", "date_from": old.isoformat(),
+        "date_to": (old + timedelta(hours=1)).isoformat()})
+    assert response.status_code == 400
+    assert "1h or larger" in response.json()["detail"]
+
+    response = client.get("/api/dashboard/series", params={
+        "bucket": "1h", "date_from": old.isoformat(), "agg": "count"})
+    assert sum(point["count"] for point in response.json()["points"]) == 2
+
+
+def test_coarse_sketches_are_composed_from_minutes(client, db):
+    rng = random.Random(5)
+    metrics = [Metric(name="Latency", type="performance",
+                      value=rng.expovariate(1 / 50),
+                      recorded_at=START + timedelta(seconds=rng.randint(
+                          0, 3 * 3600 - 1)))
+               for _ in range(600)]
+    db.add_all(metrics)
+    db.flush()
+    RollupService.apply_metrics(db, metrics)
+    db.commit()
+
+    # Writes only touch minute sketches
+    coarse = db.query(MetricRollup).filter(
+        MetricRollup.granularity != "minute").all()
+    assert coarse and all(rollup.sketch is None for rollup in coarse)
+
+    params = {"bucket": "1h", "agg": ["count", "p50"], "name": "Latency",
+              "date_from": START.isoformat(),
+              "date_to": (START + timedelta(hours=3, seconds=-1)).isoformat()}
+    composed = client.get("/api/dashboard/series", params=params).json()
+
+    assert RollupService.compact_sketches(db) == len(coarse)
+    db.commit()
+    assert all(rollup.sketch_count == rollup.sample_count
+               for rollup in db.query(MetricRollup))
+    stored = client.get("/api/dashboard/series", params=params).json()
+    assert stored == composed
+    for point in stored["points"]:
+        hour = [m.value for m in metrics
+                if align_bucket(m.recorded_at, "1h") == datetime.fromisoformat(
+                    point["bucket_start"])]
+        assert _rank(hour, point["p50"]) == pytest.approx(0.5, abs=0.03)
+
+
+def test_buckets_with_partial_sketches_are_rebuilt(client, db):
+    """Rollups from before sketches existed never yield skewed percentiles."""
+    day = START - timedelta(days=30)
+    older = [Metric(name="Latency", type="performance", value=float(value),
+                    recorded_at=day + timedelta(minutes=value))
+             for value in range(1, 101)]
+    db.add_all(older)
+    db.flush()
+    RollupService.apply_metrics(db, older)
+    db.query(MetricRollup).update({"sketch": None, "sketch_count": None})
+    db.commit()
+    # Written after the upgrade into the same buckets
+    newer = [Metric(name="Latency", type="performance", value=1000.0,
+                    recorded_at=day + timedelta(minutes=minute))
+             for minute in (1, 2, 3)]
+    db.add_all(newer)
+    db.flush()
+    RollupService.apply_metrics(db, newer)
+    db.commit()
+
+    params = {"bucket": "1d", "agg": ["count", "p50"], "name": "Latency",
+              "date_from": day.isoformat(),
+              "date_to": (day + timedelta(hours=1)).isoformat()}
+    [point] = client.get("/api/dashboard/series", params=params).json()[
+        "points"]
+    assert point["count"] == 103 and point["p50"] is None
+
+    assert RollupService.incomplete_sketch_days(db) == [day]
+    with db.get_bind().begin() as connection:
+        backfill_rollups(connection)
+    db.expire_all()
+    assert RollupService.incomplete_sketch_days(db) == []
+    [point] = client.get("/api/dashboard/series", params=params).json()[
+        "points"]
+    assert point["count"] == 103
+    assert point["p50"] == pytest.approx(52, abs=2)
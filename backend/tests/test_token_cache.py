@@ -0,0 +1,73 @@
+"""
+Tests for the verified token cache.
+"""
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+from prometheus_client import REGISTRY
+
+from app.services import auth_service
+from app.services.auth_service import AuthService
+from app.services.token_cache import TokenCache, token_cache
+
+
+def _hits():
+    return REGISTRY.get_sample_value(
+        "token_cache_requests_total", {"result": "hit"}) or 0.0
+
+
+def test_verified_tokens_are_decoded_once(monkeypatch):
+    token_cache.clear()
+    decodes = []
+    decode = jwt.decode
+    monkeypatch.setattr(auth_service.jwt, "decode",
+                        lambda *args, **kwargs: decodes.append(1) or
+                        decode(*args, **kwargs))
+    token = AuthService.create_access_token({"sub": "7"})
+    hits = _hits()
+
+    first = AuthService.verify_token(token)
+    first["sub"] = "changed"
+    assert AuthService.verify_token(token)["sub"] == "7"
+    assert AuthService.verify_token(token)["sub"] == "7"
+    assert len(decodes) == 1
+    assert _hits() == hits + 2
+
+    # Invalid tokens are never cached
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            AuthService.verify_token(token + "x")
+    assert len(decodes) == 3
+
+
+def test_entries_expire_with_the_token():
+    cache = TokenCache(max_entries=10, max_ttl_seconds=60)
+    cache.put("expiring", {"exp": time.time() + 0.05}, 0.001)
+    cache.put("expired", {"exp": time.time() - 1}, 0.001)
+    cache.put("no-exp", {"sub": "1"}, 0.001)
+    assert cache.get("expiring") is not None
+    assert cache.get("expired") is None and cache.get("no-exp") is None
+    time.sleep(0.06)
+    assert cache.get("expiring") is None
+
+
+def test_leeway_and_monotonic_deadline():
+    # Within the tolerated skew, as jwt.decode(leeway=...) accepts it
+    cache = TokenCache(max_entries=10, max_ttl_seconds=60, leeway_seconds=5)
+    cache.put("skewed", {"exp": time.time() - 1}, 0.001)
+    assert cache.get("skewed") is not None
+
+    # Never longer than max_ttl_seconds, whatever the wall clock says
+    cache = TokenCache(max_entries=10, max_ttl_seconds=0.01)
+    cache.put("long-lived", {"exp": time.time() + 3600}, 0.001)
+    time.sleep(0.02)
+    assert cache.get("long-lived") is None
+
+    cache = TokenCache(max_entries=1, max_ttl_seconds=60)
+    for token in ("first", "second"):
+        cache.put(token, {"exp": time.time() + 60}, 0.001)
+    assert cache.get("first") is None and cache.get("second") is not None
+    cache.discard("second")
+    assert cache.get("second") is None
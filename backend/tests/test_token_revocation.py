@@ -0,0 +1,101 @@
+"""
+Tests for logout and the token revocation filter.
+"""
+import asyncio
+import re
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import AsyncSessionLocal
+from app.main import app
+from app.models import RevokedToken
+from app.services.auth_service import AuthService
+from app.services.token_revocation import BloomFilter, TokenRevocations
+from app.services.token_revocation import token_revocations
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    members = [uuid.uuid4().hex for _ in range(2000)]
+    for member in members:
+        bloom.add(member)
+
+    assert all(member in bloom for member in members)
+    others = [uuid.uuid4().hex for _ in range(20000)]
+    false_positives = sum(other in bloom for other in others) / len(others)
+    assert false_positives < 0.03
+
+
+def _tokens(user):
+    data = {"sub": str(user.id)}
+    return (AuthService.create_access_token(data),
+            AuthService.create_refresh_token(data))
+
+
+def test_logout_revokes_access_and_refresh_tokens(db, user):
+    client = TestClient(app)
+    access, refresh = _tokens(user)
+    headers = {"Authorization": f"Bearer {access}"}
+    assert client.get("/api/auth/me", headers=headers).status_code == 200
+
+    response = client.post("/api/auth/logout", headers=headers,
+                           json={"refresh_token": refresh})
+    assert response.status_code == 200
+    assert db.query(RevokedToken).count() == 2
+
+    # The access token is in the token cache, revocation still applies
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    assert client.post("/api/auth/refresh",
+                       json={"refresh_token": refresh}).status_code == 401
+
+
+def test_unrevoked_tokens_skip_the_store(db, user):
+    client = TestClient(app)
+    revoked, _ = _tokens(user)
+    client.post("/api/auth/logout",
+                headers={"Authorization": f"Bearer {revoked}"})
+    headers = {"Authorization": f"Bearer {_tokens(user)[0]}"}
+
+    statements = []
+    engine = AsyncSessionLocal.kw["bind"].sync_engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if re.search(r"\bFROM revoked_tokens\b", statement):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        for _ in range(3):
+            assert client.get("/api/auth/me",
+                              headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert statements == []
+
+
+def test_workers_sync_revocations_and_purge_expired(db, user):
+    other_worker = TokenRevocations(capacity=1000, error_rate=0.001)
+    other_worker.load(db)
+    payload = AuthService.verify_token(_tokens(user)[0])
+    expired_jti = uuid.uuid4().hex
+    db.add(RevokedToken(jti=expired_jti, user_id=user.id,
+                        expires_at=datetime.utcnow() - timedelta(minutes=1)))
+    db.commit()
+
+    async def run():
+        async with AsyncSessionLocal() as session:
+            await token_revocations.revoke(session, [payload], user.id)
+            assert not other_worker.might_be_revoked(payload["jti"])
+            assert await other_worker.sync(session) == 2
+            assert other_worker.might_be_revoked(expired_jti)
+            return await other_worker.purge(session)
+
+    assert asyncio.run(run()) == 1
+    assert other_worker.might_be_revoked(payload["jti"])
+    assert not other_worker.might_be_revoked(expired_jti)
+    assert [row.jti for row in db.query(RevokedToken)] == [payload["jti"]]